@@ -0,0 +1,116 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""This module contains functionality for shedding load when a worker is
+overloaded, so that the requests it admits keep a bounded latency.
+"""
+from __future__ import absolute_import
+
+import threading
+import time
+
+from six.moves import http_client
+
+from sagemaker_inference.errors import GenericInferenceToolkitError
+
+# Weight of the latest latency in its moving average.
+LATENCY_SMOOTHING = 0.1
+
+
+class AdmissionController(object):
+    """Admits or rejects the requests of a worker based on the number of requests
+    in flight and on the recent latency.
+    """
+
+    def __init__(self, max_inflight_requests=None, max_latency=None):
+        """Initialize an ``AdmissionController``.
+
+        Args:
+            max_inflight_requests (int): Number of requests in flight past which new
+                requests are rejected with 429.
+            max_latency (float): Average latency, in seconds, past which new requests are
+                rejected with 503 while other requests are in flight. Requests which
+                waited longer than that before reaching the worker are rejected too.
+        """
+        self._max_inflight_requests = max_inflight_requests
+        self._max_latency = max_latency
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._latency = None
+
+    @property
+    def inflight(self):
+        """int: The number of admitted requests still in flight."""
+        return self._inflight
+
+    @property
+    def latency(self):
+        """float: The moving average of the latency of admitted requests, in seconds."""
+        return self._latency
+
+    def acquire(self, arrival_time=None):
+        """Admit a request.
+
+        A request is always admitted when no other request is in flight, so that the
+        latency estimate recovers once the worker has caught up, unless it already
+        waited longer than the maximum latency before reaching the worker. The time a
+        request waits in a queue ahead of the worker is only known when its arrival
+        time is.
+
+        Args:
+            arrival_time (float): The time the request arrived, as returned by
+                ``time.time()``, or None if unknown.
+
+        Returns:
+            float: The time the request was admitted, to pass to ``release``.
+
+        Raises:
+            GenericInferenceToolkitError: With status 429 if too many requests are in
+                flight, or 503 if the recent latency is too high.
+        """
+        now = time.time()
+        with self._lock:
+            if self._max_inflight_requests is not None and (
+                self._inflight >= self._max_inflight_requests
+            ):
+                raise GenericInferenceToolkitError(
+                    http_client.TOO_MANY_REQUESTS, "Too many requests in flight"
+                )
+            if self._overloaded(now, arrival_time):
+                raise GenericInferenceToolkitError(
+                    http_client.SERVICE_UNAVAILABLE, "Model server is overloaded"
+                )
+            self._inflight += 1
+        return now
+
+    def _overloaded(self, now, arrival_time):
+        if self._max_latency is None:
+            return False
+        if arrival_time is not None and now - arrival_time > self._max_latency:
+            return True
+        return (
+            self._latency is not None and self._inflight > 0 and self._latency > self._max_latency
+        )
+
+    def release(self, admitted_at):
+        """Record the completion of an admitted request.
+
+        Args:
+            admitted_at (float): The time returned by ``acquire``.
+        """
+        latency = time.time() - admitted_at
+        with self._lock:
+            self._inflight -= 1
+            if self._latency is None:
+                self._latency = latency
+            else:
+                self._latency += LATENCY_SMOOTHING * (latency - self._latency)
@@ -0,0 +1,146 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""This module contains functionality for pinning model server workers
+to disjoint sets of CPUs.
+"""
+from __future__ import absolute_import
+
+import fcntl
+import os
+
+from sagemaker_inference import logging, parameters, resources
+
+logger = logging.get_logger()
+
+WORKER_SLOT_DIR = os.path.join("/tmp", "sagemaker-inference", "worker-slots")
+
+# Keeps the lock file of the claimed slot open for the lifetime of the worker.
+# The lock is released by the kernel when the worker exits, freeing the slot
+# for its replacement.
+_slot_file = None
+_slot = None
+
+
+def claim_worker_slot(slots, slot_dir=WORKER_SLOT_DIR):
+    """Claim the lowest worker slot not held by another live worker.
+
+    The model server does not tell a worker its index, so workers coordinate
+    through exclusive locks on one file per slot.
+
+    Args:
+        slots (int): The number of slots.
+        slot_dir (str): The directory holding the slot lock files.
+
+    Returns:
+        int: The claimed slot, or None if all slots are held.
+    """
+    global _slot_file, _slot  # pylint: disable=global-statement
+
+    if _slot_file is not None:
+        return _slot
+
+    if not os.path.exists(slot_dir):
+        os.makedirs(slot_dir, exist_ok=True)
+
+    for slot in range(slots):
+        f = open(os.path.join(slot_dir, "slot-{}".format(slot)), "a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except (IOError, OSError):
+            f.close()
+            continue
+        _slot_file, _slot = f, slot
+        return slot
+    return None
+
+
+def partition_cpus(cpus, slots, slot, nodes=None):
+    """Return the CPUs assigned to a worker slot.
+
+    The CPUs are ordered by NUMA node and split into ``slots`` contiguous,
+    disjoint chunks, so that a worker's CPUs share a node whenever the number
+    of CPUs per node is a multiple of the chunk size. When there are more
+    slots than CPUs, slots share CPUs round-robin.
+
+    Args:
+        cpus (list[int]): The CPUs available to the workers.
+        slots (int): The number of worker slots.
+        slot (int): The slot of the worker.
+        nodes (dict[int, list[int]]): CPU ids by NUMA node id.
+
+    Returns:
+        list[int]: The CPUs for the slot.
+    """
+    node_of = {}
+    for node, node_cpus in (nodes or {}).items():
+        for cpu in node_cpus:
+            node_of[cpu] = node
+    ordered = sorted(cpus, key=lambda cpu: (node_of.get(cpu, 0), cpu))
+
+    if slots >= len(ordered):
+        return [ordered[slot % len(ordered)]]
+    return ordered[slot * len(ordered) // slots : (slot + 1) * len(ordered) // slots]
+
+
+def pin_worker(env):
+    """Pin the current worker process to its own set of CPUs.
+
+    The worker claims a slot among the configured number of workers and
+    restricts its affinity to the slot's CPUs. Workers are only pinned when the
+    number of workers is set explicitly or to ``auto``, since the model server
+    default does not account for the cgroup CPU quota or for GPUs, and not in
+    multi-model mode, where the number of loaded models, and hence of workers,
+    is not known. Memory the worker allocates
+    afterwards, such as the model, is placed on the NUMA node of those CPUs
+    by the kernel's first-touch policy.
+
+    Args:
+        env (Environment): The serving environment.
+
+    Returns:
+        list[int]: The CPUs the worker is pinned to, or None if it was not pinned.
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        logger.warning("CPU affinity is not supported on this platform")
+        return None
+
+    if os.environ.get(parameters.MULTI_MODEL_ENV) == "true":
+        logger.warning("CPU affinity is not supported in multi-model mode, worker not pinned")
+        return None
+
+    slots = env.model_server_worker_count
+    if slots is None:
+        logger.warning(
+            "CPU affinity requires %s to be set, worker not pinned",
+            parameters.MODEL_SERVER_WORKERS_ENV,
+        )
+        return None
+
+    slot = claim_worker_slot(slots)
+    if slot is None:
+        logger.warning("no free worker slot among %s, worker %s not pinned", slots, os.getpid())
+        return None
+
+    nodes = resources.numa_nodes()
+    cpus = partition_cpus(resources.allowed_cpus(), slots, slot, nodes)
+    os.sched_setaffinity(0, cpus)
+
+    worker_nodes = sorted({node for node, node_cpus in nodes.items() if set(cpus) & set(node_cpus)})
+    logger.info(
+        "worker %s pinned to CPUs %s (slot %s, NUMA nodes %s)",
+        os.getpid(),
+        cpus,
+        slot,
+        worker_nodes,
+    )
+    return cpus
@@ -0,0 +1,368 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""This module contains functionality for loading model artifacts, meant to be
+used by ``model_fn`` implementations.
+
+Weight files are memory-mapped read-only rather than read into the heap, so the
+workers of a container share the page cache, loading takes no time regardless of
+the model size, and only the pages actually touched count towards a worker's RSS.
+
+Archives are extracted, and files that must be read in full are read, by a pool of
+threads, so that loading many shards is bounded by the disk rather than by one
+core. For example, in ``pre_model_fn``::
+
+    def pre_model_fn(model_dir):
+        archives = glob.glob(os.path.join(model_dir, "shards-*.tar.gz"))
+        artifacts.extract_archives(archives, os.path.join(model_dir, "shards"))
+"""
+from __future__ import absolute_import
+
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import shutil
+import struct
+import tarfile
+import time
+import zipfile
+
+import numpy as np
+
+from sagemaker_inference import environment, logging
+
+logger = logging.get_logger()
+
+NPY_EXTENSION = ".npy"
+SAFETENSORS_EXTENSION = ".safetensors"
+
+# Number of files ahead of the ones being read whose reading is started in the
+# background by the kernel.
+READ_AHEAD = 4
+# Archive members larger than this are written by the thread decompressing the
+# archive, in chunks, rather than held in memory until a writer thread is free.
+MAX_BUFFERED_MEMBER = 64 * 1024 * 1024
+# Total size of the archive members held in memory while waiting to be written.
+MAX_BUFFERED_BYTES = 256 * 1024 * 1024
+
+TransferStats = collections.namedtuple("TransferStats", ["files", "bytes", "seconds"])
+TransferStats.__doc__ = """Outcome of extracting or reading files: the number of files,
+their total size in bytes, and the duration in seconds."""
+
+_SAFETENSORS_DTYPES = {
+    "F64": "<f8",
+    "F32": "<f4",
+    "F16": "<f2",
+    "I64": "<i8",
+    "I32": "<i4",
+    "I16": "<i2",
+    "I8": "i1",
+    "U64": "<u8",
+    "U32": "<u4",
+    "U16": "<u2",
+    "U8": "u1",
+    "BOOL": "?",
+}
+
+
+def load_npy(path):
+    """Memory-map a ``.npy`` file read-only.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        np.ndarray: A read-only array backed by the file.
+    """
+    return np.load(path, mmap_mode="r")
+
+
+def load_safetensors(path):
+    """Memory-map the tensors of a safetensors file read-only.
+
+    The file starts with the length of a JSON header, as a little-endian 64-bit
+    integer, followed by the header, which gives the dtype, shape and byte range
+    of each tensor within the data that follows it.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        dict[str, np.ndarray]: Read-only arrays backed by the file, by tensor name.
+    """
+    with open(path, "rb") as f:
+        (header_size,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_size).decode("utf-8"))
+
+    data = np.memmap(path, dtype=np.uint8, mode="r", offset=8 + header_size)
+
+    tensors = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        if info["dtype"] not in _SAFETENSORS_DTYPES:
+            raise ValueError(
+                "Tensor {} in {} has unsupported dtype {}".format(name, path, info["dtype"])
+            )
+        begin, end = info["data_offsets"]
+        dtype = np.dtype(_SAFETENSORS_DTYPES[info["dtype"]])
+        tensors[name] = data[begin:end].view(dtype).reshape(info["shape"])
+    return tensors
+
+
+def weight_files(model_dir=environment.model_dir):
+    """List the weight files in a model directory, recursively.
+
+    Args:
+        model_dir (str): The model directory.
+
+    Returns:
+        list[str]: Sorted paths of the ``.npy`` and ``.safetensors`` files.
+    """
+    paths = []
+    for root, _, files in os.walk(model_dir):
+        for name in files:
+            if name.endswith((NPY_EXTENSION, SAFETENSORS_EXTENSION)):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+def load_weights(model_dir=environment.model_dir):
+    """Memory-map all the weight files in a model directory read-only.
+
+    ``.npy`` files are keyed by their path relative to ``model_dir``, without the
+    extension. The tensors of ``.safetensors`` files are keyed by tensor name.
+
+    Args:
+        model_dir (str): The model directory.
+
+    Returns:
+        dict[str, np.ndarray]: Read-only arrays backed by the files.
+    """
+    weights = {}
+    for path in weight_files(model_dir):
+        if path.endswith(SAFETENSORS_EXTENSION):
+            weights.update(load_safetensors(path))
+        else:
+            name = os.path.splitext(os.path.relpath(path, model_dir))[0]
+            weights[name] = load_npy(path)
+    return weights
+
+
+def _workers(threads):
+    return threads or min(32, (os.cpu_count() or 1) + 4)
+
+
+def _report(action, stats):
+    throughput = stats.bytes / stats.seconds / (1024 * 1024) if stats.seconds else float("inf")
+    logger.info(
+        "%s %s files, %s bytes in %.3f seconds (%.1f MB/s)",
+        action,
+        stats.files,
+        stats.bytes,
+        stats.seconds,
+        throughput,
+    )
+
+
+def _target_path(target_dir, name):
+    root = os.path.realpath(target_dir)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError("Archive member {} is outside of {}".format(name, target_dir))
+    return path
+
+
+def _write(path, data, mode):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    os.chmod(path, mode)
+
+
+def _extract_tar(path, target_dir, executor):
+    files = 0
+    total = 0
+    pending = collections.deque()
+    buffered = 0
+    with tarfile.open(path, "r|*") as tar:
+        for member in tar:
+            target = _target_path(target_dir, member.name)
+            if member.isdir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            if not member.isfile():
+                logger.warning("skipping %s in %s, which is not a regular file", member.name, path)
+                continue
+
+            source = tar.extractfile(member)
+            if member.size > MAX_BUFFERED_MEMBER:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, "wb") as f:
+                    shutil.copyfileobj(source, f, MAX_BUFFERED_MEMBER // 16)
+                os.chmod(target, member.mode)
+            else:
+                data = source.read()
+                while pending and buffered + len(data) > MAX_BUFFERED_BYTES:
+                    size, future = pending.popleft()
+                    future.result()
+                    buffered -= size
+                pending.append((len(data), executor.submit(_write, target, data, member.mode)))
+                buffered += len(data)
+            files += 1
+            total += member.size
+    for _, future in pending:
+        future.result()
+    return files, total
+
+
+def _extract_zip(path, target_dir, executor):
+    members = []
+    with zipfile.ZipFile(path) as archive:
+        for member in archive.infolist():
+            target = _target_path(target_dir, member.filename)
+            if member.is_dir():
+                os.makedirs(target, exist_ok=True)
+            else:
+                members.append((member, target))
+
+    def extract(member_target):
+        member, target = member_target
+        # A ZipFile cannot be read by several threads at once, so each opens its own.
+        with zipfile.ZipFile(path) as archive, archive.open(member) as source:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                shutil.copyfileobj(source, f, MAX_BUFFERED_MEMBER // 16)
+        return member.file_size
+
+    sizes = list(executor.map(extract, members))
+    return len(sizes), sum(sizes)
+
+
+def extract_archive(path, target_dir, threads=None):
+    """Extract a tar archive, compressed or not, or a zip archive, with a pool of threads.
+
+    The members of a tar archive are decompressed in sequence and written by the
+    threads of the pool. The members of a zip archive are each decompressed and
+    written by a thread of the pool. Links and special files are skipped.
+
+    Args:
+        path (str): Path to the archive.
+        target_dir (str): The directory to extract the archive into.
+        threads (int): Number of threads. Defaults to the number of CPUs plus four,
+            up to 32.
+
+    Returns:
+        TransferStats: The number of files extracted, their total size and the
+            duration of the extraction.
+
+    Raises:
+        ValueError: If a member of the archive would be extracted outside of
+            ``target_dir``.
+    """
+    start = time.perf_counter()
+    os.makedirs(target_dir, exist_ok=True)
+    with ThreadPoolExecutor(
+        max_workers=_workers(threads), thread_name_prefix="sagemaker-inference-extract"
+    ) as executor:
+        if zipfile.is_zipfile(path):
+            files, total = _extract_zip(path, target_dir, executor)
+        else:
+            files, total = _extract_tar(path, target_dir, executor)
+    stats = TransferStats(files, total, time.perf_counter() - start)
+    _report("extracted {}:".format(path), stats)
+    return stats
+
+
+def extract_archives(paths, target_dir, threads=None):
+    """Extract several archives at once, e.g. the shards of a model.
+
+    Decompression releases the GIL, so archives extracted by different threads
+    are decompressed on different cores.
+
+    Args:
+        paths (list[str]): Paths to the archives.
+        target_dir (str): The directory to extract the archives into.
+        threads (int): Number of archives extracted at once. Defaults to the number
+            of CPUs plus four, up to 32.
+
+    Returns:
+        TransferStats: The number of files extracted, their total size and the
+            duration of the extraction.
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(
+        max_workers=_workers(threads), thread_name_prefix="sagemaker-inference-extract"
+    ) as executor:
+        results = list(executor.map(lambda path: extract_archive(path, target_dir, 1), paths))
+    stats = TransferStats(
+        sum(result.files for result in results),
+        sum(result.bytes for result in results),
+        time.perf_counter() - start,
+    )
+    _report("extracted {} archives:".format(len(paths)), stats)
+    return stats
+
+
+def _advise(path):
+    """Ask the kernel to start reading a file into the page cache in the background."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def read_files(paths, threads=None, read_ahead=READ_AHEAD):
+    """Read files in full with a pool of threads, e.g. shards of weights which are
+    not memory-mapped.
+
+    The kernel is asked to start reading the ``read_ahead`` files that follow the
+    ones being read, so the disk stays busy while the threads copy data.
+
+    Args:
+        paths (list[str]): Paths to the files.
+        threads (int): Number of threads. Defaults to the number of CPUs plus four,
+            up to 32.
+        read_ahead (int): Number of files read ahead.
+
+    Returns:
+        (dict[str, bytes], TransferStats): The contents of the files by path, and the
+            number of files read, their total size and the duration of the reads.
+    """
+    start = time.perf_counter()
+    for path in paths[:read_ahead]:
+        _advise(path)
+
+    def read(index):
+        if index + read_ahead < len(paths):
+            _advise(paths[index + read_ahead])
+        with open(paths[index], "rb") as f:
+            return f.read()
+
+    with ThreadPoolExecutor(
+        max_workers=_workers(threads), thread_name_prefix="sagemaker-inference-read"
+    ) as executor:
+        contents = list(executor.map(read, range(len(paths))))
+    stats = TransferStats(
+        len(paths), sum(len(content) for content in contents), time.perf_counter() - start
+    )
+    _report("read", stats)
+    return dict(zip(paths, contents)), stats
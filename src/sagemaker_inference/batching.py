@@ -0,0 +1,244 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""This module contains functionality for batching the predictions of
+concurrent requests within a worker process.
+"""
+from __future__ import absolute_import
+
+import collections
+from concurrent.futures import Future
+import os
+import threading
+import time
+
+# Weight of the latest inter-arrival time in its moving average.
+ARRIVAL_SMOOTHING = 0.2
+# Weight of the latest latency in the per-priority moving averages.
+LATENCY_SMOOTHING = 0.1
+
+HIGH_PRIORITY = "high"
+LOW_PRIORITY = "low"
+PRIORITIES = (HIGH_PRIORITY, LOW_PRIORITY)
+# Custom attribute with which a client sets the priority of a request, e.g. ``priority=low``.
+PRIORITY_ATTRIBUTE = "priority"
+
+
+def parse_priority(attributes):
+    """Return the priority of a request from its custom attributes.
+
+    Args:
+        attributes (dict[str, str]): The custom attributes of the request.
+
+    Returns:
+        str: ``low`` if requested, ``high`` otherwise.
+    """
+    if attributes.get(PRIORITY_ATTRIBUTE, "").lower() == LOW_PRIORITY:
+        return LOW_PRIORITY
+    return HIGH_PRIORITY
+
+
+class Batcher(object):
+    """Groups the items submitted concurrently by request threads into batches.
+
+    A batching thread takes the first waiting item, collects more items for up to
+    a time window, and runs the batch prediction function once for the batch. The
+    window adapts to the observed arrival rate: when no other item is expected within
+    the maximum batch delay, a batch is processed as soon as its first item arrives,
+    so that batching adds no latency at low load. Items that arrive while a batch is
+    being processed are always batched together.
+
+    The batcher is used as a context manager around each request, so that it knows
+    how many requests are in flight without an item waiting for a batch. A window is
+    only opened while one of them may still add an item to the batch; in particular,
+    a single request thread never waits for a batch partner. Items submitted outside
+    of a request are only batched with the items already waiting.
+
+    High priority items are taken first, and low priority items fill at most a share
+    of each batch, so that bursts of bulk requests do not delay interactive ones. A
+    batch of more than one item always has room for one waiting low priority item,
+    so that low priority items are not starved by a sustained flow of high priority
+    ones.
+    """
+
+    def __init__(self, predict_fn, max_batch_size, max_batch_delay, low_priority_share=1.0):
+        """Initialize a ``Batcher``.
+
+        Args:
+            predict_fn (function): Function taking a list of items and returning the list
+                of their predictions, in the same order.
+            max_batch_size (int): Maximum number of items in a batch.
+            max_batch_delay (float): Maximum time, in seconds, to wait for more items
+                after the first item of a batch.
+            low_priority_share (float): Maximum share of a batch taken by low priority
+                items. At least one low priority item is always allowed per batch.
+        """
+        self._predict_fn = predict_fn
+        self._max_batch_size = max_batch_size
+        self._max_batch_delay = max_batch_delay
+        self._max_low_priority = max(1, int(max_batch_size * low_priority_share))
+        self._lanes = {priority: collections.deque() for priority in PRIORITIES}
+        self._condition = threading.Condition()
+        self._lock = threading.Lock()
+        self._thread_pid = None
+        # Requests in flight whose thread is not waiting in ``submit``.
+        self._expected = 0
+        self._last_arrival = None
+        self._interarrival = None
+        self._latency = {}
+
+    @property
+    def latency(self):
+        """dict[str, float]: Moving average of the latency of the items of each priority,
+        from their submission to their prediction, in seconds.
+        """
+        with self._lock:
+            return dict(self._latency)
+
+    def pending(self):
+        """Return the number of items waiting for a batch.
+
+        Returns:
+            int: The number of waiting items, of all priorities.
+        """
+        with self._condition:
+            return sum(len(lane) for lane in self._lanes.values())
+
+    def __enter__(self):
+        with self._condition:
+            self._expected += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, trace):
+        with self._condition:
+            self._expected -= 1
+            self._condition.notify()
+
+    def submit(self, item, priority=HIGH_PRIORITY):
+        """Add an item to the next batch and wait for its prediction.
+
+        Args:
+            item (obj): The item, e.g. the output of ``input_fn`` for a request.
+            priority (str): The priority of the item, ``high`` or ``low``.
+
+        Returns:
+            obj: The prediction for the item.
+        """
+        future = Future()
+        submitted_at = time.monotonic()
+        with self._lock:
+            self._record_arrival(submitted_at)
+            self._start()
+        with self._condition:
+            self._expected -= 1
+            self._lanes[priority].append((item, future))
+            self._condition.notify()
+        try:
+            return future.result()
+        finally:
+            with self._condition:
+                self._expected += 1
+            self._record_latency(priority, time.monotonic() - submitted_at)
+
+    def window(self):
+        """Return how long to wait for more items after the first item of a batch.
+
+        Returns:
+            float: The window, in seconds: zero when no other item is expected within
+                the maximum batch delay, otherwise the expected time to fill the batch,
+                bounded by the maximum batch delay.
+        """
+        with self._lock:
+            interarrival = self._interarrival
+        if interarrival is None or interarrival >= self._max_batch_delay:
+            return 0.0
+        return min(self._max_batch_delay, interarrival * (self._max_batch_size - 1))
+
+    def _record_arrival(self, now):
+        if self._last_arrival is not None:
+            interarrival = now - self._last_arrival
+            if self._interarrival is None:
+                self._interarrival = interarrival
+            else:
+                self._interarrival += ARRIVAL_SMOOTHING * (interarrival - self._interarrival)
+        self._last_arrival = now
+
+    def _record_latency(self, priority, latency):
+        with self._lock:
+            if priority not in self._latency:
+                self._latency[priority] = latency
+            else:
+                self._latency[priority] += LATENCY_SMOOTHING * (latency - self._latency[priority])
+
+    def _start(self):
+        # Threads do not survive a fork, so a worker forked from a process that
+        # already started the batching thread starts its own.
+        if self._thread_pid != os.getpid():
+            thread = threading.Thread(
+                target=self._run, name="sagemaker-inference-batcher", daemon=True
+            )
+            thread.start()
+            self._thread_pid = os.getpid()
+
+    def _run(self):
+        while True:
+            self._process(self._collect())
+
+    def _take(self, batch_size, low_priority_items):
+        # The last place of a batch is kept for a waiting low priority item.
+        reserved = int(
+            self._max_batch_size > 1 and bool(self._lanes[LOW_PRIORITY]) and low_priority_items == 0
+        )
+        if self._lanes[HIGH_PRIORITY] and batch_size < self._max_batch_size - reserved:
+            return HIGH_PRIORITY, self._lanes[HIGH_PRIORITY].popleft()
+        if self._lanes[LOW_PRIORITY] and low_priority_items < self._max_low_priority:
+            return LOW_PRIORITY, self._lanes[LOW_PRIORITY].popleft()
+        return None, None
+
+    def _collect(self):
+        with self._condition:
+            while not any(self._lanes.values()):
+                self._condition.wait()
+
+            batch = []
+            low_priority_items = 0
+            deadline = time.monotonic() + self.window()
+            while len(batch) < self._max_batch_size:
+                priority, entry = self._take(len(batch), low_priority_items)
+                if entry is not None:
+                    batch.append(entry)
+                    low_priority_items += priority == LOW_PRIORITY
+                    continue
+                timeout = deadline - time.monotonic()
+                # Without other requests in flight, no item can join the batch.
+                if timeout <= 0 or self._expected <= 0:
+                    break
+                self._condition.wait(timeout)
+        return batch
+
+    def _process(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            predictions = self._predict_fn(items)
+            if len(predictions) != len(items):
+                raise ValueError(
+                    "batch_predict_fn returned {} predictions for {} items".format(
+                        len(predictions), len(items)
+                    )
+                )
+        except Exception as e:  # pylint: disable=broad-except
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), prediction in zip(batch, predictions):
+            future.set_result(prediction)
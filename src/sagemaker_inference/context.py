@@ -0,0 +1,132 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""This module contains functionality for the request context passed to
+handler services by the Python serving backend.
+
+It implements the subset of ``mms.context.Context`` used by handler services,
+so that the same handler services run unchanged on either backend, or in process
+without a model server, as the load generator in ``sagemaker_inference.loadgen``
+calls them.
+"""
+from __future__ import absolute_import
+
+from six.moves import http_client
+
+CONTENT_TYPE_HEADER = "Content-Type"
+
+
+class RequestProcessor(object):
+    """Request headers and response status and headers of a single request.
+
+    Unlike with the multi-model server, the time the request arrived, as returned by
+    ``time.time()``, is known and kept in ``arrival_time``.
+    """
+
+    def __init__(self, request_header, arrival_time=None):
+        self._request_header = request_header
+        self.arrival_time = arrival_time
+        self._status_code = http_client.OK
+        self._reason_phrase = None
+        self._response_header = {}
+
+    def get_request_property(self, key):
+        """Return the value of a request header, or None if not set."""
+        return self._request_header.get(key)
+
+    def get_request_properties(self):
+        """dict: All the request headers."""
+        return self._request_header
+
+    def report_status(self, code, reason=None):
+        """Set the response status code and reason phrase."""
+        self._status_code = code
+        self._reason_phrase = reason
+
+    def get_response_status_code(self):
+        """int: The response status code."""
+        return self._status_code
+
+    def get_response_status_phrase(self):
+        """str: The response reason phrase, or None for the default one."""
+        return self._reason_phrase
+
+    def add_response_property(self, key, value):
+        """Set a response header."""
+        self._response_header[key] = value
+
+    def get_response_headers(self):
+        """dict: All the response headers."""
+        return self._response_header
+
+
+class Context(object):
+    """Metadata of the model and of the requests in a batch."""
+
+    def __init__(
+        self,
+        model_name,
+        model_dir,
+        batch_size=1,
+        request_headers=None,
+        gpu=None,
+        arrival_times=None,
+    ):
+        self.model_name = model_name
+        self.system_properties = {
+            "model_dir": model_dir,
+            "gpu_id": gpu,
+            "batch_size": batch_size,
+            "server_name": "sagemaker-inference",
+        }
+        request_headers = request_headers or []
+        arrival_times = arrival_times or [None] * len(request_headers)
+        self.request_processor = [
+            RequestProcessor(headers, arrival_time)
+            for headers, arrival_time in zip(request_headers, arrival_times)
+        ]
+        self.metrics = None
+
+    def get_request_header(self, idx, key):
+        """Return the value of a request header of a request in the batch."""
+        return self.request_processor[idx].get_request_property(key)
+
+    def get_all_request_header(self, idx):
+        """dict: All the request headers of a request in the batch."""
+        return self.request_processor[idx].get_request_properties()
+
+    def set_response_content_type(self, idx, value):
+        """Set the content type of the response to a request in the batch."""
+        self.request_processor[idx].add_response_property(CONTENT_TYPE_HEADER, value)
+
+    def get_response_content_type(self, idx):
+        """str: The content type of the response to a request in the batch."""
+        return self.request_processor[idx].get_response_headers().get(CONTENT_TYPE_HEADER)
+
+    def get_response_status(self, idx):
+        """(int, str): The status code and reason phrase of the response to a request."""
+        processor = self.request_processor[idx]
+        return processor.get_response_status_code(), processor.get_response_status_phrase()
+
+    def set_response_status(self, code=http_client.OK, phrase="", idx=0):
+        """Set the status of the response to a request in the batch.
+
+        Args:
+            code (int): The status code.
+            phrase (str): The reason phrase.
+            idx (int): The index of the request in the batch.
+        """
+        self.request_processor[idx].report_status(code, phrase)
+
+    def set_response_header(self, idx, key, value):
+        """Set a header of the response to a request in the batch."""
+        self.request_processor[idx].add_response_property(key, value)
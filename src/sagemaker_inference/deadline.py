@@ -0,0 +1,62 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""This module contains functionality for request deadlines, past which
+the caller has given up and the remaining work on a request is dropped.
+"""
+from __future__ import absolute_import
+
+import time
+
+from six.moves import http_client
+
+from sagemaker_inference import utils
+from sagemaker_inference.errors import GenericInferenceToolkitError
+
+# Custom attribute with which a client sets a timeout, in milliseconds, shorter than
+# the model server timeout, e.g. ``timeout_ms=200``.
+TIMEOUT_ATTRIBUTE = "timeout_ms"
+
+
+def request_deadline(request_property, arrival_time, timeout):
+    """Return the time after which the caller no longer waits for a request.
+
+    Args:
+        request_property (dict): The request headers.
+        arrival_time (float): The time the request arrived, as returned by ``time.time()``.
+        timeout (float): The model server timeout, in seconds.
+
+    Returns:
+        float: The deadline, as returned by ``time.time()``.
+    """
+    client_timeout = utils.custom_attributes(request_property).get(TIMEOUT_ATTRIBUTE)
+    if client_timeout:
+        try:
+            timeout = min(timeout, int(client_timeout) / 1000.0)
+        except ValueError:
+            pass
+    return arrival_time + timeout
+
+
+def check(deadline):
+    """Raise an error if a deadline has passed.
+
+    Args:
+        deadline (float): The deadline, or None if the request has none.
+
+    Raises:
+        GenericInferenceToolkitError: With status 503 if the deadline has passed.
+    """
+    if deadline is not None and time.time() > deadline:
+        raise GenericInferenceToolkitError(
+            http_client.SERVICE_UNAVAILABLE, "Request deadline exceeded"
+        )
@@ -15,6 +15,7 @@ from __future__ import absolute_import
 
 import os
 
+from sagemaker_inference import affinity, environment, profiler
 from sagemaker_inference.transformer import Transformer
 
 PYTHON_PATH_ENV = "PYTHONPATH"
@@ -52,15 +53,27 @@ class DefaultHandlerService(object):
     def initialize(self, context):
         """Calls the Transformer method that validates the user module against
         the SageMaker inference contract.
+
+        If CPU affinity is enabled, the worker is pinned to its own set of CPUs
+        before the model is loaded. If profiling is enabled, the worker takes a
+        profile whenever it receives SIGUSR2.
         """
+        env = environment.Environment()
+        if env.model_server_cpu_affinity:
+            affinity.pin_worker(env)
+
+        if env.model_server_profiling is True:
+            profiler.install(
+                profiler.Profiler(env.model_server_profile_dir, env.model_server_profile_seconds)
+            )
+
         properties = context.system_properties
         model_dir = properties.get("model_dir")
 
-        # add model_dir/code to python path
-        code_dir_path = "{}:".format(model_dir + "/code")
-        if PYTHON_PATH_ENV in os.environ:
-            os.environ[PYTHON_PATH_ENV] = code_dir_path + os.environ[PYTHON_PATH_ENV]
-        else:
-            os.environ[PYTHON_PATH_ENV] = code_dir_path
+        # add model_dir/code to python path, once
+        code_dir_path = model_dir + "/code"
+        python_path = os.environ.get(PYTHON_PATH_ENV, "")
+        if code_dir_path not in python_path.split(":"):
+            os.environ[PYTHON_PATH_ENV] = "{}:{}".format(code_dir_path, python_path)
 
         self._service.validate_and_initialize(model_dir=model_dir, context=context)
@@ -0,0 +1,165 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""This module contains functionality for draining in-flight requests
+before the model server is shut down.
+
+The serving process and the worker processes coordinate through files: a marker
+file signals that the server is draining, and each worker publishes its number of
+in-flight requests in a small memory-mapped file.
+"""
+from __future__ import absolute_import
+
+import glob
+import mmap
+import os
+import shutil
+import struct
+import threading
+import time
+
+import psutil
+
+from sagemaker_inference import logging
+
+logger = logging.get_logger()
+
+DRAIN_DIR = os.path.join("/tmp", "sagemaker-inference", "drain")
+DRAINING_MARKER = "draining"
+INFLIGHT_PREFIX = "inflight-"
+POLL_INTERVAL = 0.1
+
+_COUNTER = struct.Struct("q")
+
+
+def start_draining(drain_dir=DRAIN_DIR):
+    """Signal the workers that the server is draining.
+
+    Args:
+        drain_dir (str): The directory holding the drain state.
+    """
+    os.makedirs(drain_dir, exist_ok=True)
+    open(os.path.join(drain_dir, DRAINING_MARKER), "a").close()
+
+
+def reset(drain_dir=DRAIN_DIR):
+    """Remove the drain state of a previous server.
+
+    Args:
+        drain_dir (str): The directory holding the drain state.
+    """
+    shutil.rmtree(drain_dir, ignore_errors=True)
+
+
+def is_draining(drain_dir=DRAIN_DIR):
+    """Return whether the server is draining.
+
+    Args:
+        drain_dir (str): The directory holding the drain state.
+
+    Returns:
+        bool: True if new requests should be rejected.
+    """
+    return os.path.exists(os.path.join(drain_dir, DRAINING_MARKER))
+
+
+class InflightRequests(object):
+    """Counter of the requests a worker is processing, shared with the serving process.
+
+    The counter lives in a memory-mapped file, so updating it costs a memory write
+    rather than a system call. It is used as a context manager around each request.
+    The file is created by the process that counts its first request, so that
+    workers forked from a process that created the counter each publish their own.
+    """
+
+    def __init__(self, drain_dir=DRAIN_DIR):
+        self._drain_dir = drain_dir
+        self._map = None
+        self._pid = None
+        self._count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def count(self):
+        """int: The number of in-flight requests."""
+        return self._count
+
+    def __enter__(self):
+        with self._lock:
+            self._open()
+            self._count += 1
+            _COUNTER.pack_into(self._map, 0, self._count)
+        return self
+
+    def __exit__(self, exc_type, exc_value, trace):
+        with self._lock:
+            self._count -= 1
+            _COUNTER.pack_into(self._map, 0, self._count)
+
+    def _open(self):
+        if self._pid == os.getpid():
+            return
+        os.makedirs(self._drain_dir, exist_ok=True)
+        path = os.path.join(self._drain_dir, "{}{}".format(INFLIGHT_PREFIX, os.getpid()))
+        with open(path, "wb") as f:
+            f.write(_COUNTER.pack(0))
+        with open(path, "r+b") as f:
+            self._map = mmap.mmap(f.fileno(), _COUNTER.size)
+        self._count = 0
+        self._pid = os.getpid()
+
+
+def inflight_requests(drain_dir=DRAIN_DIR):
+    """Return the number of requests in flight across the live workers.
+
+    Args:
+        drain_dir (str): The directory holding the drain state.
+
+    Returns:
+        int: The number of in-flight requests.
+    """
+    total = 0
+    for path in glob.glob(os.path.join(drain_dir, INFLIGHT_PREFIX + "*")):
+        pid = int(os.path.basename(path)[len(INFLIGHT_PREFIX) :])
+        if not psutil.pid_exists(pid):
+            continue
+        try:
+            with open(path, "rb") as f:
+                total += _COUNTER.unpack(f.read(_COUNTER.size))[0]
+        except (IOError, OSError, struct.error):
+            continue
+    return total
+
+
+def drain(timeout, drain_dir=DRAIN_DIR):
+    """Stop accepting new requests and wait for the in-flight ones to finish.
+
+    Args:
+        timeout (float): Maximum time to wait, in seconds.
+        drain_dir (str): The directory holding the drain state.
+
+    Returns:
+        (int, int): The number of requests that finished in time and the number
+            still in flight when the timeout expired.
+    """
+    start_draining(drain_dir)
+
+    initial = inflight_requests(drain_dir)
+    remaining = initial
+    deadline = time.time() + timeout
+    while remaining > 0 and time.time() < deadline:
+        time.sleep(POLL_INTERVAL)
+        remaining = inflight_requests(drain_dir)
+
+    drained = max(0, initial - remaining)
+    logger.info("drained %s in-flight requests, dropping %s", drained, remaining)
+    return drained, remaining
@@ -18,7 +18,7 @@ from __future__ import absolute_import
 import os
 from typing import Optional
 
-from sagemaker_inference import content_types, logging, parameters
+from sagemaker_inference import content_types, logging, parameters, resources
 
 logger = logging.get_logger()
 
@@ -28,6 +28,19 @@ DEFAULT_STARTUP_TIMEOUT = "600"  # 10 minutes
 DEFAULT_HTTP_PORT = "8080"
 DEFAULT_VMARGS = "-XX:-UseContainerSupport"
 DEFAULT_MAX_REQUEST_SIZE = None
+DEFAULT_DRAIN_TIMEOUT = "0"
+DEFAULT_WORKER_THREADS = "1"
+DEFAULT_PIPELINE_THREADS = "0"
+DEFAULT_WORKER_MAX_BATCH_DELAY = "10"
+DEFAULT_LOW_PRIORITY_BATCH_SHARE = "0.5"
+DEFAULT_METRICS_INTERVAL = "60"
+DEFAULT_PROFILE_DIR = os.path.join("/tmp", "sagemaker-inference", "profiles")
+DEFAULT_PROFILE_SECONDS = "30"
+DEFAULT_MEMORY_SAMPLE_INTERVAL = "100"
+DEFAULT_PREFETCH_MEMORY = "1024"
+AUTO_WORKERS = "auto"
+MMS_BACKEND = "mms"
+PYTHON_BACKEND = "python"
 
 SAGEMAKER_BASE_PATH = os.path.join("/opt", "ml")  # type: str
 
@@ -43,6 +56,11 @@ code_dir = os.path.join(model_dir, "code")  # type: str
 """str: the path of the user's code directory, e.g., /opt/ml/model/code/"""
 
 
+def _optional_int_env(name):  # type: (str) -> Optional[int]
+    value = os.environ.get(name)
+    return int(value) if value is not None else None
+
+
 class Environment(object):
     """Provides access to aspects of the serving environment relevant to serving containers,
     including system characteristics, environment variables and configuration settings.
@@ -56,6 +74,86 @@ class Environment(object):
         model_server_timeout_seconds (Optional[int]): Timeout in seconds for the model server.
             Default is None.
         model_server_workers (str): Number of worker processes the model server will use.
+            If set to ``auto``, the number of workers and their thread budget are chosen
+            from the CPU and memory available to the container. In multi-model mode, where
+            every loaded model has its own workers, each worker gets a single thread.
+        model_server_worker_memory (Optional[int]): Expected memory footprint of a worker,
+            in bytes, used when auto-tuning the number of workers. Default is None.
+        model_server_cpu_affinity (bool): Whether each worker is pinned to its own set of
+            CPUs. Default is False.
+        model_server_worker_count (Optional[int]): Number of worker processes per model when
+            set explicitly or to ``auto``. None when left to the model server default.
+        model_server_netty_threads (Optional[int]): Number of frontend threads accepting
+            requests. Default is None, i.e. the model server default.
+        model_server_netty_client_threads (Optional[int]): Number of frontend threads
+            exchanging data with the workers. Default is None.
+        model_server_job_queue_size (Optional[int]): Number of requests the frontend queues
+            per model before rejecting new ones. Default is None.
+        model_server_batch_size (Optional[int]): Maximum number of requests the frontend
+            sends to a worker at once. The model is then registered after the model server
+            starts, and until it is loaded, ``/ping`` reports the server healthy while
+            ``/invocations`` fails with 404. Default is None.
+        model_server_max_batch_delay (Optional[int]): Maximum time, in milliseconds, the
+            frontend waits to fill a batch. Default is None.
+        model_server_drain_timeout (int): Time, in seconds, given to in-flight requests to
+            finish on SIGTERM before the model server is stopped. Default is 0, which stops
+            the model server immediately.
+        model_server_preload_model (bool): Whether the model is loaded once before the
+            workers are forked, sharing its memory copy-on-write. Ignored when CPU
+            affinity is enabled. Default is False.
+        model_server_backend (str): The serving backend, either ``mms`` for the multi-model
+            server or ``python`` for the lightweight Python backend. Default is ``mms``.
+        model_server_worker_threads (int): Number of requests a worker of the Python backend
+            handles concurrently, which lets ``async def`` handlers overlap their I/O.
+            Default is 1.
+        model_server_pipeline_threads (int): Number of threads running ``input_fn`` and
+            ``output_fn`` for the items of a batch while ``predict_fn`` runs. Default is 0,
+            which runs the items of a batch one after the other.
+        model_server_worker_batch_size (Optional[int]): Maximum number of concurrent requests
+            a worker groups into one call to ``batch_predict_fn``. Default is None, which
+            disables batching within workers.
+        model_server_worker_max_batch_delay (int): Maximum time, in milliseconds, a worker
+            waits for more requests to fill a batch. Default is 10.
+        model_server_low_priority_batch_share (float): Maximum share of a batch taken by
+            requests with the ``priority=low`` custom attribute. Default is 0.5.
+        model_server_request_deadlines (bool): Whether requests are dropped once their
+            caller has timed out. Default is False.
+        model_server_max_inflight_requests (Optional[int]): Number of requests in flight in
+            a worker past which new requests are rejected with 429. Only applies to the
+            Python backend. Default is None.
+        model_server_max_latency (Optional[int]): Average latency, in milliseconds, past
+            which a busy worker rejects new requests with 503, as well as requests that
+            waited longer than that to reach the worker. Only applies to the Python
+            backend. Default is None.
+        model_server_stage_metrics (bool): Whether workers time the stages of requests,
+            e.g. ``input_fn``, into latency histograms. Default is False.
+        model_server_metrics_interval (int): Time, in seconds, between two summaries of
+            the stage latency histograms. Default is 60.
+        model_server_prometheus_metrics (bool): Whether the metrics of all workers are
+            exported for Prometheus on the first port of ``safe_port_range``. Default is
+            False.
+        model_server_profiling (bool): Whether workers take a profile when they receive
+            SIGUSR2. Default is False.
+        model_server_profile_dir (str): Directory workers write their profiles to.
+            Default is /tmp/sagemaker-inference/profiles.
+        model_server_profile_seconds (int): Time, in seconds, during which a profile
+            samples the stacks of a worker. Default is 30.
+        model_server_memory_profiling (bool): Whether workers account the memory used by
+            the stages of requests and report their top allocation sites. Default is False.
+        model_server_memory_sample_interval (int): Number of calls of a stage per call
+            whose memory is measured. Default is 100.
+        model_server_worker_max_rss (Optional[int]): Resident set size of a worker, in
+            bytes, past which it is restarted. Default is None.
+        model_server_model_cache (bool): Whether, in multi-model mode, loading a model
+            fails with 507 once the loaded models would exceed a memory budget, for the
+            platform to unload models. Default is False.
+        model_server_model_cache_memory (int): Memory, in bytes, the models loaded by all
+            workers may use. Default is the memory the budget leaves to the workers.
+        model_server_prefetch (bool): Whether, in multi-model mode, the artifacts of the
+            unloaded models most likely to be requested next are read into the page cache
+            while the server is idle. Default is False.
+        model_server_prefetch_memory (int): Total size, in bytes, of the artifacts kept
+            prefetched. Default is 1024 MB.
 
         default_accept (str): The desired default MIME type of the inference in the response
             as specified in the user-supplied SAGEMAKER_DEFAULT_INVOCATIONS_ACCEPT environment
@@ -66,6 +164,8 @@ class Environment(object):
         safe_port_range (str): HTTP port range that can be used by customers to avoid collisions
             with the HTTP port specified by SageMaker for handling pings and invocations.
             For example: 1111-2222
+        memory_budget (MemoryBudget): Split of the container memory between the model server
+            frontend and the model workers.
 
     """
 
@@ -80,6 +180,103 @@ class Environment(object):
         )
 
         self._model_server_workers = os.environ.get(parameters.MODEL_SERVER_WORKERS_ENV)
+        self._model_server_worker_memory_in_mb = os.environ.get(
+            parameters.MODEL_SERVER_WORKER_MEMORY_ENV
+        )
+        self._model_server_cpu_affinity = (
+            os.environ.get(parameters.MODEL_SERVER_CPU_AFFINITY_ENV, "false").lower() == "true"
+        )
+        self._model_server_netty_threads = _optional_int_env(
+            parameters.MODEL_SERVER_NETTY_THREADS_ENV
+        )
+        self._model_server_netty_client_threads = _optional_int_env(
+            parameters.MODEL_SERVER_NETTY_CLIENT_THREADS_ENV
+        )
+        self._model_server_job_queue_size = _optional_int_env(
+            parameters.MODEL_SERVER_JOB_QUEUE_SIZE_ENV
+        )
+        self._model_server_batch_size = _optional_int_env(parameters.MODEL_SERVER_BATCH_SIZE_ENV)
+        self._model_server_max_batch_delay = _optional_int_env(
+            parameters.MODEL_SERVER_MAX_BATCH_DELAY_ENV
+        )
+        self._model_server_drain_timeout = int(
+            os.environ.get(parameters.MODEL_SERVER_DRAIN_TIMEOUT_ENV, DEFAULT_DRAIN_TIMEOUT)
+        )
+        self._model_server_preload_model = (
+            os.environ.get(parameters.MODEL_SERVER_PRELOAD_MODEL_ENV, "false").lower() == "true"
+        )
+        self._model_server_backend = os.environ.get(
+            parameters.MODEL_SERVER_BACKEND_ENV, MMS_BACKEND
+        ).lower()
+        self._model_server_worker_threads = int(
+            os.environ.get(parameters.MODEL_SERVER_WORKER_THREADS_ENV, DEFAULT_WORKER_THREADS)
+        )
+        self._model_server_pipeline_threads = int(
+            os.environ.get(parameters.MODEL_SERVER_PIPELINE_THREADS_ENV, DEFAULT_PIPELINE_THREADS)
+        )
+        self._model_server_worker_batch_size = _optional_int_env(
+            parameters.MODEL_SERVER_WORKER_BATCH_SIZE_ENV
+        )
+        self._model_server_worker_max_batch_delay = int(
+            os.environ.get(
+                parameters.MODEL_SERVER_WORKER_MAX_BATCH_DELAY_ENV, DEFAULT_WORKER_MAX_BATCH_DELAY
+            )
+        )
+        self._model_server_low_priority_batch_share = float(
+            os.environ.get(
+                parameters.MODEL_SERVER_LOW_PRIORITY_BATCH_SHARE_ENV,
+                DEFAULT_LOW_PRIORITY_BATCH_SHARE,
+            )
+        )
+        self._model_server_request_deadlines = (
+            os.environ.get(parameters.MODEL_SERVER_REQUEST_DEADLINES_ENV, "false").lower() == "true"
+        )
+        self._model_server_max_inflight_requests = _optional_int_env(
+            parameters.MODEL_SERVER_MAX_INFLIGHT_REQUESTS_ENV
+        )
+        self._model_server_max_latency = _optional_int_env(parameters.MODEL_SERVER_MAX_LATENCY_ENV)
+        self._model_server_stage_metrics = (
+            os.environ.get(parameters.MODEL_SERVER_STAGE_METRICS_ENV, "false").lower() == "true"
+        )
+        self._model_server_metrics_interval = int(
+            os.environ.get(parameters.MODEL_SERVER_METRICS_INTERVAL_ENV, DEFAULT_METRICS_INTERVAL)
+        )
+        self._model_server_prometheus_metrics = (
+            os.environ.get(parameters.MODEL_SERVER_PROMETHEUS_METRICS_ENV, "false").lower()
+            == "true"
+        )
+        self._model_server_profiling = (
+            os.environ.get(parameters.MODEL_SERVER_PROFILING_ENV, "false").lower() == "true"
+        )
+        self._model_server_profile_dir = os.environ.get(
+            parameters.MODEL_SERVER_PROFILE_DIR_ENV, DEFAULT_PROFILE_DIR
+        )
+        self._model_server_profile_seconds = int(
+            os.environ.get(parameters.MODEL_SERVER_PROFILE_SECONDS_ENV, DEFAULT_PROFILE_SECONDS)
+        )
+        self._model_server_memory_profiling = (
+            os.environ.get(parameters.MODEL_SERVER_MEMORY_PROFILING_ENV, "false").lower() == "true"
+        )
+        self._model_server_memory_sample_interval = int(
+            os.environ.get(
+                parameters.MODEL_SERVER_MEMORY_SAMPLE_INTERVAL_ENV, DEFAULT_MEMORY_SAMPLE_INTERVAL
+            )
+        )
+        self._model_server_worker_max_rss_in_mb = _optional_int_env(
+            parameters.MODEL_SERVER_WORKER_MAX_RSS_ENV
+        )
+        self._model_server_model_cache = (
+            os.environ.get(parameters.MODEL_SERVER_MODEL_CACHE_ENV, "false").lower() == "true"
+        )
+        self._model_server_model_cache_memory_in_mb = _optional_int_env(
+            parameters.MODEL_SERVER_MODEL_CACHE_MEMORY_ENV
+        )
+        self._model_server_prefetch = (
+            os.environ.get(parameters.MODEL_SERVER_PREFETCH_ENV, "false").lower() == "true"
+        )
+        self._model_server_prefetch_memory_in_mb = int(
+            os.environ.get(parameters.MODEL_SERVER_PREFETCH_MEMORY_ENV, DEFAULT_PREFETCH_MEMORY)
+        )
 
         self._startup_timeout = int(
             os.environ.get(parameters.STARTUP_TIMEOUT_ENV, DEFAULT_STARTUP_TIMEOUT)
@@ -135,6 +332,191 @@ class Environment(object):
         """str: Number of worker processes the model server is configured to use."""
         return self._model_server_workers
 
+    @property
+    def model_server_worker_memory(self) -> Optional[int]:
+        """int: Expected memory footprint of a worker process, in bytes."""
+        if self._model_server_worker_memory_in_mb is not None:
+            return int(self._model_server_worker_memory_in_mb) * 1024 * 1024
+        return None
+
+    @property
+    def model_server_cpu_affinity(self) -> bool:
+        """bool: Whether each worker process is pinned to its own set of CPUs."""
+        return self._model_server_cpu_affinity
+
+    @property
+    def model_server_worker_count(self) -> Optional[int]:
+        """int: Number of worker processes the model server starts per model: the configured
+        number, or the auto-tuned number if set to ``auto``. None if not configured, in which
+        case the model server picks the number of workers itself.
+        """
+        if self._model_server_workers == AUTO_WORKERS:
+            multi_model = os.environ.get(parameters.MULTI_MODEL_ENV) == "true"
+            workers, _ = resources.auto_tune_workers(
+                self.model_server_worker_memory,
+                None if multi_model else model_dir,
+                self.memory_budget.workers,
+            )
+            return workers
+        if self._model_server_workers:
+            return int(self._model_server_workers)
+        return None
+
+    @property
+    def model_server_netty_threads(self) -> Optional[int]:
+        """int: Number of frontend threads accepting requests."""
+        return self._model_server_netty_threads
+
+    @property
+    def model_server_netty_client_threads(self) -> Optional[int]:
+        """int: Number of frontend threads exchanging data with the worker processes."""
+        return self._model_server_netty_client_threads
+
+    @property
+    def model_server_job_queue_size(self) -> Optional[int]:
+        """int: Number of requests the frontend queues per model before rejecting new ones."""
+        return self._model_server_job_queue_size
+
+    @property
+    def model_server_batch_size(self) -> Optional[int]:
+        """int: Maximum number of requests the frontend sends to a worker at once."""
+        return self._model_server_batch_size
+
+    @property
+    def model_server_max_batch_delay(self) -> Optional[int]:
+        """int: Maximum time, in milliseconds, the frontend waits to fill a batch."""
+        return self._model_server_max_batch_delay
+
+    @property
+    def model_server_drain_timeout(self) -> int:
+        """int: Time, in seconds, given to in-flight requests to finish on SIGTERM before
+        the model server is stopped.
+        """
+        return self._model_server_drain_timeout
+
+    @property
+    def model_server_preload_model(self) -> bool:
+        """bool: Whether the model is loaded once before the worker processes are forked."""
+        return self._model_server_preload_model
+
+    @property
+    def model_server_backend(self) -> str:
+        """str: The serving backend, ``mms`` or ``python``."""
+        return self._model_server_backend
+
+    @property
+    def model_server_worker_threads(self) -> int:
+        """int: Number of requests a worker of the Python backend handles concurrently."""
+        return self._model_server_worker_threads
+
+    @property
+    def model_server_pipeline_threads(self) -> int:
+        """int: Number of threads decoding and encoding the items of a batch while the
+        model makes predictions.
+        """
+        return self._model_server_pipeline_threads
+
+    @property
+    def model_server_worker_batch_size(self) -> Optional[int]:
+        """int: Maximum number of concurrent requests a worker groups into one batch."""
+        return self._model_server_worker_batch_size
+
+    @property
+    def model_server_worker_max_batch_delay(self) -> int:
+        """int: Maximum time, in milliseconds, a worker waits to fill a batch."""
+        return self._model_server_worker_max_batch_delay
+
+    @property
+    def model_server_low_priority_batch_share(self) -> float:
+        """float: Maximum share of a batch taken by low priority requests."""
+        return self._model_server_low_priority_batch_share
+
+    @property
+    def model_server_request_deadlines(self) -> bool:
+        """bool: Whether requests are dropped once their caller has timed out."""
+        return self._model_server_request_deadlines
+
+    @property
+    def model_server_max_inflight_requests(self) -> Optional[int]:
+        """int: Number of requests in flight in a worker past which new ones are rejected."""
+        return self._model_server_max_inflight_requests
+
+    @property
+    def model_server_max_latency(self) -> Optional[int]:
+        """int: Average latency, in milliseconds, past which a busy worker rejects new
+        requests.
+        """
+        return self._model_server_max_latency
+
+    @property
+    def model_server_stage_metrics(self) -> bool:
+        """bool: Whether workers time the stages of requests into latency histograms."""
+        return self._model_server_stage_metrics
+
+    @property
+    def model_server_metrics_interval(self) -> int:
+        """int: Time, in seconds, between two summaries of the stage latency histograms."""
+        return self._model_server_metrics_interval
+
+    @property
+    def model_server_prometheus_metrics(self) -> bool:
+        """bool: Whether the metrics of all workers are exported for Prometheus."""
+        return self._model_server_prometheus_metrics
+
+    @property
+    def model_server_profiling(self) -> bool:
+        """bool: Whether workers take a profile when they receive SIGUSR2."""
+        return self._model_server_profiling
+
+    @property
+    def model_server_profile_dir(self) -> str:
+        """str: Directory workers write their profiles to."""
+        return self._model_server_profile_dir
+
+    @property
+    def model_server_profile_seconds(self) -> int:
+        """int: Time, in seconds, during which a profile samples the stacks of a worker."""
+        return self._model_server_profile_seconds
+
+    @property
+    def model_server_memory_profiling(self) -> bool:
+        """bool: Whether workers account the memory used by the stages of requests."""
+        return self._model_server_memory_profiling
+
+    @property
+    def model_server_memory_sample_interval(self) -> int:
+        """int: Number of calls of a stage per call whose memory is measured."""
+        return self._model_server_memory_sample_interval
+
+    @property
+    def model_server_worker_max_rss(self) -> Optional[int]:
+        """int: Resident set size of a worker, in bytes, past which it is restarted."""
+        if self._model_server_worker_max_rss_in_mb is not None:
+            return self._model_server_worker_max_rss_in_mb * 1024 * 1024
+        return None
+
+    @property
+    def model_server_model_cache(self) -> bool:
+        """bool: Whether loading a model fails past a memory budget."""
+        return self._model_server_model_cache
+
+    @property
+    def model_server_model_cache_memory(self) -> int:
+        """int: Memory, in bytes, the models loaded by all workers may use."""
+        if self._model_server_model_cache_memory_in_mb is not None:
+            return self._model_server_model_cache_memory_in_mb * 1024 * 1024
+        return self.memory_budget.workers
+
+    @property
+    def model_server_prefetch(self) -> bool:
+        """bool: Whether the artifacts of unloaded models are prefetched while idle."""
+        return self._model_server_prefetch
+
+    @property
+    def model_server_prefetch_memory(self) -> int:
+        """int: Total size, in bytes, of the artifacts kept prefetched."""
+        return self._model_server_prefetch_memory_in_mb * 1024 * 1024
+
     @property
     def startup_timeout(self) -> int:
         """int: Timeout, in seconds, used for starting up the model server and fetching
@@ -176,3 +558,10 @@ class Environment(object):
             return int(self._max_request_size_in_mb) * 1024 * 1024
         else:
             return None
+
+    @property
+    def memory_budget(self) -> resources.MemoryBudget:
+        """MemoryBudget: Split of the container memory between the model server frontend
+        and the model workers, based on the container memory limit and the max request size.
+        """
+        return resources.memory_budget(self.max_request_size)
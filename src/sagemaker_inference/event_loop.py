@@ -0,0 +1,65 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""This module contains functionality for running coroutine handler functions
+on an event loop shared by all the requests of a worker process.
+"""
+from __future__ import absolute_import
+
+import asyncio
+import os
+import threading
+
+_lock = threading.Lock()
+# The loop of the current process. Threads do not survive a fork, so a worker
+# forked from a process that already started a loop starts its own.
+_loop = None
+_loop_pid = None
+
+
+def get_event_loop():
+    """Return the event loop of the worker process, starting it on first use.
+
+    The loop runs forever on a daemon thread, so coroutines of concurrent requests
+    interleave on it while they wait for I/O.
+
+    Returns:
+        asyncio.AbstractEventLoop: The event loop.
+    """
+    global _loop, _loop_pid  # pylint: disable=global-statement
+
+    with _lock:
+        if _loop is None or _loop_pid != os.getpid():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=loop.run_forever, name="sagemaker-inference-event-loop", daemon=True
+            )
+            thread.start()
+            _loop, _loop_pid = loop, os.getpid()
+        return _loop
+
+
+async def _wait(awaitable):
+    return await awaitable
+
+
+def run(awaitable):
+    """Run an awaitable on the worker event loop and wait for its result.
+
+    Args:
+        awaitable (Awaitable): The awaitable, e.g. the coroutine returned by an
+            ``async def`` handler function.
+
+    Returns:
+        obj: The result of the awaitable.
+    """
+    return asyncio.run_coroutine_threadsafe(_wait(awaitable), get_event_loop()).result()
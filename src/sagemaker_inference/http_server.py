@@ -0,0 +1,427 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""This module contains functionality for the Python serving backend, a
+lightweight alternative to the multi-model server.
+
+The serving process binds the inference port and forks the worker processes,
+which share the listening socket. Each worker runs an asyncio HTTP server and
+calls the handler service on a dedicated thread, so that reading and writing
+requests overlaps with inference.
+"""
+from __future__ import absolute_import
+
+import asyncio
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import importlib
+import inspect
+import json
+import os
+import signal
+import socket
+import sys
+import time
+
+from six.moves import http_client
+
+from sagemaker_inference import (
+    content_types,
+    drain,
+    environment,
+    logging,
+    profiler,
+    resources,
+)
+from sagemaker_inference.context import Context
+from sagemaker_inference.errors import GenericInferenceToolkitError
+
+logger = logging.get_logger()
+
+MODEL_NAME = "model"
+PING_PATH = "/ping"
+INVOCATIONS_PATH = "/invocations"
+# Maximum size of the request line and headers.
+MAX_HEADER_SIZE = 64 * 1024
+LISTEN_BACKLOG = 1024
+# Delay before replacing a worker that exited, so a worker failing on startup
+# does not spin the serving process.
+RESPAWN_DELAY = 1
+
+Request = collections.namedtuple(
+    "Request", ["method", "path", "headers", "body", "keep_alive", "arrival_time"], defaults=(None,)
+)
+Request.__doc__ = """An HTTP request read by a worker."""
+
+Response = collections.namedtuple("Response", ["status", "phrase", "content_type", "body"])
+Response.__doc__ = """An HTTP response written by a worker."""
+
+
+def load_handler_service(handler_service):
+    """Import a handler service module and instantiate its handler service.
+
+    As with the multi-model server, the module must define exactly one class.
+
+    Args:
+        handler_service (str): Python path of the handler service module.
+
+    Returns:
+        obj: The handler service.
+    """
+    module = importlib.import_module(handler_service)
+    classes = [
+        cls
+        for _, cls in inspect.getmembers(module, inspect.isclass)
+        if cls.__module__ == module.__name__
+    ]
+    if len(classes) != 1:
+        raise ValueError(
+            "Expected one class in handler service module {}, found {}".format(
+                handler_service, len(classes)
+            )
+        )
+    return classes[0]()
+
+
+async def read_request(reader, max_request_size=None):
+    """Read an HTTP/1.x request.
+
+    Args:
+        reader (asyncio.StreamReader): The connection to read from.
+        max_request_size (int): Maximum size of the request body, in bytes.
+
+    Returns:
+        Request: The request, or None if the client closed the connection.
+    """
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if e.partial.strip():
+            raise GenericInferenceToolkitError(http_client.BAD_REQUEST, "Incomplete request")
+        return None
+    except asyncio.LimitOverrunError:
+        raise GenericInferenceToolkitError(
+            http_client.REQUEST_HEADER_FIELDS_TOO_LARGE, "Request headers are too large"
+        )
+    arrival_time = time.time()
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise GenericInferenceToolkitError(http_client.BAD_REQUEST, "Malformed request line")
+
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip()] = value.strip()
+    lower_headers = {name.lower(): value for name, value in headers.items()}
+
+    if "chunked" in lower_headers.get("transfer-encoding", "").lower():
+        raise GenericInferenceToolkitError(
+            http_client.LENGTH_REQUIRED, "Chunked requests are not supported"
+        )
+
+    try:
+        content_length = int(lower_headers.get("content-length", "0"))
+    except ValueError:
+        content_length = -1
+    if content_length < 0:
+        raise GenericInferenceToolkitError(http_client.BAD_REQUEST, "Invalid Content-Length")
+    if max_request_size is not None and content_length > max_request_size:
+        raise GenericInferenceToolkitError(
+            http_client.REQUEST_ENTITY_TOO_LARGE, "Request body is too large"
+        )
+    body = await reader.readexactly(content_length)
+
+    connection = lower_headers.get("connection", "").lower()
+    if version == "HTTP/1.0":
+        keep_alive = connection == "keep-alive"
+    else:
+        keep_alive = connection != "close"
+
+    return Request(method, target.split("?", 1)[0], headers, body, keep_alive, arrival_time)
+
+
+async def write_response(writer, response, keep_alive=True):
+    """Write an HTTP/1.1 response.
+
+    Args:
+        writer (asyncio.StreamWriter): The connection to write to.
+        response (Response): The response.
+        keep_alive (bool): Whether the connection is kept open for further requests.
+    """
+    phrase = response.phrase or http_client.responses.get(response.status, "")
+    head = [
+        "HTTP/1.1 {} {}".format(response.status, phrase),
+        "Content-Length: {}".format(len(response.body)),
+        "Connection: {}".format("keep-alive" if keep_alive else "close"),
+    ]
+    if response.content_type:
+        head.append("Content-Type: {}".format(response.content_type))
+    writer.write("\r\n".join(head).encode("latin-1") + b"\r\n\r\n" + response.body)
+    await writer.drain()
+
+
+def _encode(data):
+    if isinstance(data, (bytes, bytearray)):
+        return bytes(data)
+    if isinstance(data, str):
+        return data.encode("utf-8")
+    return json.dumps(data).encode("utf-8")
+
+
+def _error_response(error):
+    return Response(error.status_code, error.phrase, None, error.message.encode("utf-8"))
+
+
+class Worker(object):
+    """Serves requests with an asyncio HTTP server, in a worker process."""
+
+    def __init__(self, service, env):
+        """Initialize a ``Worker``.
+
+        Args:
+            service (obj): The handler service.
+            env (Environment): The serving environment.
+        """
+        self._service = service
+        self._env = env
+        self._initialized = False
+        # Requests are handled one at a time unless more threads are configured, so
+        # that the handlers of concurrent requests can overlap while they wait for I/O.
+        self._executor = ThreadPoolExecutor(max_workers=env.model_server_worker_threads)
+
+    @staticmethod
+    def _context(request_headers=None, arrival_times=None):
+        return Context(
+            MODEL_NAME,
+            environment.model_dir,
+            request_headers=request_headers,
+            arrival_times=arrival_times,
+        )
+
+    def initialize(self):
+        """Initialize the handler service, which loads the model."""
+        if not self._initialized:
+            self._service.initialize(self._context())
+            self._initialized = True
+
+    @staticmethod
+    def ping():
+        """Answer a health check.
+
+        Returns:
+            Response: Healthy, unless the server is draining.
+        """
+        if drain.is_draining():
+            return Response(
+                http_client.SERVICE_UNAVAILABLE, None, content_types.JSON, b'{"status": "Draining"}'
+            )
+        return Response(http_client.OK, None, content_types.JSON, b'{"status": "Healthy"}')
+
+    def invoke(self, request):
+        """Run an inference request through the handler service.
+
+        Args:
+            request (Request): The request.
+
+        Returns:
+            Response: The response set by the handler service.
+        """
+        context = self._context([request.headers], [request.arrival_time])
+        result = self._service.handle([{"body": request.body}], context)
+        status, phrase = context.get_response_status(0)
+        body = _encode(result[0]) if result else b""
+        return Response(status, phrase, context.get_response_content_type(0), body)
+
+    async def dispatch(self, request):
+        """Route a request.
+
+        Args:
+            request (Request): The request.
+
+        Returns:
+            Response: The response.
+        """
+        if request.path == PING_PATH:
+            return self.ping()
+        if request.path == INVOCATIONS_PATH and request.method == "POST":
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(self._executor, self.invoke, request)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.exception("failed to handle request")
+                return _error_response(
+                    GenericInferenceToolkitError(http_client.INTERNAL_SERVER_ERROR, str(e))
+                )
+        return _error_response(
+            GenericInferenceToolkitError(
+                http_client.NOT_FOUND, "Unknown path {} {}".format(request.method, request.path)
+            )
+        )
+
+    async def handle_connection(self, reader, writer):
+        """Serve the requests of a client connection until it is closed.
+
+        Args:
+            reader (asyncio.StreamReader): The connection to read from.
+            writer (asyncio.StreamWriter): The connection to write to.
+        """
+        try:
+            while True:
+                try:
+                    request = await read_request(reader, self._env.max_request_size)
+                except GenericInferenceToolkitError as e:
+                    await write_response(writer, _error_response(e), keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                response = await self.dispatch(request)
+                await write_response(writer, response, request.keep_alive)
+                if not request.keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, sock):
+        """Accept and serve connections on a listening socket, forever.
+
+        Args:
+            sock (socket.socket): The listening socket, shared with the other workers.
+        """
+        server = await asyncio.start_server(
+            self.handle_connection, sock=sock, limit=MAX_HEADER_SIZE
+        )
+        async with server:
+            await server.serve_forever()
+
+
+def _bind(port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("0.0.0.0", int(port)))
+    sock.listen(LISTEN_BACKLOG)
+    sock.setblocking(False)
+    return sock
+
+
+class ModelServer(object):
+    """Pre-forking model server: a serving process supervising worker processes
+    that share one listening socket.
+    """
+
+    def __init__(self, handler_service, env):
+        """Initialize a ``ModelServer``.
+
+        Args:
+            handler_service (str): Python path of the handler service module.
+            env (Environment): The serving environment.
+        """
+        self._handler_service = handler_service
+        self._env = env
+        self._worker = None
+        self._socket = None
+        self._workers = set()
+        self._stopping = False
+        self._profile_handler = None
+
+    def start(self):
+        """Start the workers and supervise them until the server is terminated."""
+        # Workers are forked rather than started as new interpreters, so the user
+        # code directory has to be importable from this process.
+        if environment.code_dir not in sys.path:
+            sys.path.insert(0, environment.code_dir)
+
+        self._socket = _bind(self._env.inference_http_port)
+        self._worker = Worker(load_handler_service(self._handler_service), self._env)
+
+        if self._env.model_server_preload_model is True:
+            if self._env.model_server_cpu_affinity:
+                # Workers must load the model after they are pinned, for it to be
+                # placed on the NUMA node of their CPUs.
+                logger.warning("model preloading is ignored with CPU affinity")
+            else:
+                self._worker.initialize()
+
+        signal.signal(signal.SIGTERM, self._terminate)
+        if self._env.model_server_profiling is True:
+            # The serving process forwards the signal to the workers. Workers restore
+            # the handler installed by a preloaded handler service, or ignore the
+            # signal until their handler service installs its own.
+            self._profile_handler = signal.signal(profiler.PROFILE_SIGNAL, self._forward_signal)
+            if self._profile_handler == signal.SIG_DFL:
+                self._profile_handler = signal.SIG_IGN
+
+        workers = self._env.model_server_worker_count or resources.cpu_count()
+        logger.info(
+            "starting %s workers listening on port %s", workers, self._env.inference_http_port
+        )
+        for _ in range(workers):
+            self._spawn()
+
+        self._supervise()
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker()
+        self._workers.add(pid)
+
+    def _run_worker(self):
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        if self._profile_handler is not None:
+            signal.signal(profiler.PROFILE_SIGNAL, self._profile_handler)
+        status = 0
+        try:
+            self._worker.initialize()
+            asyncio.run(self._worker.serve(self._socket))
+        except BaseException:  # pylint: disable=broad-except
+            logger.exception("worker %s failed", os.getpid())
+            status = 1
+        finally:
+            os._exit(status)  # pylint: disable=protected-access
+
+    def _supervise(self):
+        while self._workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            self._workers.discard(pid)
+            if self._stopping:
+                continue
+            logger.warning("worker %s exited with status %s, restarting it", pid, status)
+            time.sleep(RESPAWN_DELAY)
+            if not self._stopping:
+                self._spawn()
+
+    def _forward_signal(self, signo, frame):  # pylint: disable=unused-argument
+        for pid in self._workers:
+            try:
+                os.kill(pid, signo)
+            except OSError:
+                pass
+
+    def _terminate(self, signo, frame):  # pylint: disable=unused-argument
+        self._stopping = True
+        if self._env.model_server_drain_timeout > 0:
+            drain.drain(self._env.model_server_drain_timeout)
+        for pid in self._workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
@@ -0,0 +1,218 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""This module contains functionality for load testing a handler service in
+process, without a model server, a network or a container.
+
+Usage::
+
+    python -m sagemaker_inference.loadgen --model-dir model --payload request.json \\
+        --content-type application/json --concurrency 4 --requests 1000
+"""
+from __future__ import absolute_import
+
+import argparse
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import json
+import threading
+import time
+
+from sagemaker_inference import content_types, environment, http_server
+from sagemaker_inference.context import Context
+
+DEFAULT_HANDLER_SERVICE = "sagemaker_inference.default_handler_service"
+MODEL_NAME = "model"
+PERCENTILES = (50, 90, 99)
+
+LoadResult = collections.namedtuple("LoadResult", ["requests", "errors", "duration", "latencies"])
+LoadResult.__doc__ = """Outcome of a load test: the number of requests and of failed
+requests, the duration in seconds, and the latency of each call in seconds."""
+
+
+def percentile(values, p):
+    """Return a percentile of values, using the nearest rank.
+
+    Args:
+        values (list[float]): The values, sorted.
+        p (float): The percentile, between 0 and 100.
+
+    Returns:
+        float: The percentile, or None if there are no values.
+    """
+    if not values:
+        return None
+    rank = max(1, int(round(p / 100.0 * len(values))))
+    return values[min(rank, len(values)) - 1]
+
+
+def run(
+    service,
+    payloads,
+    content_type,
+    accept=None,
+    concurrency=1,
+    batch_size=1,
+    requests=100,
+    model_dir=None,
+):
+    """Call the ``handle`` method of an initialized handler service under load.
+
+    Args:
+        service (obj): The handler service.
+        payloads (list[bytes]): Request bodies, sent in turn.
+        content_type (str): The content type of the requests.
+        accept (str): The accept header of the requests. Defaults to the content type.
+        concurrency (int): Number of threads calling the handler service at once.
+        batch_size (int): Number of requests passed to each call, as the multi-model
+            server does with batching enabled.
+        requests (int): Total number of requests, rounded up to whole batches.
+        model_dir (str): The model directory in the request context.
+
+    Returns:
+        LoadResult: The number of requests, errors, duration and latencies.
+    """
+    model_dir = model_dir or environment.model_dir
+    headers = {"Content-Type": content_type, "Accept": accept or content_type}
+    bodies = itertools.cycle(payloads)
+    lock = threading.Lock()
+    calls = -(-requests // batch_size)
+
+    def call(_):
+        with lock:
+            data = [{"body": next(bodies)} for _ in range(batch_size)]
+        context = Context(
+            MODEL_NAME,
+            model_dir,
+            batch_size=batch_size,
+            request_headers=[dict(headers) for _ in range(batch_size)],
+        )
+        start = time.perf_counter()
+        service.handle(data, context)
+        latency = time.perf_counter() - start
+        errors = sum(1 for i in range(batch_size) if context.get_response_status(i)[0] >= 400)
+        return latency, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(call, range(calls)))
+    duration = time.perf_counter() - start
+
+    return LoadResult(
+        requests=calls * batch_size,
+        errors=sum(errors for _, errors in outcomes),
+        duration=duration,
+        latencies=[latency for latency, _ in outcomes],
+    )
+
+
+def summarize(result):
+    """Summarize a load test.
+
+    Args:
+        result (LoadResult): The outcome of the load test.
+
+    Returns:
+        dict: The number of requests and errors, the throughput in requests per second,
+            and the latency percentiles and maximum of calls, in milliseconds.
+    """
+    latencies = sorted(result.latencies)
+    summary = {
+        "requests": result.requests,
+        "errors": result.errors,
+        "throughput": result.requests / result.duration if result.duration else None,
+    }
+    for p in PERCENTILES:
+        value = percentile(latencies, p)
+        summary["p{}_ms".format(p)] = value * 1000.0 if value is not None else None
+    summary["max_ms"] = latencies[-1] * 1000.0 if latencies else None
+    return summary
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m sagemaker_inference.loadgen",
+        description="Load test a handler service in process.",
+    )
+    parser.add_argument(
+        "--handler-service",
+        default=DEFAULT_HANDLER_SERVICE,
+        help="Python path of the handler service module (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--model-dir",
+        default=environment.model_dir,
+        help="Model directory (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--payload",
+        action="append",
+        required=True,
+        help="File holding a request body. Repeat to send several bodies in turn.",
+    )
+    parser.add_argument(
+        "--content-type",
+        default=content_types.JSON,
+        help="Content type of the requests (default: %(default)s).",
+    )
+    parser.add_argument("--accept", help="Accept header (default: the content type).")
+    parser.add_argument(
+        "--concurrency", type=int, default=1, help="Concurrent callers (default: %(default)s)."
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=1, help="Requests per call (default: %(default)s)."
+    )
+    parser.add_argument(
+        "--requests", type=int, default=1000, help="Requests to send (default: %(default)s)."
+    )
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=10,
+        help="Requests sent before measuring (default: %(default)s).",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Load test a handler service and print a summary as JSON.
+
+    Args:
+        argv (list[str]): The command line arguments. Defaults to ``sys.argv``.
+    """
+    args = _parse_args(argv)
+
+    payloads = []
+    for path in args.payload:
+        with open(path, "rb") as f:
+            payloads.append(f.read())
+
+    service = http_server.load_handler_service(args.handler_service)
+    service.initialize(Context(MODEL_NAME, args.model_dir))
+
+    options = dict(
+        content_type=args.content_type,
+        accept=args.accept,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        model_dir=args.model_dir,
+    )
+    if args.warmup > 0:
+        run(service, payloads, requests=args.warmup, **options)
+    result = run(service, payloads, requests=args.requests, **options)
+
+    print(json.dumps(summarize(result), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""This module contains functionality for accounting the memory used by the
+stages of inference requests, finding the code whose allocations grow, and
+recycling workers whose memory grows too large.
+"""
+from __future__ import absolute_import
+
+import os
+import signal
+import threading
+import time
+import tracemalloc
+
+import psutil
+
+from sagemaker_inference import logging
+
+logger = logging.get_logger()
+
+# Number of allocation sites listed in each report.
+TOP_ALLOCATIONS = 10
+# Time, in seconds, left to the requests in flight to complete before a worker
+# over its memory limit exits.
+RECYCLE_GRACE = 1.0
+
+_process = None
+
+
+def rss():
+    """Return the resident set size of the current process.
+
+    Returns:
+        int: The resident set size, in bytes.
+    """
+    global _process  # pylint: disable=global-statement
+
+    if _process is None or _process.pid != os.getpid():
+        _process = psutil.Process()
+    return _process.memory_info().rss
+
+
+class MemoryTracker(object):
+    """Accounts the memory used by the stages of inference requests.
+
+    The resident set size and the memory traced by ``tracemalloc`` are measured
+    around one in ``sample_interval`` calls of each stage, to bound the cost of the
+    measurements. The deltas include the allocations of concurrent requests.
+    """
+
+    def __init__(self, sample_interval, report_interval):
+        """Initialize a ``MemoryTracker``, starting ``tracemalloc`` if needed.
+
+        Args:
+            sample_interval (int): Number of calls of a stage per measured call.
+            report_interval (float): Minimum time, in seconds, between two reports.
+        """
+        self._sample_interval = sample_interval
+        self._report_interval = report_interval
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {}
+        self._reported_at = time.monotonic()
+        self._snapshot = None
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def before(self, stage):
+        """Start measuring a call of a stage, if it is sampled.
+
+        Args:
+            stage (str): The stage, e.g. ``predict_fn``.
+
+        Returns:
+            (int, int): The resident set size and the traced memory before the call,
+                to pass to ``after``, or None if the call is not sampled.
+        """
+        with self._lock:
+            calls = self._calls.get(stage, 0)
+            self._calls[stage] = calls + 1
+        if calls % self._sample_interval != 0:
+            return None
+        return rss(), tracemalloc.get_traced_memory()[0]
+
+    def after(self, stage, before):
+        """Record the memory used by a sampled call of a stage.
+
+        Args:
+            stage (str): The stage, e.g. ``predict_fn``.
+            before ((int, int)): The value returned by ``before``.
+        """
+        rss_delta = rss() - before[0]
+        traced_delta = tracemalloc.get_traced_memory()[0] - before[1]
+        with self._lock:
+            samples, rss_total, traced_total = self._stats.get(stage, (0, 0, 0))
+            self._stats[stage] = (
+                samples + 1,
+                rss_total + rss_delta,
+                traced_total + traced_delta,
+            )
+
+    def summary(self):
+        """Return the average memory used by a call of each sampled stage.
+
+        Returns:
+            dict[str, dict[str, int]]: For each stage, the number of samples and the
+                average growth of the resident set size and of the traced memory, in bytes.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            stage: {
+                "samples": samples,
+                "rss_delta": rss_total // samples,
+                "traced_delta": traced_total // samples,
+            }
+            for stage, (samples, rss_total, traced_total) in sorted(stats.items())
+        }
+
+    def top_allocations(self, limit=TOP_ALLOCATIONS):
+        """Return the code whose allocations grew the most since the previous call.
+
+        Args:
+            limit (int): The number of allocation sites to return.
+
+        Returns:
+            list[str]: The allocation sites, with the size and growth of the memory
+                they hold, from the largest growth. The first call compares against
+                an empty snapshot.
+        """
+        snapshot = tracemalloc.take_snapshot()
+        if self._snapshot is None:
+            statistics = snapshot.statistics("lineno")
+        else:
+            statistics = snapshot.compare_to(self._snapshot, "lineno")
+        self._snapshot = snapshot
+        return [str(statistic) for statistic in statistics[:limit]]
+
+    def maybe_report(self):
+        """Log the memory used by each stage and the top allocation sites, if the
+        report interval has elapsed since the previous report.
+
+        Returns:
+            bool: Whether a report was logged.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._reported_at < self._report_interval:
+                return False
+            self._reported_at = now
+
+        logger.info(
+            "worker %s memory: rss %s bytes, per stage %s", os.getpid(), rss(), self.summary()
+        )
+        for allocation in self.top_allocations():
+            logger.info("worker %s allocations: %s", os.getpid(), allocation)
+        return True
+
+
+class Recycler(object):
+    """Terminates the worker once its resident set size exceeds a limit, so the
+    model server restarts it before it slows down from swapping.
+    """
+
+    def __init__(self, max_rss):
+        """Initialize a ``Recycler``.
+
+        Args:
+            max_rss (int): The resident set size, in bytes, past which the worker exits.
+        """
+        self._max_rss = max_rss
+        self._lock = threading.Lock()
+        self._recycling = False
+
+    def check(self):
+        """Schedule the exit of the worker if it uses too much memory.
+
+        The worker terminates itself with SIGTERM after a grace period, which lets the
+        responses to the requests in flight be sent.
+
+        Returns:
+            bool: Whether the worker is exiting.
+        """
+        if self._recycling:
+            return True
+        used = rss()
+        if used <= self._max_rss:
+            return False
+        with self._lock:
+            if self._recycling:
+                return True
+            self._recycling = True
+        logger.warning(
+            "worker %s uses %s bytes, over the limit of %s bytes, restarting it",
+            os.getpid(),
+            used,
+            self._max_rss,
+        )
+        timer = threading.Timer(RECYCLE_GRACE, os.kill, (os.getpid(), signal.SIGTERM))
+        timer.daemon = True
+        timer.start()
+        return True
@@ -0,0 +1,193 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""This module contains functionality for timing the stages of inference
+requests and aggregating the timings into latency histograms.
+"""
+from __future__ import absolute_import
+
+import bisect
+import threading
+import time
+
+from sagemaker_inference import logging
+
+logger = logging.get_logger()
+
+# Upper bounds, in seconds, of the histogram buckets: powers of two from about
+# 61 microseconds to 64 seconds, followed by an overflow bucket.
+DEFAULT_BUCKETS = tuple(2.0**exponent for exponent in range(-14, 7))
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def quantile(buckets, counts, q):
+    """Estimate a quantile from the counts of a histogram.
+
+    Args:
+        buckets (tuple[float]): The upper bounds of the buckets.
+        counts (list[int]): The number of values in each bucket, followed by the
+            number of values above the last bound.
+        q (float): The quantile, between 0 and 1.
+
+    Returns:
+        float: The upper bound of the bucket holding the quantile, the last bound if
+            the quantile is in the overflow bucket, or None if there are no values.
+    """
+    total = sum(counts)
+    if total == 0:
+        return None
+    rank = q * total
+    seen = 0
+    for bound, count in zip(buckets, counts):
+        seen += count
+        if seen >= rank:
+            return bound
+    return buckets[-1]
+
+
+class Histogram(object):
+    """Counts of values falling into fixed buckets, with their sum.
+
+    Observing a value costs a binary search and two additions, so that every request
+    can be timed without logging anything per request.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """Initialize a ``Histogram``.
+
+        Args:
+            buckets (tuple[float]): The sorted upper bounds of the buckets.
+        """
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Add a value to the histogram.
+
+        Args:
+            value (float): The value.
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self):
+        """Return the current counts and sum.
+
+        Returns:
+            (list[int], float): The number of values in each bucket, followed by the
+                number of values above the last bound, and the sum of the values.
+        """
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class StageMetrics(object):
+    """Latency histograms of the stages of inference requests, e.g. ``input_fn``.
+
+    The histograms are cumulative. They are summarized periodically over the values
+    observed since the previous summary, as multi-model server custom metrics when
+    available, and in the log otherwise.
+    """
+
+    def __init__(self, interval):
+        """Initialize a ``StageMetrics``.
+
+        Args:
+            interval (float): Minimum time, in seconds, between two summaries.
+        """
+        self._interval = interval
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._emitted = {}
+        self._emitted_at = time.monotonic()
+
+    def observe(self, stage, seconds):
+        """Record the duration of a stage.
+
+        Args:
+            stage (str): The stage, e.g. ``predict_fn``.
+            seconds (float): The duration, in seconds.
+        """
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, Histogram())
+        histogram.observe(seconds)
+
+    def histograms(self):
+        """Return the histogram of each stage observed so far.
+
+        Returns:
+            dict[str, Histogram]: The histograms, by stage.
+        """
+        with self._lock:
+            return dict(self._histograms)
+
+    def summary(self):
+        """Summarize the durations observed since the previous summary.
+
+        Returns:
+            dict[str, dict[str, float]]: For each stage with new values, their count and
+                estimated quantiles, in milliseconds, e.g. ``{"predict_fn": {"count": 3,
+                "p50": 2.0, "p90": 4.0, "p99": 4.0}}``.
+        """
+        summary = {}
+        for stage, histogram in sorted(self.histograms().items()):
+            counts, _ = histogram.snapshot()
+            previous = self._emitted.get(stage, [0] * len(counts))
+            self._emitted[stage] = counts
+            delta = [count - before for count, before in zip(counts, previous)]
+            if not any(delta):
+                continue
+            stats = {"count": sum(delta)}
+            for q in QUANTILES:
+                stats["p{}".format(int(q * 100))] = quantile(histogram.buckets, delta, q) * 1000.0
+            summary[stage] = stats
+        return summary
+
+    def maybe_emit(self, metrics_store, gauges=None):
+        """Emit a summary if the interval has elapsed since the previous one.
+
+        Args:
+            metrics_store (mms.metrics.metrics_store.MetricsStore): The custom metrics of
+                the request, or None to log the summary instead.
+            gauges (dict[str, float]): Other latencies to emit, in seconds.
+
+        Returns:
+            bool: Whether a summary was emitted.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._emitted_at < self._interval:
+                return False
+            self._emitted_at = now
+
+        summary = self.summary()
+        for name, seconds in sorted((gauges or {}).items()):
+            summary[name] = {"latency": seconds * 1000.0}
+
+        if metrics_store is None:
+            logger.info("stage latencies (ms): %s", summary)
+            return True
+
+        for stage, stats in summary.items():
+            for stat, value in stats.items():
+                name = "{}.{}".format(stage, stat)
+                if stat == "count":
+                    metrics_store.add_counter(name, value)
+                else:
+                    metrics_store.add_time(name, value)
+        return True
@@ -0,0 +1,219 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""This module contains functionality for bounding the memory used by the
+models loaded in multi-model mode.
+
+Each worker publishes the model it loaded, the memory the model took, and how
+often the model is used, in a file of its own, the same way the drain state is
+shared between processes. A worker which loads a model that would take the loaded
+models over the memory budget fails the load with ``MemoryError``, which the
+multi-model server answers with 507. That is the platform's signal to unload
+models of its choice before it loads the model again, so that the platform always
+knows which models are loaded.
+"""
+from __future__ import absolute_import
+
+import glob
+import json
+import os
+import shutil
+import threading
+import time
+
+import psutil
+
+from sagemaker_inference import logging
+
+logger = logging.get_logger()
+
+CACHE_DIR = os.path.join("/tmp", "sagemaker-inference", "models")
+FILE_PREFIX = "model-"
+FLUSH_INTERVAL = 1.0
+
+
+class ModelCache(object):
+    """Memory footprint and use of the model loaded by this worker, shared with the
+    other workers, and admission of new models within a memory budget.
+
+    A load counts as a miss of the model, and each request after the first one
+    served by a loaded model as a hit. The records of unloaded models are kept for
+    the hit rates, until the model server restarts.
+    """
+
+    def __init__(self, budget, cache_dir=CACHE_DIR, flush_interval=FLUSH_INTERVAL):
+        """Initialize a ``ModelCache``.
+
+        Args:
+            budget (int): The memory, in bytes, the models loaded by all workers may use,
+                or None to only record the models and their use.
+            cache_dir (str): The directory holding the records of all workers.
+            flush_interval (float): Time, in seconds, between two writes of the record
+                of this worker.
+        """
+        self._budget = budget
+        self._cache_dir = cache_dir
+        self._flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._record = None
+        self._dirty = False
+        self._pid = None
+
+    def loaded(self, model_name, footprint, model_dir=None):
+        """Record the model loaded by this worker, unless the loaded models would then
+        exceed the budget.
+
+        Args:
+            model_name (str): The name of the model.
+            footprint (int): The memory, in bytes, the worker used to load the model.
+            model_dir (str): The directory of the model artifacts.
+
+        Raises:
+            MemoryError: If the model does not fit in the budget next to the loaded
+                models.
+        """
+        if self._budget is not None:
+            used = sum(model["footprint"] for model in self.models().values())
+            if used + footprint > self._budget:
+                logger.info("model cache hit rates: %s", self.hit_rates())
+                raise MemoryError(
+                    "model {} takes {} bytes and the loaded models {} bytes, over the model "
+                    "cache budget of {} bytes".format(model_name, footprint, used, self._budget)
+                )
+
+        with self._lock:
+            self._record = {
+                "model": model_name,
+                "model_dir": model_dir,
+                "pid": os.getpid(),
+                "footprint": footprint,
+                "used_at": time.time(),
+                "requests": 0,
+            }
+            self._dirty = True
+        self.flush()
+
+    def used(self):
+        """Record a request served by the model of this worker."""
+        with self._lock:
+            if self._record is None:
+                return
+            self._start()
+            self._record["used_at"] = time.time()
+            self._record["requests"] += 1
+            self._dirty = True
+
+    def flush(self):
+        """Write the record of this worker to its file, if it changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            record = dict(self._record)
+            self._dirty = False
+        os.makedirs(self._cache_dir, exist_ok=True)
+        path = os.path.join(self._cache_dir, "{}{}.json".format(FILE_PREFIX, record["pid"]))
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, path)
+
+    def records(self):
+        """Return the records of all workers, with whether the worker is alive.
+
+        Returns:
+            list[dict]: The records.
+        """
+        return records(self._cache_dir)
+
+    def models(self):
+        """Return the models loaded by live workers.
+
+        Returns:
+            dict[str, dict]: For each model, the memory its workers used to load it, in bytes,
+                the time it was last used and its number of requests.
+        """
+        models = {}
+        for record in self.records():
+            if not record["alive"]:
+                continue
+            model = models.setdefault(
+                record["model"], {"footprint": 0, "used_at": 0.0, "requests": 0}
+            )
+            model["footprint"] += record["footprint"]
+            model["used_at"] = max(model["used_at"], record["used_at"])
+            model["requests"] += record["requests"]
+        return models
+
+    def hit_rates(self):
+        """Return the hit rate of each model, over the loads since the model server started.
+
+        Returns:
+            dict[str, float]: The share of the requests of each model served without
+                loading it, or None for a model without requests.
+        """
+        counts = {}
+        for record in self.records():
+            hits, misses = counts.get(record["model"], (0, 0))
+            if record["requests"] > 0:
+                hits += record["requests"] - 1
+                misses += 1
+            counts[record["model"]] = (hits, misses)
+        return {
+            name: float(hits) / (hits + misses) if hits + misses else None
+            for name, (hits, misses) in sorted(counts.items())
+        }
+
+    def _start(self):
+        if self._pid != os.getpid():
+            thread = threading.Thread(
+                target=self._run, name="sagemaker-inference-model-cache-flush", daemon=True
+            )
+            thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        event = threading.Event()
+        while not event.wait(self._flush_interval):
+            try:
+                self.flush()
+            except OSError:
+                logger.exception("failed to write the model cache record")
+
+
+def records(cache_dir=CACHE_DIR):
+    """Return the records of all workers, with whether the worker is alive.
+
+    Args:
+        cache_dir (str): The directory holding the records of all workers.
+
+    Returns:
+        list[dict]: The records.
+    """
+    result = []
+    for path in sorted(glob.glob(os.path.join(cache_dir, FILE_PREFIX + "*.json"))):
+        try:
+            with open(path) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            continue
+        record["alive"] = psutil.pid_exists(record["pid"])
+        result.append(record)
+    return result
+
+
+def reset(cache_dir=CACHE_DIR):
+    """Remove the records of the workers of a previous server.
+
+    Args:
+        cache_dir (str): The directory holding the records of all workers.
+    """
+    shutil.rmtree(cache_dir, ignore_errors=True)
@@ -19,6 +19,9 @@ import re
 import signal
 import subprocess
 import sys
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
 
 import boto3
 import pkg_resources
@@ -26,7 +29,19 @@ import psutil
 from retrying import retry
 
 import sagemaker_inference
-from sagemaker_inference import default_handler_service, environment, logging, utils
+from sagemaker_inference import (
+    default_handler_service,
+    drain,
+    environment,
+    http_server,
+    logging,
+    model_cache,
+    parameters,
+    prefetch,
+    prometheus,
+    resources,
+    utils,
+)
 from sagemaker_inference.environment import code_dir
 
 logging.configure_logger()
@@ -77,6 +92,26 @@ def start_model_server(handler_service=DEFAULT_HANDLER_SERVICE):
 
     env = environment.Environment()
 
+    # A server restarted on the same filesystem must not inherit the draining marker.
+    drain.reset()
+
+    if env.model_server_prometheus_metrics is True:
+        _start_metrics_exporter(env)
+
+    if env.model_server_model_cache is True or env.model_server_prefetch is True:
+        if not ENABLE_MULTI_MODEL:
+            logger.warning("the model cache and prefetching only apply in multi-model mode")
+        model_cache.reset()
+
+    if env.model_server_prefetch is True and ENABLE_MULTI_MODEL:
+        prefetch.Prefetcher(env.model_server_prefetch_memory).start()
+
+    if env.model_server_backend == environment.PYTHON_BACKEND:
+        if not ENABLE_MULTI_MODEL:
+            _start_python_model_server(env, handler_service)
+            return
+        logger.warning("the python backend does not support multi-model mode, using mms")
+
     # Note: multi-model default config already sets default_service_handler
     handler_service_for_config = None if ENABLE_MULTI_MODEL else handler_service
     _create_model_server_config_file(env, handler_service_for_config)
@@ -94,7 +129,8 @@ def start_model_server(handler_service=DEFAULT_HANDLER_SERVICE):
         "--log-config",
         DEFAULT_MMS_LOG_FILE,
     ]
-    if not ENABLE_MULTI_MODEL:
+    register_model = _batching_enabled(env)
+    if not ENABLE_MULTI_MODEL and not register_model:
         multi_model_server_cmd += ["--models", DEFAULT_MMS_MODEL_NAME + "=" + environment.model_dir]
 
     logger.info(multi_model_server_cmd)
@@ -106,9 +142,32 @@ def start_model_server(handler_service=DEFAULT_HANDLER_SERVICE):
     _add_sigterm_handler(mms_process)
     _add_sigchild_handler()
 
+    if register_model:
+        _retry_register_model(env)
+
     mms_process.wait()
 
 
+def _start_metrics_exporter(env):
+    port = prometheus.exporter_port(env.safe_port_range)
+    if port is None:
+        logger.warning("exporting metrics requires SAGEMAKER_SAFE_PORT_RANGE, not exporting")
+        return
+    prometheus.reset()
+    prometheus.start_exporter(port)
+
+
+def _start_python_model_server(env, handler_service):
+    if os.path.exists(REQUIREMENTS_PATH):
+        _install_requirements()
+
+    # Workers are forked from this process and inherit the thread limits.
+    if env.model_server_workers == environment.AUTO_WORKERS:
+        _auto_tune_workers(env)
+
+    http_server.ModelServer(handler_service, env).start()
+
+
 # Note: this legacy function is still here for backwards compatibility.
 # It should not normally need to be used, since the model artifact can be used
 # straight from the original model directory
@@ -155,19 +214,69 @@ def _create_model_server_config_file(env, handler_service=None):
     utils.write_file(MMS_CONFIG_FILE, configuration_properties)
 
 
+def _auto_tune_workers(env):
+    workers = env.model_server_worker_count
+    if ENABLE_MULTI_MODEL:
+        # Each loaded model gets its own set of workers and the number of models is not
+        # known up front, so workers cannot share the CPUs out between them.
+        threads = 1
+    else:
+        threads = max(1, resources.cpu_count() // workers)
+    logger.info(
+        "auto-tuned model server workers: %s workers, %s threads per worker", workers, threads
+    )
+    resources.set_thread_limits(threads)
+    return workers
+
+
+def _container_vmargs(budget):
+    vmargs = "{} -Xmx{}m -XX:MaxDirectMemorySize={}m".format(
+        environment.DEFAULT_VMARGS,
+        budget.jvm_heap // resources.MB,
+        budget.jvm_direct_memory // resources.MB,
+    )
+    logger.info(
+        "memory budget: %sm total, %sm JVM heap, %sm JVM direct memory, %sm left for workers",
+        budget.total // resources.MB,
+        budget.jvm_heap // resources.MB,
+        budget.jvm_direct_memory // resources.MB,
+        budget.workers // resources.MB,
+    )
+    return vmargs
+
+
 def _generate_mms_config_properties(env, handler_service=None):
+    vmargs = env.vmargs
+    if parameters.MODEL_SERVER_VMARGS not in os.environ:
+        vmargs = _container_vmargs(env.memory_budget)
+
+    model_server_workers = env.model_server_workers
+    if model_server_workers == environment.AUTO_WORKERS:
+        model_server_workers = _auto_tune_workers(env)
+
     user_defined_configuration = {
         "default_response_timeout": env.model_server_timeout,
-        "default_workers_per_model": env.model_server_workers,
+        "default_workers_per_model": model_server_workers,
         "inference_address": "http://0.0.0.0:{}".format(env.inference_http_port),
         "management_address": "http://0.0.0.0:{}".format(env.management_http_port),
-        "vmargs": env.vmargs,
+        "vmargs": vmargs,
         "max_request_size": env.max_request_size,
+        "number_of_netty_threads": env.model_server_netty_threads,
+        "netty_client_threads": env.model_server_netty_client_threads,
+        "job_queue_size": env.model_server_job_queue_size,
     }
     # If provided, add handler service to user config
     if handler_service:
         user_defined_configuration["default_service_handler"] = handler_service
 
+    if env.model_server_preload_model is True:
+        if env.model_server_cpu_affinity:
+            # Workers forked from the process that loaded the model would all inherit
+            # its CPU slot, and must load the model after they are pinned anyway.
+            logger.warning("model preloading is ignored with CPU affinity")
+        else:
+            user_defined_configuration["preload_model"] = "true"
+
     if env.model_server_timeout_seconds:
         user_defined_configuration[
             "default_response_timeout_seconds"
@@ -190,6 +299,9 @@ def _generate_mms_config_properties(env, handler_service=None):
 
 def _add_sigterm_handler(mms_process):
     def _terminate(signo, frame):  # pylint: disable=unused-argument
+        drain_timeout = environment.Environment().model_server_drain_timeout
+        if drain_timeout > 0:
+            drain.drain(drain_timeout)
         try:
             os.kill(mms_process.pid, signal.SIGTERM)
         except OSError:
@@ -269,6 +381,62 @@ def _retry_retrieve_mms_server_process(startup_timeout):
     return retrieve_mms_server_process()
 
 
+def _batching_enabled(env):
+    """The model server only takes batch settings when a model is registered through
+    its management API, so batching requires registering the model after startup.
+    In multi-model mode, models are registered by the platform instead.
+    """
+    batch_size = env.model_server_batch_size
+    max_batch_delay = env.model_server_max_batch_delay
+
+    if batch_size is None and max_batch_delay is None:
+        return False
+    if ENABLE_MULTI_MODEL:
+        logger.warning("batch settings are ignored in multi-model mode")
+        return False
+    if batch_size is None:
+        logger.warning("max batch delay is ignored without a batch size")
+        return False
+    # The model server answers /ping as soon as it starts, before any model is
+    # registered, and there is no way to hold its health check back meanwhile.
+    logger.warning(
+        "with batching, the model is registered after the model server starts: until the "
+        "model is loaded, /ping reports the server healthy and /invocations returns 404"
+    )
+    return True
+
+
+def _register_model(env):
+    params = {
+        "url": environment.model_dir,
+        "model_name": DEFAULT_MMS_MODEL_NAME,
+        "initial_workers": env.model_server_worker_count or resources.cpu_count(),
+        "batch_size": env.model_server_batch_size,
+        "response_timeout": env.model_server_timeout,
+        "synchronous": "true",
+    }
+    if env.model_server_max_batch_delay is not None:
+        params["max_batch_delay"] = env.model_server_max_batch_delay
+
+    url = "http://127.0.0.1:{}/models?{}".format(env.management_http_port, urlencode(params))
+    logger.info("registering model: %s", url)
+    urlopen(Request(url, method="POST"), timeout=env.startup_timeout).close()
+
+
+def _is_connection_error(exception):
+    # HTTPError is a URLError, but means the server is up and rejected the request
+    return isinstance(exception, URLError) and not isinstance(exception, HTTPError)
+
+
+def _retry_register_model(env):
+    register_model = retry(
+        wait_fixed=1000,
+        stop_max_delay=env.startup_timeout * 1000,
+        retry_on_exception=_is_connection_error,
+    )(_register_model)
+    register_model(env)
+
+
 def _retrieve_mms_server_process():
     mms_server_processes = list()
 
@@ -27,3 +27,40 @@ BIND_TO_PORT_ENV = "SAGEMAKER_BIND_TO_PORT"  # type: str
 SAFE_PORT_RANGE_ENV = "SAGEMAKER_SAFE_PORT_RANGE"  # type: str
 MULTI_MODEL_ENV = "SAGEMAKER_MULTI_MODEL"  # type: str
 MAX_REQUEST_SIZE = "SAGEMAKER_MAX_PAYLOAD_IN_MB"  # type: str
+MODEL_SERVER_WORKER_MEMORY_ENV = "SAGEMAKER_MODEL_SERVER_WORKER_MEMORY_IN_MB"  # type: str
+MODEL_SERVER_CPU_AFFINITY_ENV = "SAGEMAKER_MODEL_SERVER_CPU_AFFINITY"  # type: str
+MODEL_SERVER_NETTY_THREADS_ENV = "SAGEMAKER_MODEL_SERVER_NETTY_THREADS"  # type: str
+MODEL_SERVER_NETTY_CLIENT_THREADS_ENV = "SAGEMAKER_MODEL_SERVER_NETTY_CLIENT_THREADS"  # type: str
+MODEL_SERVER_JOB_QUEUE_SIZE_ENV = "SAGEMAKER_MODEL_SERVER_JOB_QUEUE_SIZE"  # type: str
+MODEL_SERVER_BATCH_SIZE_ENV = "SAGEMAKER_MODEL_SERVER_BATCH_SIZE"  # type: str
+MODEL_SERVER_MAX_BATCH_DELAY_ENV = "SAGEMAKER_MODEL_SERVER_MAX_BATCH_DELAY"  # type: str
+MODEL_SERVER_DRAIN_TIMEOUT_ENV = "SAGEMAKER_MODEL_SERVER_DRAIN_TIMEOUT_SECONDS"  # type: str
+MODEL_SERVER_PRELOAD_MODEL_ENV = "SAGEMAKER_MODEL_SERVER_PRELOAD_MODEL"  # type: str
+MODEL_SERVER_BACKEND_ENV = "SAGEMAKER_MODEL_SERVER_BACKEND"  # type: str
+MODEL_SERVER_WORKER_THREADS_ENV = "SAGEMAKER_MODEL_SERVER_WORKER_THREADS"  # type: str
+MODEL_SERVER_PIPELINE_THREADS_ENV = "SAGEMAKER_MODEL_SERVER_PIPELINE_THREADS"  # type: str
+MODEL_SERVER_WORKER_BATCH_SIZE_ENV = "SAGEMAKER_MODEL_SERVER_WORKER_BATCH_SIZE"  # type: str
+MODEL_SERVER_WORKER_MAX_BATCH_DELAY_ENV = (
+    "SAGEMAKER_MODEL_SERVER_WORKER_MAX_BATCH_DELAY"
+)  # type: str
+MODEL_SERVER_LOW_PRIORITY_BATCH_SHARE_ENV = (
+    "SAGEMAKER_MODEL_SERVER_LOW_PRIORITY_BATCH_SHARE"
+)  # type: str
+MODEL_SERVER_REQUEST_DEADLINES_ENV = "SAGEMAKER_MODEL_SERVER_REQUEST_DEADLINES"  # type: str
+MODEL_SERVER_MAX_INFLIGHT_REQUESTS_ENV = "SAGEMAKER_MODEL_SERVER_MAX_INFLIGHT_REQUESTS"  # type: str
+MODEL_SERVER_MAX_LATENCY_ENV = "SAGEMAKER_MODEL_SERVER_MAX_LATENCY_MS"  # type: str
+MODEL_SERVER_STAGE_METRICS_ENV = "SAGEMAKER_MODEL_SERVER_STAGE_METRICS"  # type: str
+MODEL_SERVER_METRICS_INTERVAL_ENV = "SAGEMAKER_MODEL_SERVER_METRICS_INTERVAL_SECONDS"  # type: str
+MODEL_SERVER_PROMETHEUS_METRICS_ENV = "SAGEMAKER_MODEL_SERVER_PROMETHEUS_METRICS"  # type: str
+MODEL_SERVER_PROFILING_ENV = "SAGEMAKER_MODEL_SERVER_PROFILING"  # type: str
+MODEL_SERVER_PROFILE_DIR_ENV = "SAGEMAKER_MODEL_SERVER_PROFILE_DIR"  # type: str
+MODEL_SERVER_PROFILE_SECONDS_ENV = "SAGEMAKER_MODEL_SERVER_PROFILE_SECONDS"  # type: str
+MODEL_SERVER_MEMORY_PROFILING_ENV = "SAGEMAKER_MODEL_SERVER_MEMORY_PROFILING"  # type: str
+MODEL_SERVER_MEMORY_SAMPLE_INTERVAL_ENV = (
+    "SAGEMAKER_MODEL_SERVER_MEMORY_SAMPLE_INTERVAL"
+)  # type: str
+MODEL_SERVER_WORKER_MAX_RSS_ENV = "SAGEMAKER_MODEL_SERVER_WORKER_MAX_RSS_IN_MB"  # type: str
+MODEL_SERVER_MODEL_CACHE_ENV = "SAGEMAKER_MODEL_SERVER_MODEL_CACHE"  # type: str
+MODEL_SERVER_MODEL_CACHE_MEMORY_ENV = "SAGEMAKER_MODEL_SERVER_MODEL_CACHE_MEMORY_IN_MB"  # type: str
+MODEL_SERVER_PREFETCH_ENV = "SAGEMAKER_MODEL_SERVER_PREFETCH"  # type: str
+MODEL_SERVER_PREFETCH_MEMORY_ENV = "SAGEMAKER_MODEL_SERVER_PREFETCH_MEMORY_IN_MB"  # type: str
@@ -0,0 +1,206 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""This module contains functionality for prefetching the artifacts of the
+models most likely to be loaded next in multi-model mode.
+
+A model unloaded by the platform keeps its artifacts on disk, but they leave the
+page cache as other models are used, and loading the model again on its next
+invocation then waits on the disk. While no requests are served, the serving
+process reads the artifacts of the unloaded models with the best access history
+back into the page cache, within a budget.
+"""
+from __future__ import absolute_import
+
+import os
+import threading
+import time
+
+from sagemaker_inference import logging, model_cache, resources
+
+logger = logging.get_logger()
+
+# Time, in seconds, without requests after which the server is considered idle.
+IDLE_TIME = 5.0
+# Time, in seconds, between two checks for idle time.
+POLL_INTERVAL = 1.0
+# Time, in seconds, after which the weight of past requests of a model halves.
+HALF_LIFE = 3600.0
+READ_SIZE = 1024 * 1024
+
+
+def score(requests, used_at, now, half_life=HALF_LIFE):
+    """Rate how likely a model is to be requested next, from its access history.
+
+    Args:
+        requests (int): The number of requests served by the model.
+        used_at (float): The time the model was last used, in seconds since the epoch.
+        now (float): The current time, in seconds since the epoch.
+        half_life (float): Time, in seconds, after which the score halves.
+
+    Returns:
+        float: The score, higher for models used more often and more recently.
+    """
+    return (requests + 1) * 0.5 ** (max(0.0, now - used_at) / half_life)
+
+
+def warm(model_dir):
+    """Read the files of a model directory, so that they are in the page cache.
+
+    Args:
+        model_dir (str): The directory of the model artifacts.
+
+    Returns:
+        int: The number of bytes read.
+    """
+    buffer = bytearray(READ_SIZE)
+    total = 0
+    for root, _, files in os.walk(model_dir):
+        for name in files:
+            try:
+                with open(os.path.join(root, name), "rb", buffering=0) as f:
+                    read = f.readinto(buffer)
+                    while read:
+                        total += read
+                        read = f.readinto(buffer)
+            except OSError:
+                pass
+    return total
+
+
+class Prefetcher(object):
+    """Reads the artifacts of the unloaded models with the best scores into the page
+    cache while the server is idle.
+
+    The access history is the one recorded by the workers for the model cache.
+    Each model is read at most once while it is unloaded.
+    """
+
+    def __init__(
+        self,
+        budget,
+        cache_dir=model_cache.CACHE_DIR,
+        idle_time=IDLE_TIME,
+        interval=POLL_INTERVAL,
+    ):
+        """Initialize a ``Prefetcher``.
+
+        Args:
+            budget (int): The total size, in bytes, of the artifacts kept prefetched.
+            cache_dir (str): The directory holding the records of all workers.
+            idle_time (float): Time, in seconds, without requests before prefetching.
+            interval (float): Time, in seconds, between two checks for idle time.
+        """
+        self._budget = budget
+        self._cache_dir = cache_dir
+        self._idle_time = idle_time
+        self._interval = interval
+        self._prefetched = set()
+        self._sizes = {}
+
+    def candidates(self, records, now):
+        """Rank the unloaded models by score.
+
+        Args:
+            records (list[dict]): The records of all workers.
+            now (float): The current time, in seconds since the epoch.
+
+        Returns:
+            list[(str, str, float)]: The name, directory and score of each unloaded
+                model with artifacts on disk, from the highest score.
+        """
+        models = {}
+        loaded = set()
+        for record in records:
+            if record["alive"]:
+                loaded.add(record["model"])
+            model = models.setdefault(record["model"], {"requests": 0, "used_at": 0.0})
+            model["requests"] += record["requests"]
+            if record["used_at"] >= model["used_at"]:
+                model["used_at"] = record["used_at"]
+                model["model_dir"] = record.get("model_dir")
+
+        candidates = []
+        for name, model in models.items():
+            if name in loaded or not model["model_dir"] or not os.path.isdir(model["model_dir"]):
+                continue
+            candidates.append(
+                (name, model["model_dir"], score(model["requests"], model["used_at"], now))
+            )
+        return sorted(candidates, key=lambda candidate: -candidate[2])
+
+    def prefetch(self, now=None):
+        """Prefetch the best unloaded models that fit in the budget, if the server is idle.
+
+        Args:
+            now (float): The current time, in seconds since the epoch.
+
+        Returns:
+            list[str]: The models prefetched.
+        """
+        now = now if now is not None else time.time()
+        records = model_cache.records(self._cache_dir)
+
+        # A model loaded again is prefetched anew once it is unloaded.
+        for record in records:
+            if record["alive"]:
+                self._prefetched.discard(record["model"])
+
+        last_used = max([record["used_at"] for record in records if record["alive"]] or [0.0])
+        if now - last_used < self._idle_time:
+            return []
+
+        available = self._budget
+        selected = []
+        for name, model_dir, _ in self.candidates(records, now):
+            if model_dir not in self._sizes:
+                self._sizes[model_dir] = resources.directory_size(model_dir)
+            size = self._sizes[model_dir]
+            if size > available:
+                continue
+            available -= size
+            if name not in self._prefetched:
+                selected.append((name, model_dir))
+
+        prefetched = []
+        for name, model_dir in selected:
+            start = time.perf_counter()
+            read = warm(model_dir)
+            logger.info(
+                "prefetched model %s, %s bytes in %.3f seconds",
+                name,
+                read,
+                time.perf_counter() - start,
+            )
+            self._prefetched.add(name)
+            prefetched.append(name)
+        return prefetched
+
+    def start(self):
+        """Prefetch in a daemon thread for as long as the process runs.
+
+        Returns:
+            threading.Thread: The thread.
+        """
+        thread = threading.Thread(
+            target=self._run, name="sagemaker-inference-prefetch", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def _run(self):
+        event = threading.Event()
+        while not event.wait(self._interval):
+            try:
+                self.prefetch()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("failed to prefetch models")
@@ -0,0 +1,144 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""This module contains functionality for profiling live workers on demand,
+by sampling the stacks of their threads.
+
+A profile is a file in the collapsed stack format, one line per distinct stack
+with the number of samples in which it was seen, which flame graph tools such as
+``flamegraph.pl`` or speedscope read directly.
+"""
+from __future__ import absolute_import
+
+import collections
+import os
+import signal
+import sys
+import threading
+import time
+
+from sagemaker_inference import logging
+
+logger = logging.get_logger()
+
+PROFILE_SIGNAL = signal.SIGUSR2
+SAMPLE_INTERVAL = 0.005
+
+
+def _collapse(thread_name, frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append("{} ({})".format(code.co_name, code.co_filename))
+        frame = frame.f_back
+    stack.append(thread_name)
+    return ";".join(reversed(stack))
+
+
+class Profiler(object):
+    """Sampling profiler of the threads of a worker process.
+
+    Nothing runs until a profile is requested: a profile is taken by a thread which
+    samples the stacks of all other threads for a fixed duration and then exits.
+    """
+
+    def __init__(self, profile_dir, duration, interval=SAMPLE_INTERVAL):
+        """Initialize a ``Profiler``.
+
+        Args:
+            profile_dir (str): The directory to write profiles to.
+            duration (float): Time, in seconds, during which a profile samples stacks.
+            interval (float): Time, in seconds, between two samples.
+        """
+        self._profile_dir = profile_dir
+        self._duration = duration
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start taking a profile in the background, unless one is being taken.
+
+        Returns:
+            bool: Whether a profile was started.
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._thread = threading.Thread(
+                target=self.profile, name="sagemaker-inference-profiler", daemon=True
+            )
+            self._thread.start()
+        return True
+
+    def sample(self):
+        """Sample the stacks of all threads but the calling one for the profile duration.
+
+        Returns:
+            collections.Counter: The number of samples of each collapsed stack.
+        """
+        current = threading.get_ident()
+        names = {}
+        samples = collections.Counter()
+        deadline = time.monotonic() + self._duration
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():  # pylint: disable=protected-access
+                if ident == current:
+                    continue
+                if ident not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                samples[_collapse(names.get(ident, str(ident)), frame)] += 1
+            time.sleep(self._interval)
+        return samples
+
+    def profile(self):
+        """Take a profile and write it to the profile directory.
+
+        Returns:
+            str: The path of the profile.
+        """
+        logger.info("profiling worker %s for %s seconds", os.getpid(), self._duration)
+        samples = self.sample()
+
+        os.makedirs(self._profile_dir, exist_ok=True)
+        path = os.path.join(
+            self._profile_dir,
+            "profile-{}-{}.collapsed".format(os.getpid(), time.strftime("%Y%m%dT%H%M%S")),
+        )
+        with open(path, "w") as f:
+            for stack, count in samples.most_common():
+                f.write("{} {}\n".format(stack, count))
+        logger.info("wrote profile of worker %s to %s", os.getpid(), path)
+        return path
+
+
+def install(profiler, signo=PROFILE_SIGNAL):
+    """Take a profile whenever the process receives a signal.
+
+    Args:
+        profiler (Profiler): The profiler.
+        signo (int): The signal, SIGUSR2 by default.
+
+    Returns:
+        bool: Whether the signal handler was installed, which is only possible from
+            the main thread.
+    """
+
+    def handler(signum, frame):  # pylint: disable=unused-argument
+        profiler.start()
+
+    try:
+        signal.signal(signo, handler)
+    except ValueError:
+        logger.warning("profiling requires initializing the worker on its main thread")
+        return False
+    return True
@@ -0,0 +1,292 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""This module contains functionality for exporting worker metrics in the
+Prometheus text format.
+
+Each worker process counts into its own registry and periodically writes it to
+a file, and the serving process sums the files of all the workers when the
+metrics are scraped, the same way the drain state is shared between processes.
+"""
+from __future__ import absolute_import
+
+import glob
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import shutil
+import threading
+
+from sagemaker_inference import logging, metrics
+
+logger = logging.get_logger()
+
+METRICS_DIR = os.path.join("/tmp", "sagemaker-inference", "metrics")
+FILE_PREFIX = "metrics-"
+FLUSH_INTERVAL = 1.0
+METRICS_PATH = "/metrics"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+PREFIX = "sagemaker_inference_"
+REQUESTS = PREFIX + "requests_total"
+REQUEST_BYTES = PREFIX + "request_bytes_total"
+RESPONSE_BYTES = PREFIX + "response_bytes_total"
+ERRORS = PREFIX + "errors_total"
+BATCH_SIZE = PREFIX + "batch_size"
+WORKER_BATCH_SIZE = PREFIX + "worker_batch_size"
+STAGE_SECONDS = PREFIX + "stage_seconds"
+MODEL_LOADS = PREFIX + "model_loads_total"
+MODEL_REQUESTS = PREFIX + "model_requests_total"
+
+BATCH_SIZE_BUCKETS = tuple(2**exponent for exponent in range(0, 9))
+
+
+def _key(name, labels):
+    return name, tuple(sorted((labels or {}).items()))
+
+
+class Registry(object):
+    """Counters and histograms of a worker process, written to a file for the
+    serving process to export.
+
+    Threads do not survive a fork, so a worker forked from a process that already
+    started the flushing thread starts its own, with empty counters.
+    """
+
+    def __init__(self, metrics_dir=METRICS_DIR, flush_interval=FLUSH_INTERVAL):
+        """Initialize a ``Registry``.
+
+        Args:
+            metrics_dir (str): The directory holding the metrics of all processes.
+            flush_interval (float): Time, in seconds, between two writes of the metrics.
+        """
+        self._metrics_dir = metrics_dir
+        self._flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._dirty = False
+        self._pid = None
+
+    def inc(self, name, labels=None, value=1):
+        """Add to a counter.
+
+        Args:
+            name (str): The name of the counter.
+            labels (dict[str, str]): The labels of the counter.
+            value (float): The amount to add.
+        """
+        key = _key(name, labels)
+        with self._lock:
+            self._start()
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._dirty = True
+
+    def observe(self, name, value, labels=None, buckets=metrics.DEFAULT_BUCKETS):
+        """Add a value to a histogram.
+
+        Args:
+            name (str): The name of the histogram.
+            value (float): The value.
+            labels (dict[str, str]): The labels of the histogram.
+            buckets (tuple[float]): The upper bounds of the buckets of the histogram,
+                used when the histogram is first observed.
+        """
+        key = _key(name, labels)
+        with self._lock:
+            self._start()
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = metrics.Histogram(buckets)
+            self._dirty = True
+        histogram.observe(value)
+
+    def snapshot(self):
+        """Return the metrics in the format of the metrics files.
+
+        Returns:
+            dict: The counters and histograms.
+        """
+        with self._lock:
+            counters = list(self._counters.items())
+            histograms = list(self._histograms.items())
+            self._dirty = False
+        snapshot = {"counters": [], "histograms": []}
+        for (name, labels), value in counters:
+            snapshot["counters"].append([name, dict(labels), value])
+        for (name, labels), histogram in histograms:
+            counts, total = histogram.snapshot()
+            snapshot["histograms"].append(
+                [name, dict(labels), list(histogram.buckets), counts, total]
+            )
+        return snapshot
+
+    def flush(self):
+        """Write the metrics of this process to its file, if they changed."""
+        if not self._dirty:
+            return
+        os.makedirs(self._metrics_dir, exist_ok=True)
+        path = os.path.join(self._metrics_dir, "{}{}.json".format(FILE_PREFIX, os.getpid()))
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def _start(self):
+        if self._pid != os.getpid():
+            self._counters = {}
+            self._histograms = {}
+            thread = threading.Thread(
+                target=self._run, name="sagemaker-inference-metrics", daemon=True
+            )
+            thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        event = threading.Event()
+        while not event.wait(self._flush_interval):
+            try:
+                self.flush()
+            except OSError:
+                logger.exception("failed to write metrics")
+
+
+def reset(metrics_dir=METRICS_DIR):
+    """Remove the metrics of the processes of a previous server.
+
+    Args:
+        metrics_dir (str): The directory holding the metrics of all processes.
+    """
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{{{}}}".format(
+        ",".join(
+            '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+            for key, value in sorted(labels.items())
+        )
+    )
+
+
+def _format_bound(bound):
+    return repr(float(bound))
+
+
+def collect(metrics_dir=METRICS_DIR):
+    """Sum the metrics of all processes and format them for Prometheus.
+
+    Metrics of exited workers are kept, so that counters never decrease while the
+    server runs.
+
+    Args:
+        metrics_dir (str): The directory holding the metrics of all processes.
+
+    Returns:
+        str: The metrics in the Prometheus text exposition format.
+    """
+    counters = {}
+    histograms = {}
+    for path in sorted(glob.glob(os.path.join(metrics_dir, FILE_PREFIX + "*.json"))):
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, labels, value in snapshot["counters"]:
+            key = _key(name, labels)
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, buckets, counts, total in snapshot["histograms"]:
+            key = _key(name, labels)
+            if key not in histograms:
+                histograms[key] = [buckets, [0] * len(counts), 0.0]
+            summed = histograms[key]
+            summed[1] = [a + b for a, b in zip(summed[1], counts)]
+            summed[2] += total
+
+    lines = []
+    typed = set()
+    for (name, labels), value in sorted(counters.items()):
+        if name not in typed:
+            lines.append("# TYPE {} counter".format(name))
+            typed.add(name)
+        lines.append("{}{} {}".format(name, _format_labels(dict(labels)), value))
+    for (name, labels), (buckets, counts, total) in sorted(histograms.items()):
+        if name not in typed:
+            lines.append("# TYPE {} histogram".format(name))
+            typed.add(name)
+        cumulative = 0
+        for bound, count in zip(list(buckets) + ["+Inf"], counts):
+            cumulative += count
+            bucket_labels = dict(labels)
+            bucket_labels["le"] = bound if bound == "+Inf" else _format_bound(bound)
+            lines.append("{}_bucket{} {}".format(name, _format_labels(bucket_labels), cumulative))
+        lines.append("{}_sum{} {}".format(name, _format_labels(dict(labels)), total))
+        lines.append("{}_count{} {}".format(name, _format_labels(dict(labels)), cumulative))
+    return "\n".join(lines) + "\n"
+
+
+def exporter_port(safe_port_range):
+    """Return the port on which to export metrics.
+
+    Args:
+        safe_port_range (str): The range of ports free for the container to use,
+            e.g. ``1111-2222``.
+
+    Returns:
+        int: The first port of the range, or None if there is no range.
+    """
+    if not safe_port_range:
+        return None
+    return int(safe_port_range.split("-")[0])
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    metrics_dir = METRICS_DIR
+
+    def do_GET(self):  # noqa: N802 pylint: disable=invalid-name
+        """Serve the metrics of all processes."""
+        if self.path.split("?")[0] != METRICS_PATH:
+            self.send_error(404)
+            return
+        body = collect(self.metrics_dir).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+def start_exporter(port, metrics_dir=METRICS_DIR):
+    """Serve the metrics of all processes on ``/metrics`` from a daemon thread.
+
+    Args:
+        port (int): The port to listen on.
+        metrics_dir (str): The directory holding the metrics of all processes.
+
+    Returns:
+        http.server.ThreadingHTTPServer: The server.
+    """
+    handler = type("MetricsHandler", (_MetricsHandler,), {"metrics_dir": metrics_dir})
+    server = ThreadingHTTPServer(("0.0.0.0", port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(
+        target=server.serve_forever, name="sagemaker-inference-metrics-exporter", daemon=True
+    )
+    thread.start()
+    logger.info("exporting metrics on port %s", port)
+    return server
@@ -0,0 +1,264 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""This module contains functionality for discovering the CPU and memory
+resources available to the container, taking cgroup limits into account.
+"""
+from __future__ import absolute_import
+
+import collections
+import glob
+import os
+import re
+from typing import Dict, List, Optional
+
+import psutil
+
+from sagemaker_inference import logging
+
+logger = logging.get_logger()
+
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_CPU_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_CPU_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+CGROUP_V2_MEMORY_MAX = "/sys/fs/cgroup/memory.max"
+CGROUP_V1_MEMORY_LIMIT = "/sys/fs/cgroup/memory/memory.limit_in_bytes"
+NUMA_NODE_CPULIST = "/sys/devices/system/node/node*/cpulist"
+
+# Memory assumed for an idle Python worker (interpreter, numpy, scipy and the toolkit)
+# when estimating how many workers fit in the container.
+WORKER_BASE_MEMORY = 256 * 1024 * 1024
+
+MB = 1024 * 1024
+
+# Bounds of the heap of the model server frontend, before room is made for request payloads.
+MIN_JVM_HEAP = 256 * MB
+MAX_JVM_HEAP = 2048 * MB
+MIN_JVM_DIRECT_MEMORY = 128 * MB
+# Metaspace, code cache and thread stacks of the JVM, which are not part of the heap.
+JVM_OVERHEAD = 128 * MB
+# Number of request payloads of the maximum size the frontend can hold at once.
+JVM_PAYLOAD_BUFFERS = 4
+
+MemoryBudget = collections.namedtuple(
+    "MemoryBudget", ["total", "jvm_heap", "jvm_direct_memory", "jvm_overhead", "workers"]
+)
+MemoryBudget.__doc__ = """Split of the container memory between the model server frontend and the
+model workers, in bytes."""
+
+THREAD_LIMIT_ENVS = [
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+]
+
+
+def _read_sys_file(path):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except (IOError, OSError):
+        return None
+
+
+def cpu_quota() -> Optional[float]:
+    """Return the number of CPUs the container may use according to its cgroup CPU quota.
+
+    Returns:
+        float: The CPU quota, e.g. 2.5 for a quota of 250000us per 100000us period,
+            or None if no quota is set.
+    """
+    cpu_max = _read_sys_file(CGROUP_V2_CPU_MAX)
+    if cpu_max is not None:
+        fields = cpu_max.split()
+        if len(fields) == 2 and fields[0] != "max":
+            return int(fields[0]) / float(fields[1])
+        return None
+
+    quota = _read_sys_file(CGROUP_V1_CPU_QUOTA)
+    period = _read_sys_file(CGROUP_V1_CPU_PERIOD)
+    if quota is not None and period is not None and int(quota) > 0:
+        return int(quota) / float(period)
+    return None
+
+
+def allowed_cpus() -> List[int]:
+    """Return the ids of the CPUs the current process is allowed to run on.
+
+    Returns:
+        list[int]: Sorted CPU ids from the process affinity mask.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def parse_cpu_list(cpu_list: str) -> List[int]:
+    """Parse a kernel CPU list, e.g. ``0-3,8,10-11``.
+
+    Args:
+        cpu_list (str): The CPU list.
+
+    Returns:
+        list[int]: The CPU ids in the list.
+    """
+    cpus = []
+    for part in cpu_list.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-")
+            cpus.extend(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def numa_nodes() -> Dict[int, List[int]]:
+    """Return the CPUs of each NUMA node of the host.
+
+    Returns:
+        dict[int, list[int]]: CPU ids by NUMA node id. Empty if the topology
+            is not exposed by the kernel.
+    """
+    nodes = {}
+    for path in glob.glob(NUMA_NODE_CPULIST):
+        node = int(re.search(r"node(\d+)", path).group(1))
+        cpu_list = _read_sys_file(path)
+        if cpu_list:
+            nodes[node] = parse_cpu_list(cpu_list)
+    return nodes
+
+
+def cpu_count() -> int:
+    """Return the number of CPUs usable by the container.
+
+    This is the number of CPUs in the affinity mask, further bounded by the
+    cgroup CPU quota, if any.
+
+    Returns:
+        int: Number of usable CPUs, at least 1.
+    """
+    count = len(allowed_cpus())
+    quota = cpu_quota()
+    if quota is not None:
+        count = min(count, int(quota))
+    return max(1, count)
+
+
+def memory_limit() -> int:
+    """Return the memory available to the container, in bytes.
+
+    This is the physical memory of the host, further bounded by the cgroup
+    memory limit, if any.
+
+    Returns:
+        int: Memory limit in bytes.
+    """
+    limit = psutil.virtual_memory().total
+    for path in (CGROUP_V2_MEMORY_MAX, CGROUP_V1_MEMORY_LIMIT):
+        value = _read_sys_file(path)
+        if value is not None and value.isdigit():
+            limit = min(limit, int(value))
+            break
+    return limit
+
+
+def directory_size(path: str) -> int:
+    """Return the total size, in bytes, of the files under a directory.
+
+    Args:
+        path (str): The directory to measure.
+
+    Returns:
+        int: Total size of the regular files under ``path``.
+    """
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def auto_tune_workers(worker_memory=None, model_dir=None, available_memory=None):
+    """Choose a worker count and a per-worker thread budget for the container.
+
+    One worker is started per usable CPU, bounded by the number of workers whose
+    memory fits in the container. The CPUs are then split evenly between the
+    workers, so that ``workers * threads`` never exceeds the CPU count.
+
+    Args:
+        worker_memory (int): Expected memory footprint of a worker, in bytes. If not
+            provided, it is estimated from the size of the model artifacts.
+        model_dir (str): The directory containing the model artifacts.
+        available_memory (int): Memory available to the workers, in bytes. Defaults to
+            the container memory limit.
+
+    Returns:
+        (int, int): The number of workers and the number of threads per worker.
+    """
+    cpus = cpu_count()
+
+    if worker_memory is None:
+        worker_memory = WORKER_BASE_MEMORY
+        if model_dir is not None:
+            worker_memory += directory_size(model_dir)
+
+    if available_memory is None:
+        available_memory = memory_limit()
+
+    workers = max(1, min(cpus, available_memory // worker_memory))
+    threads = max(1, cpus // workers)
+    return workers, threads
+
+
+def memory_budget(max_request_size=None, total=None):
+    """Split the container memory between the model server frontend and the workers.
+
+    The frontend heap scales with the container memory within fixed bounds, and both
+    the heap and the direct memory used by Netty get room for several payloads of the
+    maximum request size. The remaining memory is left to the Python workers.
+
+    Args:
+        max_request_size (int): Maximum request size, in bytes.
+        total (int): Memory available to the container, in bytes. Defaults to the
+            container memory limit.
+
+    Returns:
+        MemoryBudget: The memory budget.
+    """
+    total = total if total is not None else memory_limit()
+    payloads = JVM_PAYLOAD_BUFFERS * (max_request_size or 0)
+
+    jvm_heap = min(max(total // 16, MIN_JVM_HEAP), MAX_JVM_HEAP) + payloads
+    jvm_direct_memory = max(MIN_JVM_DIRECT_MEMORY, payloads)
+    workers = max(0, total - jvm_heap - jvm_direct_memory - JVM_OVERHEAD)
+
+    return MemoryBudget(total, jvm_heap, jvm_direct_memory, JVM_OVERHEAD, workers)
+
+
+def set_thread_limits(threads: int) -> None:
+    """Export the intra-op thread budget for the numerical libraries used by the workers.
+
+    Values already set in the environment are left untouched.
+
+    Args:
+        threads (int): The number of threads each worker may use.
+    """
+    for name in THREAD_LIMIT_ENVS:
+        os.environ.setdefault(name, str(threads))
+        logger.info("%s=%s", name, os.environ[name])
@@ -16,7 +16,14 @@ requests.
 """
 from __future__ import absolute_import
 
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+import gc
 import importlib
+import inspect
+import os
+import threading
+import time
 import traceback
 
 try:
@@ -52,10 +59,28 @@ except ImportError:
 
 from six.moves import http_client
 
-from sagemaker_inference import content_types, environment, utils
+from sagemaker_inference import (
+    admission,
+    batching,
+    content_types,
+    deadline,
+    drain,
+    environment,
+    event_loop,
+    logging,
+    memory,
+    metrics,
+    model_cache,
+    parameters,
+    prometheus,
+    user_modules,
+    utils,
+)
 from sagemaker_inference.default_inference_handler import DefaultInferenceHandler
 from sagemaker_inference.errors import BaseInferenceToolkitError, GenericInferenceToolkitError
 
+logger = logging.get_logger()
+
 
 class Transformer(object):
     """Represents the execution workflow for handling inference requests
@@ -82,8 +107,23 @@ class Transformer(object):
         self._transform_fn = None
         self._input_fn = None
         self._predict_fn = None
+        self._batch_predict_fn = None
         self._output_fn = None
         self._context = None
+        self._inflight_requests = None
+        self._pipeline = None
+        self._batcher = None
+        self._request_timeout = None
+        self._admission = None
+        self._stage_metrics = None
+        self._registry = None
+        self._memory = None
+        self._recycler = None
+        self._model_cache = None
+        self._model_name = None
+        self._model_dir = None
+        # The deadline of the request handled by the current thread.
+        self._request = threading.local()
 
     @staticmethod
     def handle_error(context, inference_exception, trace):
@@ -117,12 +157,64 @@ class Transformer(object):
                 inference is successful. Otherwise returns an error message
                 with the context set appropriately.
         """
+        if self._admission is None:
+            return self._tracked_transform(data, context)
+
+        try:
+            admitted_at = self._admission.acquire(
+                getattr(context.request_processor[0], "arrival_time", None)
+            )
+        except BaseInferenceToolkitError as e:
+            return self._handle_error(context, e, "")
+        try:
+            return self._tracked_transform(data, context)
+        finally:
+            self._admission.release(admitted_at)
+
+    def _handle_error(self, context, inference_exception, trace):
+        if self._registry is not None:
+            self._registry.inc(prometheus.ERRORS, {"status": str(inference_exception.status_code)})
+        return self.handle_error(context, inference_exception, trace)
+
+    def _tracked_transform(self, data, context):
+        try:
+            with contextlib.ExitStack() as trackers:
+                for tracker in (self._inflight_requests, self._batcher):
+                    if tracker is not None:
+                        trackers.enter_context(tracker)
+                return self._transform(data, context)
+        finally:
+            if self._stage_metrics is not None:
+                self._emit_stage_metrics(context)
+            if self._memory is not None:
+                self._memory.maybe_report()
+            if self._recycler is not None:
+                self._recycler.check()
+
+    def _transform(self, data, context):
         try:
             properties = context.system_properties
             model_dir = properties.get("model_dir")
             self.validate_and_initialize(model_dir=model_dir, context=context)
+            self._record_model_use()
 
-            response_list = []
+            if self._inflight_requests is not None and drain.is_draining():
+                raise GenericInferenceToolkitError(
+                    http_client.SERVICE_UNAVAILABLE, "Model server is shutting down"
+                )
+
+            self._request.deadline = self._request_deadline(context)
+            deadline.check(self._request.deadline)
+            if self._batcher is not None:
+                self._request.priority = batching.parse_priority(
+                    utils.custom_attributes(context.request_processor[0].get_request_properties())
+                )
+
+            requests = []
+            if self._registry is not None:
+                self._registry.observe(
+                    prometheus.BATCH_SIZE, len(data), buckets=prometheus.BATCH_SIZE_BUCKETS
+                )
 
             for i in range(len(data)):
                 input_data = data[i].get("body")
@@ -136,13 +228,31 @@ class Transformer(object):
                 if not accept or accept == content_types.ANY:
                     accept = self._environment.default_accept
 
+                if self._registry is not None:
+                    labels = {"content_type": content_type or ""}
+                    self._registry.inc(prometheus.REQUESTS, labels)
+                    self._registry.inc(prometheus.REQUEST_BYTES, labels, _size(input_data))
+
                 if content_type in content_types.UTF8_TYPES:
                     input_data = input_data.decode("utf-8")
 
-                result = self._run_handler_function(
-                    self._transform_fn, *(self._model, input_data, content_type, accept)
-                )
+                requests.append((input_data, content_type, accept))
+
+            if (
+                self._pipeline is not None
+                and len(requests) > 1
+                and self._transform_fn == self._default_transform_fn
+            ):
+                results = self._pipelined_transform(requests)
+            else:
+                results = [
+                    self._run_stage("transform_fn", self._transform_fn, *((self._model,) + request))
+                    for request in requests
+                ]
+
+            response_list = []
 
+            for result, (_, _, accept) in zip(results, requests):
                 response = result
                 response_content_type = accept
 
@@ -152,6 +262,12 @@ class Transformer(object):
                     response_content_type = result[1]
 
                 context.set_response_content_type(0, response_content_type)
+                if self._registry is not None:
+                    self._registry.inc(
+                        prometheus.RESPONSE_BYTES,
+                        {"content_type": response_content_type or ""},
+                        _size(response),
+                    )
 
                 response_list.append(response)
 
@@ -159,9 +275,9 @@ class Transformer(object):
         except Exception as e:  # pylint: disable=broad-except
             trace = traceback.format_exc()
             if isinstance(e, BaseInferenceToolkitError):
-                return self.handle_error(context, e, trace)
+                return self._handle_error(context, e, trace)
             else:
-                return self.handle_error(
+                return self._handle_error(
                     context,
                     GenericInferenceToolkitError(http_client.INTERNAL_SERVER_ERROR, str(e)),
                     trace,
@@ -176,18 +292,190 @@ class Transformer(object):
         if not self._initialized:
             self._context = context
             self._environment = environment.Environment()
+            self._model_dir = model_dir
             self._validate_user_module_and_set_functions()
 
+            if self._environment.model_server_drain_timeout > 0:
+                self._inflight_requests = drain.InflightRequests()
+
+            pipeline_threads = self._environment.model_server_pipeline_threads
+            if pipeline_threads > 0:
+                self._pipeline = ThreadPoolExecutor(
+                    max_workers=pipeline_threads, thread_name_prefix="sagemaker-inference-pipeline"
+                )
+
+            if self._environment.model_server_request_deadlines is True:
+                self._request_timeout = (
+                    self._environment.model_server_timeout_seconds
+                    or self._environment.model_server_timeout
+                )
+
+            self._admission = self._create_admission()
+
+            if self._environment.model_server_stage_metrics is True:
+                self._stage_metrics = metrics.StageMetrics(
+                    self._environment.model_server_metrics_interval
+                )
+
+            if self._environment.model_server_prometheus_metrics is True:
+                self._registry = prometheus.Registry()
+
+            if self._environment.model_server_memory_profiling is True:
+                self._memory = memory.MemoryTracker(
+                    self._environment.model_server_memory_sample_interval,
+                    self._environment.model_server_metrics_interval,
+                )
+
+            if self._environment.model_server_worker_max_rss is not None:
+                self._recycler = memory.Recycler(self._environment.model_server_worker_max_rss)
+
+            self._model_cache = self._create_model_cache()
+
+            if self._environment.model_server_worker_batch_size is not None:
+                self._batcher = self._create_batcher()
+
+            # The interpreter and the user module are not part of the model footprint.
+            rss_before_load = memory.rss()
+
             if self._pre_model_fn is not None:
-                self._run_handler_function(self._pre_model_fn, *(model_dir,))
+                self._run_stage("pre_model_fn", self._pre_model_fn, *(model_dir,))
 
-            self._model = self._run_handler_function(self._model_fn, *(model_dir,))
+            self._model = self._run_stage("model_fn", self._model_fn, *(model_dir,))
 
             if self._model_warmup_fn is not None:
-                self._run_handler_function(self._model_warmup_fn, *(model_dir, self._model))
+                self._run_stage("model_warmup_fn", self._model_warmup_fn, *(model_dir, self._model))
+
+            if self._environment.model_server_preload_model is True:
+                self._freeze_model()
+
+            self._record_model_load(context, rss_before_load)
 
             self._initialized = True
 
+    def _request_deadline(self, context):
+        """Return the deadline of a request, or None if deadlines are not enforced.
+
+        The multi-model server does not pass on the time a request arrived, in which
+        case the deadline counts from the time the worker receives the request.
+        """
+        if self._request_timeout is None:
+            return None
+        request_processor = context.request_processor[0]
+        arrival_time = getattr(request_processor, "arrival_time", None) or time.time()
+        return deadline.request_deadline(
+            request_processor.get_request_properties(), arrival_time, self._request_timeout
+        )
+
+    def _emit_stage_metrics(self, context):
+        gauges = {}
+        if self._batcher is not None:
+            for priority, latency in self._batcher.latency.items():
+                gauges["batch_latency_{}".format(priority)] = latency
+        self._stage_metrics.maybe_emit(getattr(context, "metrics", None), gauges)
+
+    def _check_deadline(self):
+        deadline.check(getattr(self._request, "deadline", None))
+
+    def _create_admission(self):
+        """Create the admission controller, warning when its settings cannot shed load.
+
+        The multi-model server sends a worker one request at a time and does not pass
+        on the time requests arrived, so its workers cannot see the requests queued
+        ahead of them.
+        """
+        env = self._environment
+        max_inflight_requests = env.model_server_max_inflight_requests
+        max_latency = env.model_server_max_latency
+        if max_inflight_requests is None and max_latency is None:
+            return None
+
+        python_backend = (
+            env.model_server_backend == environment.PYTHON_BACKEND
+            and os.environ.get(parameters.MULTI_MODEL_ENV) != "true"
+        )
+        if not python_backend:
+            logger.warning(
+                "%s and %s have no effect with the multi-model server, which sends a worker "
+                "one request at a time; use the python backend to shed load",
+                parameters.MODEL_SERVER_MAX_INFLIGHT_REQUESTS_ENV,
+                parameters.MODEL_SERVER_MAX_LATENCY_ENV,
+            )
+        elif max_inflight_requests is not None and env.model_server_worker_threads <= 1:
+            logger.warning(
+                "%s has no effect with one worker thread, set %s",
+                parameters.MODEL_SERVER_MAX_INFLIGHT_REQUESTS_ENV,
+                parameters.MODEL_SERVER_WORKER_THREADS_ENV,
+            )
+
+        return admission.AdmissionController(
+            max_inflight_requests, max_latency / 1000.0 if max_latency else None
+        )
+
+    def _create_batcher(self):
+        if self._batch_predict_fn is None:
+            logger.warning("worker batching requires batch_predict_fn in the user module")
+            return None
+
+        def predict_batch(batch):
+            if self._registry is not None:
+                self._registry.observe(
+                    prometheus.WORKER_BATCH_SIZE, len(batch), buckets=prometheus.BATCH_SIZE_BUCKETS
+                )
+            return self._run_stage(
+                "batch_predict_fn", self._batch_predict_fn, *(batch, self._model)
+            )
+
+        return batching.Batcher(
+            predict_batch,
+            self._environment.model_server_worker_batch_size,
+            self._environment.model_server_worker_max_batch_delay / 1000.0,
+            self._environment.model_server_low_priority_batch_share,
+        )
+
+    def _create_model_cache(self):
+        """The model cache records the access history used for prefetching, and only
+        bounds the memory of the loaded models when it is enabled itself.
+        """
+        env = self._environment
+        if env.model_server_model_cache is not True and env.model_server_prefetch is not True:
+            return None
+        return model_cache.ModelCache(
+            env.model_server_model_cache_memory if env.model_server_model_cache is True else None
+        )
+
+    def _record_model_load(self, context, rss_before_load):
+        """Publish the memory the worker used to load the model.
+
+        If the loaded models would then exceed the memory budget, the load fails with
+        ``MemoryError``, which the multi-model server answers with 507.
+        """
+        if self._model_cache is None:
+            return
+        self._model_name = getattr(context, "model_name", None) or "model"
+        footprint = max(0, memory.rss() - rss_before_load)
+        self._model_cache.loaded(self._model_name, footprint, self._model_dir)
+        if self._registry is not None:
+            self._registry.inc(prometheus.MODEL_LOADS, {"model": self._model_name})
+
+    def _record_model_use(self):
+        if self._model_cache is None:
+            return
+        self._model_cache.used()
+        if self._registry is not None:
+            self._registry.inc(prometheus.MODEL_REQUESTS, {"model": self._model_name})
+
+    @staticmethod
+    def _freeze_model():
+        """Move the objects allocated so far, including the model, out of the reach of
+        the garbage collector.
+
+        When the model is preloaded, workers are forked from the process that loaded it
+        and share its memory copy-on-write. A garbage collection in a worker would write
+        to the header of every tracked object and unshare the pages holding them.
+        """
+        gc.collect()
+        gc.freeze()
+
     def _validate_user_module_and_set_functions(self):
         """Retrieves and validates the inference handlers provided within the user module.
 
@@ -202,9 +490,8 @@ class Transformer(object):
             self._default_inference_handler, "default_model_warmup_fn", None
         )
 
-        if find_spec(user_module_name) is not None:
-            user_module = importlib.import_module(user_module_name)
-
+        user_module = self._import_user_module(user_module_name)
+        if user_module is not None:
             self._model_fn = getattr(
                 user_module, "model_fn", self._default_inference_handler.default_model_fn
             )
@@ -212,6 +499,7 @@ class Transformer(object):
             transform_fn = getattr(user_module, "transform_fn", None)
             input_fn = getattr(user_module, "input_fn", None)
             predict_fn = getattr(user_module, "predict_fn", None)
+            batch_predict_fn = getattr(user_module, "batch_predict_fn", None)
             output_fn = getattr(user_module, "output_fn", None)
             pre_model_fn = getattr(user_module, "pre_model_fn", None)
             model_warmup_fn = getattr(user_module, "model_warmup_fn", None)
@@ -222,10 +510,17 @@ class Transformer(object):
                     "input_fn, predict_fn, and/or output_fn implementation"
                 )
 
+            if transform_fn and batch_predict_fn:
+                raise ValueError(
+                    "Cannot use transform_fn implementation in conjunction with "
+                    "batch_predict_fn implementation"
+                )
+
             self._transform_fn = transform_fn or self._default_transform_fn
             self._input_fn = input_fn or self._default_inference_handler.default_input_fn
             self._predict_fn = predict_fn or self._default_inference_handler.default_predict_fn
             self._output_fn = output_fn or self._default_inference_handler.default_output_fn
+            self._batch_predict_fn = batch_predict_fn
             if pre_model_fn is not None:
                 self._pre_model_fn = pre_model_fn
             if model_warmup_fn is not None:
@@ -238,6 +533,21 @@ class Transformer(object):
 
             self._transform_fn = self._default_transform_fn
 
+    def _import_user_module(self, module_name):
+        """Import the user module. In multi-model mode, it is imported from the code
+        directory of the model rather than by name, so that the modules of different
+        models do not collide.
+        """
+        if self._model_dir and os.environ.get(parameters.MULTI_MODEL_ENV) == "true":
+            user_module = user_modules.import_module(
+                module_name, os.path.join(self._model_dir, "code")
+            )
+            if user_module is not None:
+                return user_module
+        if find_spec(module_name) is not None:
+            return importlib.import_module(module_name)
+        return None
+
     def _default_transform_fn(self, model, input_data, content_type, accept, context=None):
         # pylint: disable=unused-argument
         """Make predictions against the model and return a serialized response.
@@ -256,15 +566,90 @@ class Transformer(object):
                 (response_data, content_type)
 
         """
-        data = self._run_handler_function(self._input_fn, *(input_data, content_type))
-        prediction = self._run_handler_function(self._predict_fn, *(data, model))
-        result = self._run_handler_function(self._output_fn, *(prediction, accept))
+        data = self._run_stage("input_fn", self._input_fn, *(input_data, content_type))
+        self._check_deadline()
+        prediction = self._predict(data, model)
+        self._check_deadline()
+        result = self._run_stage("output_fn", self._output_fn, *(prediction, accept))
         return result
 
+    def _predict(self, data, model):
+        """Make a prediction with ``predict_fn``, or with ``batch_predict_fn`` together
+        with the concurrent requests of the worker when batching is enabled.
+        """
+        if self._batcher is not None:
+            priority = getattr(self._request, "priority", batching.HIGH_PRIORITY)
+            return self._batcher.submit(data, priority)
+        return self._run_stage("predict_fn", self._predict_fn, *(data, model))
+
+    def _pipelined_transform(self, requests):
+        """Run the default transform_fn over the items of a batch, overlapping the
+        ``input_fn`` and ``output_fn`` of neighbouring items with ``predict_fn``.
+
+        ``predict_fn`` runs on the calling thread, one item at a time and in order,
+        while the pipeline threads decode the next items and encode the previous ones.
+
+        Args:
+            requests (list[tuple]): The input data, content type and accept of each item.
+
+        Returns:
+            list[obj]: The serialized prediction of each item.
+        """
+        decoded = [
+            self._pipeline.submit(
+                self._run_stage, "input_fn", self._input_fn, *(input_data, content_type)
+            )
+            for input_data, content_type, _ in requests
+        ]
+
+        encoded = []
+        for future, (_, _, accept) in zip(decoded, requests):
+            data = future.result()
+            self._check_deadline()
+            prediction = self._predict(data, self._model)
+            self._check_deadline()
+            encoded.append(
+                self._pipeline.submit(
+                    self._run_stage, "output_fn", self._output_fn, *(prediction, accept)
+                )
+            )
+
+        return [future.result() for future in encoded]
+
+    def _run_stage(self, stage, func, *argv):
+        """Run a handler function, timing it and accounting its memory as a stage when
+        stage metrics or memory profiling are enabled.
+
+        Args:
+            stage (str): The name of the stage, e.g. ``predict_fn``.
+            func (function): The handler function.
+            *argv: The arguments of the handler function, without the context.
+
+        Returns:
+            obj: The result of the handler function.
+        """
+        if self._stage_metrics is None and self._registry is None and self._memory is None:
+            return self._run_handler_function(func, *argv)
+        before = self._memory.before(stage) if self._memory is not None else None
+        start = time.perf_counter()
+        try:
+            return self._run_handler_function(func, *argv)
+        finally:
+            elapsed = time.perf_counter() - start
+            if before is not None:
+                self._memory.after(stage, before)
+            if self._stage_metrics is not None:
+                self._stage_metrics.observe(stage, elapsed)
+            if self._registry is not None:
+                self._registry.observe(prometheus.STAGE_SECONDS, elapsed, {"stage": stage})
+
     def _run_handler_function(self, func, *argv):
         """Helper to call the handler function which covers 2 cases:
         1. the handle function takes context
         2. the handle function does not take context
+
+        Coroutine functions, i.e. ``async def`` handlers, are run on the event loop
+        of the worker, so concurrent requests can overlap while they wait for I/O.
         """
         num_func_input = len(signature(func).parameters)
         if num_func_input == len(argv):
@@ -281,4 +666,14 @@ class Transformer(object):
                 )
             )
 
+        if inspect.isawaitable(result):
+            result = event_loop.run(result)
+
         return result
+
+
+def _size(data):
+    """Return the size of a request or response body, or 0 if it is not serialized."""
+    if isinstance(data, (bytes, bytearray, str)):
+        return len(data)
+    return 0
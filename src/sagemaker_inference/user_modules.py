@@ -0,0 +1,114 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""This module contains functionality for importing the user modules of the
+models served in multi-model mode.
+
+Every model has its own code directory, and all of them usually name their module
+``inference``. Importing it by name returns whichever module was imported first,
+so each user module is imported from its file under a name derived from a hash of
+the code directory instead. Models whose code is identical share one import.
+"""
+from __future__ import absolute_import
+
+import hashlib
+import importlib.util
+import os
+import sys
+import threading
+
+from sagemaker_inference import logging
+
+logger = logging.get_logger()
+
+MODULE_PREFIX = "sagemaker_inference_user_module_"
+HASH_LENGTH = 16
+
+_lock = threading.Lock()
+_modules = {}
+
+
+def code_hash(code_dir):
+    """Return a hash of the Python sources of a code directory.
+
+    Args:
+        code_dir (str): The code directory.
+
+    Returns:
+        str: The hexadecimal digest of the paths and contents of the ``.py`` files.
+    """
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(code_dir):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        for name in sorted(files):
+            if not name.endswith(".py"):
+                continue
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, code_dir).encode("utf-8"))
+            digest.update(b"\0")
+            with open(path, "rb") as f:
+                digest.update(f.read())
+            digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _source(module_name, code_dir):
+    if "." in module_name:
+        return None, None
+    package = os.path.join(code_dir, module_name, "__init__.py")
+    if os.path.isfile(package):
+        return package, [os.path.dirname(package)]
+    module = os.path.join(code_dir, module_name + ".py")
+    if os.path.isfile(module):
+        return module, None
+    return None, None
+
+
+def import_module(module_name, code_dir):
+    """Import a user module from a code directory, once per distinct code directory.
+
+    The code directory is added to ``sys.path``, once, so that the user module can
+    import the other modules next to it.
+
+    Args:
+        module_name (str): The name of the user module, e.g. ``inference``.
+        code_dir (str): The code directory of the model.
+
+    Returns:
+        module: The user module, or None if the code directory does not hold it.
+    """
+    path, search_locations = _source(module_name, code_dir)
+    if path is None:
+        return None
+
+    key = "{}{}_{}".format(MODULE_PREFIX, module_name, code_hash(code_dir)[:HASH_LENGTH])
+    with _lock:
+        module = _modules.get(key)
+        if module is not None:
+            logger.info("reusing user module %s imported from identical code", key)
+            return module
+
+        if code_dir not in sys.path:
+            sys.path.insert(0, code_dir)
+        spec = importlib.util.spec_from_file_location(
+            key, path, submodule_search_locations=search_locations
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[key] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[key]
+            raise
+        _modules[key] = module
+        logger.info("imported user module %s from %s as %s", module_name, path, key)
+        return module
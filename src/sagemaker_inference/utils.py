@@ -18,6 +18,9 @@ from __future__ import absolute_import
 import re
 
 CONTENT_TYPE_REGEX = re.compile("^[Cc]ontent-?[Tt]ype")
+# SageMaker passes this header through to the container unchanged.
+CUSTOM_ATTRIBUTES_HEADER = "X-Amzn-SageMaker-Custom-Attributes"
+CUSTOM_ATTRIBUTES_SEPARATOR = re.compile(r"[,;]")
 
 
 def read_file(path, mode="r"):
@@ -68,6 +71,26 @@ def retrieve_content_type_header(request_property):
     return None
 
 
+def custom_attributes(request_property):
+    """Parse the ``key=value`` pairs of the custom attributes of a request.
+
+    Args:
+        request_property (dict): The request headers.
+
+    Returns:
+        dict[str, str]: The attributes. Values of attributes without ``=`` are empty.
+    """
+    for name, value in request_property.items():
+        if name.lower() == CUSTOM_ATTRIBUTES_HEADER.lower():
+            attributes = {}
+            for attribute in CUSTOM_ATTRIBUTES_SEPARATOR.split(value):
+                key, _, attribute_value = attribute.partition("=")
+                if key.strip():
+                    attributes[key.strip()] = attribute_value.strip()
+            return attributes
+    return {}
+
+
 def parse_accept(accept):
     """Parses the Accept header sent with a request.
 
@@ -0,0 +1,74 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import io
+
+import numpy as np
+import pytest
+import scipy.sparse
+
+from sagemaker_inference import content_types, decoder, encoder
+from sagemaker_inference.default_inference_handler import DefaultInferenceHandler
+
+pytest.importorskip("pytest_benchmark")
+
+# Number of rows of 100 float32 features in the benchmarked payloads.
+ROWS = [1, 100, 10000]
+CONTENT_TYPES = [content_types.JSON, content_types.CSV, content_types.NPY]
+
+
+def _array(rows):
+    return np.random.RandomState(0).rand(rows, 100).astype(np.float32)
+
+
+@pytest.mark.parametrize("rows", ROWS)
+@pytest.mark.parametrize("content_type", CONTENT_TYPES)
+def test_decode(benchmark, content_type, rows):
+    payload = encoder.encode(_array(rows), content_type)
+    benchmark.group = "decode-{}".format(content_type)
+
+    benchmark(decoder.decode, payload, content_type)
+
+
+@pytest.mark.parametrize("rows", ROWS)
+def test_decode_npz(benchmark, rows):
+    matrix = scipy.sparse.random(rows, 100, density=0.1, format="csr", random_state=0)
+    buffer = io.BytesIO()
+    scipy.sparse.save_npz(buffer, matrix)
+    payload = buffer.getvalue()
+    benchmark.group = "decode-{}".format(content_types.NPZ)
+
+    benchmark(decoder.decode, payload, content_types.NPZ)
+
+
+@pytest.mark.parametrize("rows", ROWS)
+@pytest.mark.parametrize("content_type", CONTENT_TYPES)
+def test_encode(benchmark, content_type, rows):
+    array = _array(rows)
+    benchmark.group = "encode-{}".format(content_type)
+
+    benchmark(encoder.encode, array, content_type)
+
+
+@pytest.mark.parametrize(
+    "accept",
+    [
+        content_types.JSON,
+        "text/html,application/xhtml+xml,application/xml,{}".format(content_types.NPY),
+    ],
+)
+def test_accept_negotiation(benchmark, accept):
+    handler = DefaultInferenceHandler()
+    prediction = _array(1)
+    benchmark.group = "accept-negotiation"
+
+    benchmark(handler.default_output_fn, prediction, accept)
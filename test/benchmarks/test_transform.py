@@ -0,0 +1,95 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from sagemaker_inference import content_types, encoder, parameters
+from sagemaker_inference.context import Context
+from sagemaker_inference.default_handler_service import DefaultHandlerService
+from sagemaker_inference.default_inference_handler import DefaultInferenceHandler
+from sagemaker_inference.transformer import Transformer
+
+pytest.importorskip("pytest_benchmark")
+
+FEATURES = 100
+ROWS = [1, 100]
+CONTENT_TYPES = [content_types.JSON, content_types.CSV, content_types.NPY]
+
+
+class LinearInferenceHandler(DefaultInferenceHandler):
+    """Inference handler of a linear model, cheap enough for the benchmarks to
+    measure the toolkit rather than the model.
+    """
+
+    def default_model_fn(self, model_dir, context=None):
+        return np.random.RandomState(0).rand(FEATURES, 1).astype(np.float32)
+
+    def default_predict_fn(self, data, model, context=None):
+        return np.asarray(data, dtype=np.float32) @ model
+
+
+def _handler_service(tmpdir):
+    service = DefaultHandlerService(Transformer(LinearInferenceHandler()))
+    service.initialize(Context("model", str(tmpdir)))
+    return service
+
+
+def _request(content_type, rows):
+    array = np.random.RandomState(0).rand(rows, FEATURES).astype(np.float32)
+    body = encoder.encode(array, content_type)
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return [{"body": body}], {"Content-Type": content_type, "Accept": content_type}
+
+
+@pytest.mark.parametrize("rows", ROWS)
+@pytest.mark.parametrize("content_type", CONTENT_TYPES)
+def test_handle(benchmark, tmpdir, content_type, rows):
+    service = _handler_service(tmpdir)
+    data, headers = _request(content_type, rows)
+    benchmark.group = "handle-{}".format(content_type)
+
+    def handle():
+        return service.handle(data, Context("model", str(tmpdir), request_headers=[headers]))
+
+    result = benchmark(handle)
+
+    assert len(result) == 1
+
+
+@pytest.mark.parametrize(
+    "env",
+    [
+        None,
+        parameters.MODEL_SERVER_STAGE_METRICS_ENV,
+        parameters.MODEL_SERVER_PROMETHEUS_METRICS_ENV,
+        parameters.MODEL_SERVER_MEMORY_PROFILING_ENV,
+    ],
+)
+def test_handle_instrumented(benchmark, monkeypatch, tmpdir, env):
+    if env is not None:
+        monkeypatch.setenv(env, "true")
+    service = _handler_service(tmpdir)
+    data, headers = _request(content_types.JSON, 1)
+    benchmark.group = "handle-instrumented"
+
+    def handle():
+        return service.handle(data, Context("model", str(tmpdir), request_headers=[headers]))
+
+    try:
+        benchmark(handle)
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
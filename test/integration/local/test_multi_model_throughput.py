@@ -0,0 +1,213 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""Throughput harness for the dummy multi-model container, run on the host.
+
+The model server is started the same way as in the container, as a subprocess
+listening on localhost, with the handler of ``test/container/dummy``. The harness
+loads many copies of a model, invokes them concurrently and unloads them, and
+reports the load latency, the invocation throughput and the memory of the model
+server and its workers.
+
+It requires ``multi-model-server``, java, mxnet, a writable ``/etc`` and the
+artifacts of a model for the dummy handler, e.g. ``resnet_18`` as downloaded in
+``test/container/dummy/Dockerfile``, and is skipped otherwise. It is configured
+with the following environment variables:
+
+    MME_HARNESS_MODEL_DIR: directory of the model artifacts (default: /resnet_18).
+    MME_HARNESS_MODELS: number of models to load (default: 8).
+    MME_HARNESS_REQUESTS: number of invocations (default: 200).
+    MME_HARNESS_CONCURRENCY: number of concurrent invocations (default: 4).
+    MME_HARNESS_REPORT: file to write the report to, as JSON (default: none).
+"""
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import psutil
+import pytest
+
+from sagemaker_inference import loadgen, model_server
+
+requests = pytest.importorskip("requests")
+
+HANDLER = os.path.abspath("test/container/dummy/mme_handler_service.py") + ":handle"
+IMAGE = os.path.abspath("test/resources/data/cat.jpg")
+
+MODEL_DIR = os.getenv("MME_HARNESS_MODEL_DIR", "/resnet_18")
+MODELS = int(os.getenv("MME_HARNESS_MODELS", "8"))
+REQUESTS = int(os.getenv("MME_HARNESS_REQUESTS", "200"))
+CONCURRENCY = int(os.getenv("MME_HARNESS_CONCURRENCY", "4"))
+REPORT = os.getenv("MME_HARNESS_REPORT")
+
+STARTUP_TIMEOUT = 120
+MB = 1024 * 1024
+
+
+def _missing_requirement():
+    for command in ("multi-model-server", "java"):
+        if shutil.which(command) is None:
+            return "{} is not installed".format(command)
+    try:
+        import mxnet  # noqa: F401 pylint: disable=unused-import,import-outside-toplevel
+    except ImportError:
+        return "mxnet is not installed"
+    if not os.access("/etc", os.W_OK):
+        return "the model server configuration is written to /etc, which is not writable"
+    if not os.path.isdir(MODEL_DIR):
+        return "no model artifacts in {}".format(MODEL_DIR)
+    return None
+
+
+pytestmark = pytest.mark.skipif(_missing_requirement() is not None, reason=_missing_requirement())
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _rss(pid):
+    """Return the resident set size, in bytes, of the serving process, of the model
+    server, which is not necessarily its child, and of their descendants.
+    """
+    processes = {}
+    for root in (psutil.Process(pid), model_server._retrieve_mms_server_process()):
+        for process in [root] + root.children(recursive=True):
+            processes[process.pid] = process
+    total = 0
+    for process in processes.values():
+        try:
+            total += process.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass
+    return total
+
+
+@pytest.fixture(scope="module")
+def server():
+    port = _free_port()
+    env = dict(
+        os.environ,
+        SAGEMAKER_MULTI_MODEL="true",
+        SAGEMAKER_BIND_TO_PORT=str(port),
+        SAGEMAKER_HANDLER=HANDLER,
+    )
+    command = [
+        sys.executable,
+        "-c",
+        "from sagemaker_inference import model_server; model_server.start_model_server()",
+    ]
+    proc = subprocess.Popen(command, env=env, stdout=sys.stdout, stderr=subprocess.STDOUT)
+    base_url = "http://127.0.0.1:{}/".format(port)
+    try:
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            try:
+                requests.get(base_url + "ping", timeout=5)
+                break
+            except requests.ConnectionError:
+                if proc.poll() is not None or time.monotonic() > deadline:
+                    raise
+                time.sleep(1)
+        yield base_url, proc.pid
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            subprocess.call(["multi-model-server", "--stop"])
+
+
+def _timed(method, url, **kwargs):
+    start = time.perf_counter()
+    response = method(url, **kwargs)
+    return response, time.perf_counter() - start
+
+
+def _latencies(latencies):
+    latencies = sorted(latencies)
+    summary = {
+        "p{}_ms".format(p): loadgen.percentile(latencies, p) * 1000.0 for p in loadgen.PERCENTILES
+    }
+    summary["max_ms"] = latencies[-1] * 1000.0
+    return summary
+
+
+def test_multi_model_throughput(server):
+    base_url, pid = server
+    names = ["model_{}".format(i) for i in range(MODELS)]
+    report = {"models": MODELS, "rss_mb": {"idle": _rss(pid) / MB}}
+
+    load_latencies = []
+    rss_per_model = []
+    for name in names:
+        response, latency = _timed(
+            requests.post,
+            base_url + "models",
+            data=json.dumps({"model_name": name, "url": MODEL_DIR}),
+            headers={"Content-Type": "application/json"},
+        )
+        assert response.status_code == 200, response.text
+        load_latencies.append(latency)
+        rss_per_model.append(_rss(pid) / MB)
+    report["load"] = _latencies(load_latencies)
+    report["rss_mb"]["loaded"] = rss_per_model[-1]
+    report["rss_mb"]["per_model"] = (rss_per_model[-1] - report["rss_mb"]["idle"]) / MODELS
+
+    with open(IMAGE, "rb") as f:
+        payload = f.read()
+
+    def invoke(i):
+        response, latency = _timed(
+            requests.post,
+            base_url + "models/{}/invoke".format(names[i % MODELS]),
+            data=payload,
+            headers={"Content-Type": "application/x-image"},
+        )
+        return latency, response.status_code != 200
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+        outcomes = list(executor.map(invoke, range(REQUESTS)))
+    result = loadgen.LoadResult(
+        requests=REQUESTS,
+        errors=sum(error for _, error in outcomes),
+        duration=time.perf_counter() - start,
+        latencies=[latency for latency, _ in outcomes],
+    )
+    report["invoke"] = loadgen.summarize(result)
+    report["rss_mb"]["invoked"] = _rss(pid) / MB
+
+    unload_latencies = []
+    for name in names:
+        response, latency = _timed(requests.delete, base_url + "models/{}".format(name))
+        assert response.status_code == 200, response.text
+        unload_latencies.append(latency)
+    report["unload"] = _latencies(unload_latencies)
+    report["rss_mb"]["unloaded"] = _rss(pid) / MB
+
+    print(json.dumps(report, indent=2))
+    if REPORT:
+        with open(REPORT, "w") as f:
+            json.dump(report, f, indent=2)
+
+    assert result.errors == 0
+    assert requests.get(base_url + "models").json()["models"] == []
@@ -0,0 +1,77 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+from mock import patch
+import pytest
+from six.moves import http_client
+
+from sagemaker_inference import admission
+from sagemaker_inference.errors import GenericInferenceToolkitError
+
+
+def test_acquire_release():
+    controller = admission.AdmissionController(max_inflight_requests=2)
+
+    with patch("time.time", side_effect=[10.0, 10.5]):
+        admitted_at = controller.acquire()
+        assert controller.inflight == 1
+        controller.release(admitted_at)
+
+    assert controller.inflight == 0
+    assert controller.latency == 0.5
+
+
+def test_acquire_too_many_requests():
+    controller = admission.AdmissionController(max_inflight_requests=2)
+    controller.acquire()
+    controller.acquire()
+
+    with pytest.raises(GenericInferenceToolkitError) as e:
+        controller.acquire()
+
+    assert e.value.status_code == http_client.TOO_MANY_REQUESTS
+    assert controller.inflight == 2
+
+
+def test_acquire_overloaded():
+    controller = admission.AdmissionController(max_latency=0.1)
+    with patch("time.time", side_effect=[0.0, 1.0]):
+        controller.release(controller.acquire())
+
+    # the worker is idle, so the request is admitted to refresh the latency estimate
+    controller.acquire()
+
+    with pytest.raises(GenericInferenceToolkitError) as e:
+        controller.acquire()
+
+    assert e.value.status_code == http_client.SERVICE_UNAVAILABLE
+
+
+def test_latency_moving_average():
+    controller = admission.AdmissionController()
+    with patch("time.time", side_effect=[0.0, 1.0, 0.0, 2.0]):
+        controller.release(controller.acquire())
+        controller.release(controller.acquire())
+
+    assert controller.latency == pytest.approx(1.0 + admission.LATENCY_SMOOTHING)
+
+
+def test_acquire_queued_too_long():
+    controller = admission.AdmissionController(max_latency=0.1)
+
+    with patch("time.time", return_value=10.0):
+        with pytest.raises(GenericInferenceToolkitError) as e:
+            controller.acquire(arrival_time=9.5)
+        assert controller.acquire(arrival_time=9.95) == 10.0
+
+    assert e.value.status_code == http_client.SERVICE_UNAVAILABLE
+    assert controller.inflight == 1
@@ -0,0 +1,112 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import fcntl
+import os
+
+from mock import Mock, patch
+import pytest
+
+from sagemaker_inference import affinity, parameters
+
+
+@pytest.fixture(autouse=True)
+def release_slot():
+    yield
+    if affinity._slot_file is not None:
+        affinity._slot_file.close()
+    affinity._slot_file = None
+    affinity._slot = None
+
+
+def test_claim_worker_slot(tmpdir):
+    slot_dir = str(tmpdir)
+
+    held = open(str(tmpdir.join("slot-0")), "a")
+    fcntl.flock(held, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    # flock locks are per open file description, so the held slot is seen as taken
+    assert affinity.claim_worker_slot(4, slot_dir) == 1
+    assert affinity.claim_worker_slot(4, slot_dir) == 1
+
+    held.close()
+
+
+def test_claim_worker_slot_all_held(tmpdir):
+    slot_dir = str(tmpdir)
+
+    held = open(str(tmpdir.join("slot-0")), "a")
+    fcntl.flock(held, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    assert affinity.claim_worker_slot(1, slot_dir) is None
+
+    held.close()
+
+
+@pytest.mark.parametrize(
+    "slots, slot, expected",
+    [(4, 0, [0, 1]), (4, 3, [6, 7]), (3, 1, [2, 3, 4]), (16, 9, [1])],
+)
+def test_partition_cpus(slots, slot, expected):
+    assert affinity.partition_cpus(list(range(8)), slots, slot) == expected
+
+
+def test_partition_cpus_numa_order():
+    # CPUs are interleaved between the two nodes, as on many multi-socket hosts
+    nodes = {0: [0, 2, 4, 6], 1: [1, 3, 5, 7]}
+
+    assert affinity.partition_cpus(list(range(8)), 2, 0, nodes) == [0, 2, 4, 6]
+    assert affinity.partition_cpus(list(range(8)), 2, 1, nodes) == [1, 3, 5, 7]
+
+
+@patch("os.sched_setaffinity", create=True)
+@patch("sagemaker_inference.resources.numa_nodes", return_value={0: [0, 1], 1: [2, 3]})
+@patch("sagemaker_inference.resources.allowed_cpus", return_value=[0, 1, 2, 3])
+@patch("sagemaker_inference.affinity.claim_worker_slot", return_value=1)
+def test_pin_worker(claim_worker_slot, allowed_cpus, numa_nodes, sched_setaffinity):
+    env = Mock(model_server_worker_count=2)
+
+    cpus = affinity.pin_worker(env)
+
+    claim_worker_slot.assert_called_once_with(2)
+    sched_setaffinity.assert_called_once_with(0, [2, 3])
+    assert cpus == [2, 3]
+
+
+@patch("os.sched_setaffinity", create=True)
+@patch("sagemaker_inference.affinity.claim_worker_slot", return_value=None)
+def test_pin_worker_no_free_slot(claim_worker_slot, sched_setaffinity):
+    env = Mock(model_server_worker_count=2)
+
+    assert affinity.pin_worker(env) is None
+    sched_setaffinity.assert_not_called()
+
+
+@patch("os.sched_setaffinity", create=True)
+@patch("sagemaker_inference.affinity.claim_worker_slot")
+def test_pin_worker_default_workers(claim_worker_slot, sched_setaffinity):
+    env = Mock(model_server_worker_count=None)
+
+    assert affinity.pin_worker(env) is None
+    claim_worker_slot.assert_not_called()
+    sched_setaffinity.assert_not_called()
+
+
+@patch.dict(os.environ, {parameters.MULTI_MODEL_ENV: "true"})
+@patch("os.sched_setaffinity", create=True)
+@patch("sagemaker_inference.affinity.claim_worker_slot")
+def test_pin_worker_multi_model(claim_worker_slot, sched_setaffinity):
+    env = Mock(model_server_worker_count=2)
+
+    assert affinity.pin_worker(env) is None
+    claim_worker_slot.assert_not_called()
+    sched_setaffinity.assert_not_called()
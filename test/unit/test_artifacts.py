@@ -0,0 +1,210 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import io
+import json
+import os
+import struct
+import tarfile
+import zipfile
+
+from mock import patch
+import numpy as np
+import pytest
+
+from sagemaker_inference import artifacts
+
+
+def _write_safetensors(path, tensors, dtypes=None):
+    header = {"__metadata__": {"format": "np"}}
+    data = b""
+    for name, array in tensors.items():
+        raw = array.tobytes()
+        header[name] = {
+            "dtype": (dtypes or {}).get(name, "F32"),
+            "shape": list(array.shape),
+            "data_offsets": [len(data), len(data) + len(raw)],
+        }
+        data += raw
+    encoded = json.dumps(header).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(encoded)) + encoded + data)
+
+
+def test_load_npy(tmpdir):
+    path = str(tmpdir.join("w.npy"))
+    np.save(path, np.arange(6, dtype=np.float32).reshape(2, 3))
+
+    array = artifacts.load_npy(path)
+
+    assert isinstance(array, np.memmap)
+    assert not array.flags.writeable
+    np.testing.assert_array_equal(array, np.arange(6).reshape(2, 3))
+
+
+def test_load_safetensors(tmpdir):
+    path = str(tmpdir.join("model.safetensors"))
+    weight = np.arange(6, dtype=np.float32).reshape(2, 3)
+    bias = np.array([1, 2], dtype=np.int64)
+    _write_safetensors(path, {"weight": weight, "bias": bias}, {"bias": "I64"})
+
+    tensors = artifacts.load_safetensors(path)
+
+    assert sorted(tensors) == ["bias", "weight"]
+    np.testing.assert_array_equal(tensors["weight"], weight)
+    np.testing.assert_array_equal(tensors["bias"], bias)
+    assert tensors["bias"].dtype == np.int64
+    assert not tensors["weight"].flags.writeable
+
+
+def test_load_safetensors_unsupported_dtype(tmpdir):
+    path = str(tmpdir.join("model.safetensors"))
+    _write_safetensors(path, {"w": np.zeros(2, dtype=np.uint16)}, {"w": "BF16"})
+
+    with pytest.raises(ValueError) as e:
+        artifacts.load_safetensors(path)
+
+    assert "BF16" in str(e.value)
+
+
+def test_load_weights(tmpdir):
+    np.save(str(tmpdir.join("embedding.npy")), np.ones(3))
+    tmpdir.mkdir("layers")
+    np.save(str(tmpdir.join("layers", "dense.npy")), np.zeros(2))
+    _write_safetensors(str(tmpdir.join("head.safetensors")), {"head": np.ones(4, np.float32)})
+    tmpdir.join("config.json").write("{}")
+
+    weights = artifacts.load_weights(str(tmpdir))
+
+    assert sorted(weights) == ["embedding", "head", "layers/dense"]
+    assert weights["head"].shape == (4,)
+
+
+SHARDS = {"shards/a.bin": b"a" * 1000, "shards/b.bin": b"b" * 10, "config.json": b"{}"}
+
+
+def _write_tar(path, files, mode="w:gz"):
+    with tarfile.open(path, mode) as tar:
+        directory = tarfile.TarInfo("shards")
+        directory.type = tarfile.DIRTYPE
+        tar.addfile(directory)
+        for name, data in sorted(files.items()):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o640
+            tar.addfile(info, io.BytesIO(data))
+        link = tarfile.TarInfo("link")
+        link.type = tarfile.SYMTYPE
+        link.linkname = "/etc/passwd"
+        tar.addfile(link)
+
+
+def _read_tree(root):
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, root)] = f.read()
+    return files
+
+
+@pytest.mark.parametrize("mode", ["w", "w:gz", "w:bz2", "w:xz"])
+def test_extract_archive_tar(tmpdir, mode):
+    path = str(tmpdir.join("model.tar"))
+    _write_tar(path, SHARDS, mode)
+    target = str(tmpdir.join("model"))
+
+    stats = artifacts.extract_archive(path, target, threads=2)
+
+    assert _read_tree(target) == SHARDS
+    assert stats.files == 3
+    assert stats.bytes == 1012
+    assert stats.seconds > 0
+    assert os.stat(os.path.join(target, "config.json")).st_mode & 0o777 == 0o640
+
+
+def test_extract_archive_tar_large_member(tmpdir):
+    path = str(tmpdir.join("model.tar.gz"))
+    _write_tar(path, SHARDS)
+    target = str(tmpdir.join("model"))
+
+    with patch("sagemaker_inference.artifacts.MAX_BUFFERED_MEMBER", 100), patch(
+        "sagemaker_inference.artifacts.MAX_BUFFERED_BYTES", 5
+    ):
+        artifacts.extract_archive(path, target)
+
+    assert _read_tree(target) == SHARDS
+
+
+def test_extract_archive_zip(tmpdir):
+    path = str(tmpdir.join("model.zip"))
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("shards/", b"")
+        for name, data in SHARDS.items():
+            archive.writestr(name, data)
+    target = str(tmpdir.join("model"))
+
+    stats = artifacts.extract_archive(path, target, threads=2)
+
+    assert _read_tree(target) == SHARDS
+    assert (stats.files, stats.bytes) == (3, 1012)
+
+
+def test_extract_archive_outside_target(tmpdir):
+    path = str(tmpdir.join("model.tar"))
+    _write_tar(path, {"../escaped": b"x"}, "w")
+
+    with pytest.raises(ValueError) as e:
+        artifacts.extract_archive(path, str(tmpdir.join("model")))
+
+    assert "outside of" in str(e.value)
+    assert not tmpdir.join("escaped").exists()
+
+
+def test_extract_archives(tmpdir):
+    paths = []
+    for i in range(3):
+        path = str(tmpdir.join("shard-{}.tar.gz".format(i)))
+        _write_tar(path, {"shard-{}.bin".format(i): b"0" * (i + 1)})
+        paths.append(path)
+    target = str(tmpdir.join("model"))
+
+    stats = artifacts.extract_archives(paths, target)
+
+    assert _read_tree(target) == {"shard-0.bin": b"0", "shard-1.bin": b"00", "shard-2.bin": b"000"}
+    assert (stats.files, stats.bytes) == (3, 6)
+
+
+@patch("sagemaker_inference.artifacts._advise")
+def test_read_files(advise, tmpdir):
+    paths = []
+    for i in range(5):
+        path = str(tmpdir.join("shard-{}.bin".format(i)))
+        with open(path, "wb") as f:
+            f.write(bytes([i]) * (i + 1))
+        paths.append(path)
+
+    contents, stats = artifacts.read_files(paths, threads=2, read_ahead=2)
+
+    assert contents == {path: bytes([i]) * (i + 1) for i, path in enumerate(paths)}
+    assert (stats.files, stats.bytes) == (5, 15)
+    assert sorted(call[0][0] for call in advise.call_args_list) == paths
+
+
+def test_advise(tmpdir):
+    path = str(tmpdir.join("shard.bin"))
+    with open(path, "wb") as f:
+        f.write(b"0")
+
+    artifacts._advise(path)
+    artifacts._advise(str(tmpdir.join("missing.bin")))
@@ -0,0 +1,241 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import pytest
+
+from sagemaker_inference import batching
+
+
+def test_submit():
+    batcher = batching.Batcher(lambda items: [item * 2 for item in items], 4, 0.01)
+
+    assert batcher.submit(3) == 6
+
+
+def test_submit_batches_waiting_items():
+    batches = []
+    first_batch_started = threading.Event()
+    release_first_batch = threading.Event()
+
+    def predict_fn(items):
+        batches.append(items)
+        if len(batches) == 1:
+            first_batch_started.set()
+            release_first_batch.wait(5)
+        return [item * 2 for item in items]
+
+    batcher = batching.Batcher(predict_fn, 8, 0.01)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        first = executor.submit(batcher.submit, 0)
+        first_batch_started.wait(5)
+        others = [executor.submit(batcher.submit, item) for item in (1, 2, 3)]
+        while batcher.pending() < 3:
+            pass
+        release_first_batch.set()
+
+        assert first.result() == 0
+        assert [future.result() for future in others] == [2, 4, 6]
+
+    assert batches == [[0], [1, 2, 3]]
+
+
+def test_submit_respects_max_batch_size():
+    batcher = batching.Batcher(lambda items: items, 2, 0.01)
+    for item in range(3):
+        batcher._lanes[batching.HIGH_PRIORITY].append((item, None))
+
+    assert [item for item, _ in batcher._collect()] == [0, 1]
+    assert [item for item, _ in batcher._collect()] == [2]
+
+
+def test_collect_takes_high_priority_first():
+    batcher = batching.Batcher(lambda items: items, 4, 0.01)
+    batcher._lanes[batching.LOW_PRIORITY].extend([("low-0", None), ("low-1", None)])
+    batcher._lanes[batching.HIGH_PRIORITY].extend([("high-0", None), ("high-1", None)])
+
+    assert [item for item, _ in batcher._collect()] == ["high-0", "high-1", "low-0", "low-1"]
+
+
+def test_collect_caps_low_priority_share():
+    batcher = batching.Batcher(lambda items: items, 4, 0.01, low_priority_share=0.5)
+    batcher._lanes[batching.LOW_PRIORITY].extend([("low-{}".format(i), None) for i in range(4)])
+    batcher._lanes[batching.HIGH_PRIORITY].append(("high-0", None))
+
+    assert [item for item, _ in batcher._collect()] == ["high-0", "low-0", "low-1"]
+    assert [item for item, _ in batcher._collect()] == ["low-2", "low-3"]
+
+
+def test_collect_allows_one_low_priority_item():
+    batcher = batching.Batcher(lambda items: items, 4, 0.01, low_priority_share=0)
+    batcher._lanes[batching.LOW_PRIORITY].extend([("low-0", None), ("low-1", None)])
+
+    assert [item for item, _ in batcher._collect()] == ["low-0"]
+
+
+def test_submit_records_latency_per_priority():
+    batcher = batching.Batcher(lambda items: items, 4, 0.01)
+
+    batcher.submit(1, batching.LOW_PRIORITY)
+
+    assert list(batcher.latency) == [batching.LOW_PRIORITY]
+    assert batcher.latency[batching.LOW_PRIORITY] >= 0
+
+
+def test_record_latency_smooths_latencies():
+    batcher = batching.Batcher(None, 4, 0.01)
+    batcher._record_latency(batching.HIGH_PRIORITY, 1.0)
+    batcher._record_latency(batching.HIGH_PRIORITY, 2.0)
+
+    assert batcher.latency == {
+        batching.HIGH_PRIORITY: pytest.approx(1.0 + batching.LATENCY_SMOOTHING)
+    }
+
+
+@pytest.mark.parametrize(
+    "attributes, expected",
+    [
+        ({}, batching.HIGH_PRIORITY),
+        ({"priority": "low"}, batching.LOW_PRIORITY),
+        ({"priority": "LOW"}, batching.LOW_PRIORITY),
+        ({"priority": "high"}, batching.HIGH_PRIORITY),
+        ({"priority": "urgent"}, batching.HIGH_PRIORITY),
+    ],
+)
+def test_parse_priority(attributes, expected):
+    assert batching.parse_priority(attributes) == expected
+
+
+def test_submit_predict_error():
+    def predict_fn(items):
+        raise ValueError("boom")
+
+    batcher = batching.Batcher(predict_fn, 4, 0.01)
+
+    with pytest.raises(ValueError) as e:
+        batcher.submit(1)
+
+    assert "boom" in str(e.value)
+
+
+def test_submit_wrong_number_of_predictions():
+    batcher = batching.Batcher(lambda items: [], 4, 0.01)
+
+    with pytest.raises(ValueError) as e:
+        batcher.submit(1)
+
+    assert "returned 0 predictions for 1 items" in str(e.value)
+
+
+@pytest.mark.parametrize(
+    "arrivals, expected",
+    [
+        ([0], 0.0),
+        ([0, 1], 0.0),
+        ([0, 0.002], 0.006),
+        ([0, 0.0001], 0.0003),
+        ([0, 0.008], 0.01),
+    ],
+)
+def test_window(arrivals, expected):
+    batcher = batching.Batcher(None, 4, 0.01)
+    for arrival in arrivals:
+        batcher._record_arrival(arrival)
+
+    assert batcher.window() == pytest.approx(expected)
+
+
+def test_window_smooths_arrivals():
+    batcher = batching.Batcher(None, 4, 0.01)
+    for arrival in (0, 0.001, 1.001):
+        batcher._record_arrival(arrival)
+
+    assert batcher._interarrival == pytest.approx(0.001 + batching.ARRIVAL_SMOOTHING * (1 - 0.001))
+
+
+def test_submit_single_request_thread_does_not_wait():
+    batcher = batching.Batcher(lambda items: items, 8, 1.0)
+    batcher.window = lambda: 1.0
+    start = time.monotonic()
+    for item in range(20):
+        with batcher:
+            assert batcher.submit(item) == item
+
+    assert time.monotonic() - start < 1.0
+    assert batcher._expected == 0
+
+
+def test_collect_waits_for_requests_in_flight():
+    batches = []
+
+    def predict_fn(items):
+        batches.append(items)
+        return items
+
+    batcher = batching.Batcher(predict_fn, 2, 5.0)
+    batcher.window = lambda: 5.0
+    submitted = threading.Event()
+
+    def request(item):
+        with batcher:
+            submitted.wait(5)
+            return batcher.submit(item)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(request, 0)
+        second = executor.submit(request, 1)
+        while batcher._expected < 2:
+            pass
+        submitted.set()
+
+        assert (first.result(), second.result()) == (0, 1)
+
+    assert [sorted(batch) for batch in batches] == [[0, 1]]
+
+
+def test_collect_reserves_a_place_for_low_priority():
+    batcher = batching.Batcher(lambda items: items, 4, 0.01)
+    batcher._lanes[batching.HIGH_PRIORITY].extend([("high-{}".format(i), None) for i in range(8)])
+    batcher._lanes[batching.LOW_PRIORITY].append(("low-0", None))
+
+    assert [item for item, _ in batcher._collect()] == ["high-0", "high-1", "high-2", "low-0"]
+    assert [item for item, _ in batcher._collect()] == ["high-3", "high-4", "high-5", "high-6"]
+
+
+def test_submit_low_priority_under_sustained_high_priority_load():
+    def predict_fn(items):
+        time.sleep(0.001)
+        return items
+
+    batcher = batching.Batcher(predict_fn, 2, 0.001)
+    stop = threading.Event()
+
+    def flood():
+        while not stop.is_set():
+            with batcher:
+                batcher.submit("high")
+
+    with ThreadPoolExecutor(max_workers=9) as executor:
+        floods = [executor.submit(flood) for _ in range(8)]
+        while batcher.pending() < 4:
+            pass
+        low = executor.submit(batcher.submit, "low", batching.LOW_PRIORITY)
+        try:
+            assert low.result(timeout=5) == "low"
+        finally:
+            stop.set()
+        for future in floods:
+            future.result()
@@ -0,0 +1,48 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+from six.moves import http_client
+
+from sagemaker_inference.context import Context
+
+MODEL_DIR = "/opt/ml/model"
+
+
+def test_context():
+    context = Context("model", MODEL_DIR, request_headers=[{"Accept": "text/csv"}])
+
+    assert context.system_properties["model_dir"] == MODEL_DIR
+    assert context.request_processor[0].get_request_properties() == {"Accept": "text/csv"}
+    assert context.get_request_header(0, "Accept") == "text/csv"
+    assert context.get_response_status(0) == (http_client.OK, None)
+
+
+def test_context_response():
+    context = Context("model", MODEL_DIR, request_headers=[{}])
+
+    context.set_response_content_type(0, "application/json")
+    context.set_response_status(code=http_client.BAD_REQUEST, phrase="bad input")
+
+    assert context.get_response_content_type(0) == "application/json"
+    assert context.get_response_status(0) == (http_client.BAD_REQUEST, "bad input")
+
+
+def test_context_without_requests():
+    context = Context("model", MODEL_DIR)
+
+    assert context.request_processor == []
+
+
+def test_context_arrival_times():
+    context = Context("model", MODEL_DIR, request_headers=[{}, {}], arrival_times=[1.0, 2.0])
+
+    assert [processor.arrival_time for processor in context.request_processor] == [1.0, 2.0]
@@ -0,0 +1,44 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+from mock import patch
+import pytest
+from six.moves import http_client
+
+from sagemaker_inference import deadline, utils
+from sagemaker_inference.errors import GenericInferenceToolkitError
+
+
+@pytest.mark.parametrize(
+    "attributes, expected",
+    [
+        (None, 160.0),
+        ("timeout_ms=500", 100.5),
+        ("timeout_ms=120000", 160.0),
+        ("timeout_ms=x", 160.0),
+    ],
+)
+def test_request_deadline(attributes, expected):
+    request_property = {utils.CUSTOM_ATTRIBUTES_HEADER: attributes} if attributes else {}
+
+    assert deadline.request_deadline(request_property, 100.0, 60) == expected
+
+
+@patch("time.time", return_value=100.0)
+def test_check(time):
+    deadline.check(None)
+    deadline.check(100.0)
+
+    with pytest.raises(GenericInferenceToolkitError) as e:
+        deadline.check(99.0)
+
+    assert e.value.status_code == http_client.SERVICE_UNAVAILABLE
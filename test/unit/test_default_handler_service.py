@@ -10,6 +10,8 @@
 # distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
+import os
+
 from mock import MagicMock, Mock, patch
 
 from sagemaker_inference.default_handler_service import DefaultHandlerService
@@ -58,3 +60,45 @@ def test_initialize():
     DefaultHandlerService(transformer).initialize(context)
 
     transformer.validate_and_initialize.assert_called_once()
+
+
+@patch("sagemaker_inference.affinity.pin_worker")
+@patch("sagemaker_inference.environment.Environment")
+def test_initialize_cpu_affinity(env, pin_worker):
+    env.return_value.model_server_cpu_affinity = True
+    transformer = Mock()
+    context = MagicMock()
+
+    DefaultHandlerService(transformer).initialize(context)
+
+    pin_worker.assert_called_once_with(env.return_value)
+    transformer.validate_and_initialize.assert_called_once()
+
+
+@patch("sagemaker_inference.profiler.install")
+@patch("sagemaker_inference.profiler.Profiler")
+@patch("sagemaker_inference.environment.Environment")
+def test_initialize_profiling(env, profiler, install):
+    env.return_value.model_server_cpu_affinity = False
+    env.return_value.model_server_profiling = True
+    env.return_value.model_server_profile_dir = "/tmp/profiles"
+    env.return_value.model_server_profile_seconds = 10
+    transformer = Mock()
+    context = MagicMock()
+
+    DefaultHandlerService(transformer).initialize(context)
+
+    profiler.assert_called_once_with("/tmp/profiles", 10)
+    install.assert_called_once_with(profiler.return_value)
+
+
+@patch.dict(os.environ, {"PYTHONPATH": "/opt/lib"})
+def test_initialize_python_path():
+    transformer = Mock()
+    context = Mock(system_properties={"model_dir": "/opt/ml/models/model-name"})
+    handler_service = DefaultHandlerService(transformer)
+
+    handler_service.initialize(context)
+    handler_service.initialize(context)
+
+    assert os.environ["PYTHONPATH"] == "/opt/ml/models/model-name/code:/opt/lib"
@@ -0,0 +1,91 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import os
+
+from mock import patch
+
+from sagemaker_inference import drain
+
+
+def test_start_draining(tmpdir):
+    drain_dir = str(tmpdir.join("drain"))
+
+    assert drain.is_draining(drain_dir) is False
+
+    drain.start_draining(drain_dir)
+
+    assert drain.is_draining(drain_dir) is True
+
+
+def test_reset(tmpdir):
+    drain_dir = str(tmpdir.join("drain"))
+    drain.start_draining(drain_dir)
+
+    drain.reset(drain_dir)
+
+    assert drain.is_draining(drain_dir) is False
+
+
+def test_inflight_requests(tmpdir):
+    drain_dir = str(tmpdir)
+    counter = drain.InflightRequests(drain_dir)
+
+    assert drain.inflight_requests(drain_dir) == 0
+
+    with counter:
+        with counter:
+            assert counter.count == 2
+            assert drain.inflight_requests(drain_dir) == 2
+        assert drain.inflight_requests(drain_dir) == 1
+
+    assert drain.inflight_requests(drain_dir) == 0
+
+
+def test_inflight_requests_per_process(tmpdir):
+    drain_dir = str(tmpdir)
+    counter = drain.InflightRequests(drain_dir)
+    with counter:
+        pass
+
+    child = os.getpid() + 1
+    with patch("os.getpid", return_value=child), patch("psutil.pid_exists", return_value=True):
+        with counter:
+            assert counter.count == 1
+            assert drain.inflight_requests(drain_dir) == 1
+            assert sorted(os.listdir(drain_dir)) == sorted(
+                [drain.INFLIGHT_PREFIX + str(child), drain.INFLIGHT_PREFIX + str(child - 1)]
+            )
+
+
+def test_inflight_requests_ignores_dead_workers(tmpdir):
+    drain_dir = str(tmpdir)
+    counter = drain.InflightRequests(drain_dir)
+
+    with counter, patch("psutil.pid_exists", return_value=False):
+        assert drain.inflight_requests(drain_dir) == 0
+
+
+@patch("time.sleep")
+@patch("sagemaker_inference.drain.inflight_requests", side_effect=[3, 1, 0])
+def test_drain(inflight_requests, sleep, tmpdir):
+    drain_dir = str(tmpdir)
+
+    assert drain.drain(10, drain_dir) == (3, 0)
+    assert drain.is_draining(drain_dir) is True
+
+
+@patch("time.sleep")
+@patch("time.time", side_effect=[0, 1, 11])
+@patch("sagemaker_inference.drain.inflight_requests", return_value=2)
+def test_drain_timeout(inflight_requests, time, sleep, tmpdir):
+    assert drain.drain(10, str(tmpdir)) == (0, 2)
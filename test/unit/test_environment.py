@@ -25,6 +25,37 @@ from sagemaker_inference import environment, parameters
         parameters.MODEL_SERVER_TIMEOUT_ENV: "20",
         parameters.MODEL_SERVER_TIMEOUT_SECONDS_ENV: "30",
         parameters.MODEL_SERVER_WORKERS_ENV: "8",
+        parameters.MODEL_SERVER_WORKER_MEMORY_ENV: "512",
+        parameters.MODEL_SERVER_CPU_AFFINITY_ENV: "true",
+        parameters.MODEL_SERVER_NETTY_THREADS_ENV: "4",
+        parameters.MODEL_SERVER_NETTY_CLIENT_THREADS_ENV: "2",
+        parameters.MODEL_SERVER_JOB_QUEUE_SIZE_ENV: "1000",
+        parameters.MODEL_SERVER_BATCH_SIZE_ENV: "8",
+        parameters.MODEL_SERVER_MAX_BATCH_DELAY_ENV: "50",
+        parameters.MODEL_SERVER_DRAIN_TIMEOUT_ENV: "30",
+        parameters.MODEL_SERVER_PRELOAD_MODEL_ENV: "true",
+        parameters.MODEL_SERVER_BACKEND_ENV: "Python",
+        parameters.MODEL_SERVER_WORKER_THREADS_ENV: "4",
+        parameters.MODEL_SERVER_PIPELINE_THREADS_ENV: "2",
+        parameters.MODEL_SERVER_WORKER_BATCH_SIZE_ENV: "16",
+        parameters.MODEL_SERVER_WORKER_MAX_BATCH_DELAY_ENV: "5",
+        parameters.MODEL_SERVER_LOW_PRIORITY_BATCH_SHARE_ENV: "0.25",
+        parameters.MODEL_SERVER_STAGE_METRICS_ENV: "true",
+        parameters.MODEL_SERVER_METRICS_INTERVAL_ENV: "30",
+        parameters.MODEL_SERVER_PROMETHEUS_METRICS_ENV: "true",
+        parameters.MODEL_SERVER_PROFILING_ENV: "true",
+        parameters.MODEL_SERVER_PROFILE_DIR_ENV: "/opt/ml/profiles",
+        parameters.MODEL_SERVER_PROFILE_SECONDS_ENV: "5",
+        parameters.MODEL_SERVER_MEMORY_PROFILING_ENV: "true",
+        parameters.MODEL_SERVER_MEMORY_SAMPLE_INTERVAL_ENV: "10",
+        parameters.MODEL_SERVER_WORKER_MAX_RSS_ENV: "2048",
+        parameters.MODEL_SERVER_MODEL_CACHE_ENV: "true",
+        parameters.MODEL_SERVER_MODEL_CACHE_MEMORY_ENV: "4096",
+        parameters.MODEL_SERVER_PREFETCH_ENV: "true",
+        parameters.MODEL_SERVER_PREFETCH_MEMORY_ENV: "512",
+        parameters.MODEL_SERVER_REQUEST_DEADLINES_ENV: "true",
+        parameters.MODEL_SERVER_MAX_INFLIGHT_REQUESTS_ENV: "32",
+        parameters.MODEL_SERVER_MAX_LATENCY_ENV: "250",
         parameters.STARTUP_TIMEOUT_ENV: "50",
         parameters.DEFAULT_INVOCATIONS_ACCEPT_ENV: "text/html",
         parameters.BIND_TO_PORT_ENV: "1738",
@@ -45,6 +76,37 @@ def test_env():
     assert env.model_server_timeout_seconds == 30
     assert env.startup_timeout == 50
     assert env.model_server_workers == "8"
+    assert env.model_server_worker_memory == 512 * 1024 * 1024
+    assert env.model_server_cpu_affinity is True
+    assert env.model_server_netty_threads == 4
+    assert env.model_server_netty_client_threads == 2
+    assert env.model_server_job_queue_size == 1000
+    assert env.model_server_batch_size == 8
+    assert env.model_server_max_batch_delay == 50
+    assert env.model_server_drain_timeout == 30
+    assert env.model_server_preload_model is True
+    assert env.model_server_backend == environment.PYTHON_BACKEND
+    assert env.model_server_worker_threads == 4
+    assert env.model_server_pipeline_threads == 2
+    assert env.model_server_worker_batch_size == 16
+    assert env.model_server_worker_max_batch_delay == 5
+    assert env.model_server_low_priority_batch_share == 0.25
+    assert env.model_server_stage_metrics is True
+    assert env.model_server_metrics_interval == 30
+    assert env.model_server_prometheus_metrics is True
+    assert env.model_server_profiling is True
+    assert env.model_server_profile_dir == "/opt/ml/profiles"
+    assert env.model_server_profile_seconds == 5
+    assert env.model_server_memory_profiling is True
+    assert env.model_server_memory_sample_interval == 10
+    assert env.model_server_worker_max_rss == 2048 * 1024 * 1024
+    assert env.model_server_model_cache is True
+    assert env.model_server_model_cache_memory == 4096 * 1024 * 1024
+    assert env.model_server_prefetch is True
+    assert env.model_server_prefetch_memory == 512 * 1024 * 1024
+    assert env.model_server_request_deadlines is True
+    assert env.model_server_max_inflight_requests == 32
+    assert env.model_server_max_latency == 250
     assert env.default_accept == "text/html"
     assert env.inference_http_port == "1738"
     assert env.management_http_port == "1738"
@@ -62,3 +124,71 @@ def test_env_module_name(sagemaker_program):
     del os.environ[parameters.USER_PROGRAM_ENV]
 
     assert module_name == "program"
+
+
+@patch("sagemaker_inference.resources.memory_budget")
+@patch.dict(os.environ, {parameters.MAX_REQUEST_SIZE: "10"}, clear=True)
+def test_env_memory_budget(memory_budget):
+    env = environment.Environment()
+
+    assert env.memory_budget == memory_budget.return_value
+    memory_budget.assert_called_once_with(10 * 1024 * 1024)
+
+
+@pytest.mark.parametrize("workers, expected", [("4", 4), (None, None)])
+def test_env_model_server_worker_count(workers, expected):
+    environ = {parameters.MODEL_SERVER_WORKERS_ENV: workers} if workers else {}
+    with patch.dict(os.environ, environ, clear=True):
+        assert environment.Environment().model_server_worker_count == expected
+
+
+@patch("sagemaker_inference.resources.memory_budget")
+@patch("sagemaker_inference.resources.auto_tune_workers", return_value=(3, 2))
+@patch.dict(os.environ, {parameters.MODEL_SERVER_WORKERS_ENV: "auto"}, clear=True)
+def test_env_model_server_worker_count_auto(auto_tune_workers, memory_budget):
+    assert environment.Environment().model_server_worker_count == 3
+    auto_tune_workers.assert_called_once_with(
+        None, environment.model_dir, memory_budget.return_value.workers
+    )
+
+
+@patch("sagemaker_inference.resources.memory_budget")
+@patch.dict(os.environ, {}, clear=True)
+def test_env_model_server_model_cache_memory_default(memory_budget):
+    env = environment.Environment()
+
+    assert env.model_server_model_cache_memory == memory_budget.return_value.workers
+
+
+@patch.dict(os.environ, {}, clear=True)
+def test_env_frontend_defaults():
+    env = environment.Environment()
+
+    assert env.model_server_netty_threads is None
+    assert env.model_server_netty_client_threads is None
+    assert env.model_server_job_queue_size is None
+    assert env.model_server_batch_size is None
+    assert env.model_server_max_batch_delay is None
+    assert env.model_server_drain_timeout == 0
+    assert env.model_server_preload_model is False
+    assert env.model_server_backend == environment.MMS_BACKEND
+    assert env.model_server_worker_threads == 1
+    assert env.model_server_pipeline_threads == 0
+    assert env.model_server_worker_batch_size is None
+    assert env.model_server_worker_max_batch_delay == 10
+    assert env.model_server_low_priority_batch_share == 0.5
+    assert env.model_server_stage_metrics is False
+    assert env.model_server_metrics_interval == 60
+    assert env.model_server_prometheus_metrics is False
+    assert env.model_server_profiling is False
+    assert env.model_server_profile_dir == "/tmp/sagemaker-inference/profiles"
+    assert env.model_server_profile_seconds == 30
+    assert env.model_server_memory_profiling is False
+    assert env.model_server_memory_sample_interval == 100
+    assert env.model_server_worker_max_rss is None
+    assert env.model_server_model_cache is False
+    assert env.model_server_prefetch is False
+    assert env.model_server_prefetch_memory == 1024 * 1024 * 1024
+    assert env.model_server_request_deadlines is False
+    assert env.model_server_max_inflight_requests is None
+    assert env.model_server_max_latency is None
@@ -0,0 +1,70 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from mock import patch
+import pytest
+
+from sagemaker_inference import event_loop
+
+
+async def _double(value):
+    await asyncio.sleep(0)
+    return 2 * value
+
+
+def test_get_event_loop():
+    loop = event_loop.get_event_loop()
+
+    assert loop.is_running()
+    assert event_loop.get_event_loop() is loop
+
+
+def test_get_event_loop_after_fork():
+    loop = event_loop.get_event_loop()
+
+    with patch("os.getpid", return_value=-1):
+        assert event_loop.get_event_loop() is not loop
+
+
+def test_run():
+    assert event_loop.run(_double(2)) == 4
+
+
+def test_run_raises():
+    async def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        event_loop.run(fail())
+
+
+def test_run_concurrently():
+    async def create_event():
+        return asyncio.Event()
+
+    started = []
+    both_started = event_loop.run(create_event())
+
+    async def wait_for_other():
+        started.append(True)
+        if len(started) == 2:
+            both_started.set()
+        await asyncio.wait_for(both_started.wait(), 5)
+        return len(started)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(lambda _: event_loop.run(wait_for_other()), range(2)))
+
+    assert results == [2, 2]
@@ -0,0 +1,339 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import asyncio
+import signal
+import threading
+
+from mock import MagicMock, Mock, patch
+import pytest
+from six.moves import http_client
+
+from sagemaker_inference import http_server, profiler
+from sagemaker_inference.default_handler_service import DefaultHandlerService
+from sagemaker_inference.errors import GenericInferenceToolkitError
+
+ENV = Mock(max_request_size=None, model_server_worker_threads=1)
+
+
+def _read(data, max_request_size=None):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await http_server.read_request(reader, max_request_size)
+
+    return asyncio.run(read())
+
+
+class EchoService(object):
+    def __init__(self):
+        self.initialized = False
+
+    def initialize(self, context):
+        self.initialized = True
+
+    def handle(self, data, context):
+        content_type = context.get_request_header(0, "Content-Type")
+        if content_type != "text/plain":
+            context.set_response_status(code=http_client.UNSUPPORTED_MEDIA_TYPE, phrase="no")
+            return ["unsupported"]
+        context.set_response_content_type(0, "text/plain")
+        return [data[0]["body"].upper()]
+
+
+def test_load_handler_service():
+    service = http_server.load_handler_service("sagemaker_inference.default_handler_service")
+
+    assert isinstance(service, DefaultHandlerService)
+
+
+def test_load_handler_service_multiple_classes():
+    with pytest.raises(ValueError):
+        http_server.load_handler_service("sagemaker_inference.errors")
+
+
+def test_read_request():
+    request = _read(
+        b"POST /invocations?x=1 HTTP/1.1\r\nContent-Type: text/csv\r\n"
+        b"Content-Length: 5\r\n\r\n1,2,3"
+    )
+
+    assert request.method == "POST"
+    assert request.path == "/invocations"
+    assert request.headers == {"Content-Type": "text/csv", "Content-Length": "5"}
+    assert request.body == b"1,2,3"
+    assert request.keep_alive is True
+    assert request.arrival_time is not None
+
+
+@pytest.mark.parametrize(
+    "head, keep_alive",
+    [
+        (b"GET /ping HTTP/1.1\r\nConnection: close\r\n\r\n", False),
+        (b"GET /ping HTTP/1.0\r\n\r\n", False),
+        (b"GET /ping HTTP/1.0\r\nConnection: keep-alive\r\n\r\n", True),
+    ],
+)
+def test_read_request_keep_alive(head, keep_alive):
+    assert _read(head).keep_alive is keep_alive
+
+
+def test_read_request_closed():
+    assert _read(b"") is None
+
+
+@pytest.mark.parametrize(
+    "data, status",
+    [
+        (b"POST /invocations HTTP/1.1\r\nContent-Length: 100\r\n\r\n", 413),
+        (b"POST /invocations HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n", 411),
+        (b"garbage\r\n\r\n", 400),
+        (b"GET /ping HTTP/1.1\r\n", 400),
+        (b"POST /invocations HTTP/1.1\r\nContent-Length: abc\r\n\r\n", 400),
+        (b"POST /invocations HTTP/1.1\r\nContent-Length: -1\r\n\r\n", 400),
+    ],
+)
+def test_read_request_error(data, status):
+    with pytest.raises(GenericInferenceToolkitError) as e:
+        _read(data, max_request_size=10)
+
+    assert e.value.status_code == status
+
+
+@patch("sagemaker_inference.drain.is_draining", return_value=False)
+def test_ping(is_draining):
+    assert http_server.Worker.ping().status == http_client.OK
+
+
+@patch("sagemaker_inference.drain.is_draining", return_value=True)
+def test_ping_draining(is_draining):
+    assert http_server.Worker.ping().status == http_client.SERVICE_UNAVAILABLE
+
+
+def test_invoke():
+    worker = http_server.Worker(EchoService(), ENV)
+    request = http_server.Request(
+        "POST", "/invocations", {"Content-Type": "text/plain"}, b"abc", True
+    )
+
+    assert worker.invoke(request) == http_server.Response(
+        http_client.OK, None, "text/plain", b"ABC"
+    )
+
+
+def test_invoke_passes_arrival_time():
+    service = Mock()
+    service.handle.return_value = [""]
+    worker = http_server.Worker(service, ENV)
+
+    worker.invoke(http_server.Request("POST", "/invocations", {}, b"", True, 123.0))
+
+    context = service.handle.call_args[0][1]
+    assert context.request_processor[0].arrival_time == 123.0
+
+
+def test_invoke_error_status():
+    worker = http_server.Worker(EchoService(), ENV)
+    request = http_server.Request("POST", "/invocations", {}, b"abc", True)
+
+    assert worker.invoke(request) == http_server.Response(
+        http_client.UNSUPPORTED_MEDIA_TYPE, "no", None, b"unsupported"
+    )
+
+
+@pytest.mark.parametrize(
+    "result, expected", [(["text"], b"text"), ([b"\x00"], b"\x00"), ([{"a": 1}], b'{"a": 1}')]
+)
+def test_invoke_encodes_result(result, expected):
+    service = Mock()
+    service.handle.return_value = result
+    worker = http_server.Worker(service, ENV)
+
+    assert worker.invoke(http_server.Request("POST", "/", {}, b"", True)).body == expected
+
+
+def test_dispatch_handler_error():
+    service = Mock()
+    service.handle.side_effect = RuntimeError("boom")
+    worker = http_server.Worker(service, ENV)
+    request = http_server.Request("POST", "/invocations", {}, b"", True)
+
+    response = asyncio.run(worker.dispatch(request))
+
+    assert response.status == http_client.INTERNAL_SERVER_ERROR
+    assert response.body == b"boom"
+
+
+def test_dispatch_unknown_path():
+    worker = http_server.Worker(Mock(), ENV)
+    request = http_server.Request("GET", "/models", {}, b"", True)
+
+    assert asyncio.run(worker.dispatch(request)).status == http_client.NOT_FOUND
+
+
+@patch("sagemaker_inference.drain.is_draining", return_value=False)
+def test_handle_connection(is_draining):
+    worker = http_server.Worker(EchoService(), ENV)
+
+    async def exchange():
+        server = await asyncio.start_server(worker.handle_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"GET /ping HTTP/1.1\r\n\r\n")
+            writer.write(
+                b"POST /invocations HTTP/1.1\r\nContent-Type: text/plain\r\n"
+                b"Content-Length: 3\r\nConnection: close\r\n\r\nabc"
+            )
+            data = await reader.read()
+            writer.close()
+            return data
+
+    data = asyncio.run(exchange())
+
+    ping, invocation = data.split(b"HTTP/1.1 ")[1:]
+    assert ping.startswith(b"200 OK\r\n")
+    assert ping.endswith(b'{"status": "Healthy"}')
+    assert invocation.startswith(b"200 OK\r\n")
+    assert b"Connection: close\r\n" in invocation
+    assert b"Content-Type: text/plain\r\n" in invocation
+    assert invocation.endswith(b"\r\n\r\nABC")
+
+
+def _model_server(env=None):
+    env = env or MagicMock(
+        model_server_worker_count=2,
+        model_server_worker_threads=1,
+        model_server_preload_model=False,
+        model_server_drain_timeout=0,
+    )
+    return http_server.ModelServer("handler_service", env)
+
+
+@patch("sagemaker_inference.http_server.ModelServer._supervise")
+@patch("os.fork", side_effect=[101, 102])
+@patch("signal.signal")
+@patch("sagemaker_inference.http_server.load_handler_service")
+@patch("sagemaker_inference.http_server._bind")
+def test_model_server_start(bind, load_handler_service, signal_fn, fork, supervise):
+    server = _model_server()
+
+    server.start()
+
+    load_handler_service.assert_called_once_with("handler_service")
+    load_handler_service.return_value.initialize.assert_not_called()
+    signal_fn.assert_called_once_with(signal.SIGTERM, server._terminate)
+    assert server._workers == {101, 102}
+    supervise.assert_called_once_with()
+
+
+@pytest.mark.parametrize("cpu_affinity, preloaded", [(False, True), (True, False)])
+@patch("sagemaker_inference.http_server.ModelServer._supervise")
+@patch("os.fork", return_value=101)
+@patch("signal.signal")
+@patch("sagemaker_inference.http_server.load_handler_service")
+@patch("sagemaker_inference.http_server._bind")
+def test_model_server_start_preload(
+    bind, load_handler_service, signal_fn, fork, supervise, cpu_affinity, preloaded
+):
+    env = MagicMock(
+        model_server_worker_count=1,
+        model_server_worker_threads=1,
+        model_server_preload_model=True,
+        model_server_cpu_affinity=cpu_affinity,
+    )
+
+    _model_server(env).start()
+
+    assert load_handler_service.return_value.initialize.called is preloaded
+
+
+@patch("time.sleep")
+@patch("os.fork", return_value=103)
+@patch("os.wait", side_effect=[(101, 256), (102, 0), (103, 0), ChildProcessError()])
+def test_model_server_supervise_restarts_workers(wait, fork, sleep):
+    server = _model_server()
+    server._workers = {101, 102}
+
+    def stop_after_first_restart(delay):
+        if fork.called:
+            server._stopping = True
+
+    sleep.side_effect = stop_after_first_restart
+    server._supervise()
+
+    fork.assert_called_once_with()
+    assert server._workers == set()
+
+
+@patch("os.kill")
+@patch("sagemaker_inference.drain.drain")
+def test_model_server_terminate(drain, kill):
+    env = MagicMock(model_server_worker_threads=1, model_server_drain_timeout=30)
+    server = _model_server(env)
+    server._workers = {101}
+
+    server._terminate(signal.SIGTERM, None)
+
+    assert server._stopping is True
+    drain.assert_called_once_with(30)
+    kill.assert_called_once_with(101, signal.SIGTERM)
+
+
+@patch("sagemaker_inference.http_server.ModelServer._supervise")
+@patch("os.fork", return_value=101)
+@patch("signal.signal", return_value=signal.SIG_DFL)
+@patch("sagemaker_inference.http_server.load_handler_service")
+@patch("sagemaker_inference.http_server._bind")
+def test_model_server_start_profiling(bind, load_handler_service, signal_fn, fork, supervise):
+    env = MagicMock(
+        model_server_worker_count=1,
+        model_server_worker_threads=1,
+        model_server_preload_model=False,
+        model_server_profiling=True,
+    )
+    server = _model_server(env)
+
+    server.start()
+
+    signal_fn.assert_any_call(profiler.PROFILE_SIGNAL, server._forward_signal)
+    assert server._profile_handler == signal.SIG_IGN
+
+
+@patch("os.kill", side_effect=[None, OSError()])
+def test_model_server_forward_signal(kill):
+    server = _model_server()
+    server._workers = {101, 102}
+
+    server._forward_signal(profiler.PROFILE_SIGNAL, None)
+
+    assert sorted(args for args, _ in kill.call_args_list) == [
+        (101, profiler.PROFILE_SIGNAL),
+        (102, profiler.PROFILE_SIGNAL),
+    ]
+
+
+def test_dispatch_concurrent_requests():
+    env = Mock(max_request_size=None, model_server_worker_threads=2)
+    barrier = threading.Barrier(2, timeout=5)
+    service = Mock()
+    service.handle.side_effect = lambda data, context: [str(barrier.wait())]
+    worker = http_server.Worker(service, env)
+    request = http_server.Request("POST", "/invocations", {}, b"", True)
+
+    async def dispatch_both():
+        return await asyncio.gather(worker.dispatch(request), worker.dispatch(request))
+
+    responses = asyncio.run(dispatch_both())
+
+    assert sorted(response.body for response in responses) == [b"0", b"1"]
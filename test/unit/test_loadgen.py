@@ -0,0 +1,115 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import json
+import threading
+
+from mock import patch
+import pytest
+
+from sagemaker_inference import content_types, loadgen
+
+
+class EchoHandlerService(object):
+    """Handler service answering each request with its body, and failing the
+    requests whose body is ``fail``.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def initialize(self, context):
+        pass
+
+    def handle(self, data, context):
+        with self.lock:
+            self.calls.append((data, context))
+        for i, item in enumerate(data):
+            if item["body"] == b"fail":
+                context.set_response_status(500, "failed", idx=i)
+        return [item["body"] for item in data]
+
+
+@pytest.mark.parametrize(
+    "values, p, expected",
+    [([], 50, None), ([1.0], 99, 1.0), ([1.0, 2.0, 3.0, 4.0], 50, 2.0), ([1, 2, 3, 4], 99, 4)],
+)
+def test_percentile(values, p, expected):
+    assert loadgen.percentile(values, p) == expected
+
+
+def test_run():
+    service = EchoHandlerService()
+
+    result = loadgen.run(
+        service,
+        [b"a", b"fail"],
+        content_types.CSV,
+        concurrency=2,
+        batch_size=2,
+        requests=5,
+        model_dir="/opt/ml/model",
+    )
+
+    assert result.requests == 6
+    assert result.errors == 3
+    assert len(result.latencies) == 3
+    assert result.duration > 0
+
+    data, context = service.calls[0]
+    assert len(data) == 2
+    assert context.system_properties["model_dir"] == "/opt/ml/model"
+    assert context.system_properties["batch_size"] == 2
+    assert context.get_request_header(1, "Accept") == content_types.CSV
+
+
+def test_summarize():
+    result = loadgen.LoadResult(requests=4, errors=1, duration=2.0, latencies=[0.004, 0.001])
+
+    assert loadgen.summarize(result) == {
+        "requests": 4,
+        "errors": 1,
+        "throughput": 2.0,
+        "p50_ms": 1.0,
+        "p90_ms": 4.0,
+        "p99_ms": 4.0,
+        "max_ms": 4.0,
+    }
+
+
+@patch("sagemaker_inference.http_server.load_handler_service")
+def test_main(load_handler_service, tmpdir, capsys):
+    service = EchoHandlerService()
+    load_handler_service.return_value = service
+    payload = tmpdir.join("payload.json")
+    payload.write("[1]")
+
+    loadgen.main(
+        [
+            "--handler-service",
+            "my_handler_service",
+            "--payload",
+            str(payload),
+            "--requests",
+            "3",
+            "--warmup",
+            "2",
+        ]
+    )
+
+    load_handler_service.assert_called_once_with("my_handler_service")
+    assert len(service.calls) == 5
+    assert service.calls[0][0] == [{"body": b"[1]"}]
+    summary = json.loads(capsys.readouterr().out)
+    assert summary["requests"] == 3
+    assert summary["errors"] == 0
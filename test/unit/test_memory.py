@@ -0,0 +1,99 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import os
+import signal
+import tracemalloc
+
+from mock import patch
+import pytest
+
+from sagemaker_inference import memory
+
+
+@pytest.fixture
+def tracker():
+    tracing = tracemalloc.is_tracing()
+    yield memory.MemoryTracker(2, 60)
+    if not tracing:
+        tracemalloc.stop()
+
+
+def test_rss():
+    assert memory.rss() > 0
+
+
+def test_tracker_starts_tracing(tracker):
+    assert tracemalloc.is_tracing()
+
+
+def test_tracker_samples_calls(tracker):
+    assert tracker.before("predict_fn") is not None
+    assert tracker.before("predict_fn") is None
+    assert tracker.before("predict_fn") is not None
+    assert tracker.before("input_fn") is not None
+
+
+@patch("tracemalloc.get_traced_memory")
+@patch("sagemaker_inference.memory.rss")
+def test_tracker_summary(rss, get_traced_memory, tracker):
+    rss.side_effect = [100, 300, 300, 400]
+    get_traced_memory.side_effect = [(10, 0), (30, 0), (30, 0), (30, 0)]
+
+    for _ in range(2):
+        tracker.after("predict_fn", tracker.before("predict_fn"))
+        tracker.before("predict_fn")
+
+    assert tracker.summary() == {"predict_fn": {"samples": 2, "rss_delta": 150, "traced_delta": 10}}
+
+
+def test_top_allocations(tracker):
+    tracker.top_allocations()
+    leak = [bytearray(1024) for _ in range(1000)]
+
+    top = tracker.top_allocations(limit=3)
+
+    assert len(top) == 3
+    assert any(__file__ in allocation for allocation in top)
+    del leak
+
+
+@patch("sagemaker_inference.memory.logger")
+@patch("time.monotonic", return_value=100.0)
+def test_maybe_report(monotonic, logger, tracker):
+    tracker._reported_at = 100.0
+
+    monotonic.return_value = 159.0
+    assert tracker.maybe_report() is False
+
+    monotonic.return_value = 200.0
+    assert tracker.maybe_report() is True
+    assert logger.info.called
+
+
+@patch("threading.Timer")
+@patch("sagemaker_inference.memory.rss", return_value=100)
+def test_recycler_under_limit(rss, timer):
+    assert memory.Recycler(100).check() is False
+    timer.assert_not_called()
+
+
+@patch("threading.Timer")
+@patch("sagemaker_inference.memory.rss", return_value=101)
+def test_recycler_over_limit(rss, timer):
+    recycler = memory.Recycler(100)
+
+    assert recycler.check() is True
+    assert recycler.check() is True
+
+    timer.assert_called_once_with(memory.RECYCLE_GRACE, os.kill, (os.getpid(), signal.SIGTERM))
+    timer.return_value.start.assert_called_once_with()
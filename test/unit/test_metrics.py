@@ -0,0 +1,103 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+from mock import call, Mock, patch
+import pytest
+
+from sagemaker_inference import metrics
+
+BUCKETS = (1.0, 2.0, 4.0)
+
+
+@pytest.mark.parametrize(
+    "counts, q, expected",
+    [
+        ([0, 0, 0, 0], 0.5, None),
+        ([1, 0, 0, 0], 0.5, 1.0),
+        ([1, 1, 2, 0], 0.5, 2.0),
+        ([1, 1, 2, 0], 0.99, 4.0),
+        ([0, 0, 0, 3], 0.5, 4.0),
+    ],
+)
+def test_quantile(counts, q, expected):
+    assert metrics.quantile(BUCKETS, counts, q) == expected
+
+
+def test_histogram_observe():
+    histogram = metrics.Histogram(BUCKETS)
+    for value in (0.5, 1.0, 3.0, 10.0):
+        histogram.observe(value)
+
+    assert histogram.snapshot() == ([2, 0, 1, 1], 14.5)
+
+
+def test_stage_metrics_summary():
+    stage_metrics = metrics.StageMetrics(60)
+    stage_metrics.observe("predict_fn", 0.0015)
+    stage_metrics.observe("predict_fn", 0.003)
+
+    assert stage_metrics.summary() == {
+        "predict_fn": {
+            "count": 2,
+            "p50": pytest.approx(1000 * 2.0**-9),
+            "p90": pytest.approx(1000 * 2.0**-8),
+            "p99": pytest.approx(1000 * 2.0**-8),
+        }
+    }
+
+
+def test_stage_metrics_summary_since_previous():
+    stage_metrics = metrics.StageMetrics(60)
+    stage_metrics.observe("input_fn", 0.001)
+    stage_metrics.observe("predict_fn", 0.001)
+    stage_metrics.summary()
+    stage_metrics.observe("predict_fn", 0.001)
+
+    summary = stage_metrics.summary()
+
+    assert list(summary) == ["predict_fn"]
+    assert summary["predict_fn"]["count"] == 1
+
+
+@patch("time.monotonic", return_value=100.0)
+def test_maybe_emit_waits_for_interval(monotonic):
+    stage_metrics = metrics.StageMetrics(60)
+    stage_metrics.observe("predict_fn", 0.001)
+    metrics_store = Mock()
+
+    monotonic.return_value = 159.0
+    assert stage_metrics.maybe_emit(metrics_store) is False
+
+    monotonic.return_value = 160.0
+    assert stage_metrics.maybe_emit(metrics_store) is True
+    metrics_store.add_counter.assert_called_once_with("predict_fn.count", 1)
+    assert metrics_store.add_time.call_count == len(metrics.QUANTILES)
+
+
+def test_maybe_emit_gauges():
+    stage_metrics = metrics.StageMetrics(0)
+    metrics_store = Mock()
+
+    stage_metrics.maybe_emit(metrics_store, {"batch_latency_high": 0.002})
+
+    assert metrics_store.add_time.call_args_list == [
+        call("batch_latency_high.latency", pytest.approx(2.0))
+    ]
+
+
+@patch("sagemaker_inference.metrics.logger")
+def test_maybe_emit_without_metrics_store(logger):
+    stage_metrics = metrics.StageMetrics(0)
+    stage_metrics.observe("predict_fn", 0.001)
+
+    assert stage_metrics.maybe_emit(None) is True
+    logger.info.assert_called_once()
@@ -0,0 +1,132 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import json
+import os
+
+from mock import patch
+import pytest
+
+from sagemaker_inference import model_cache
+
+MB = 1024 * 1024
+
+
+def _write_record(cache_dir, model, pid, footprint, used_at, requests):
+    path = os.path.join(cache_dir, "{}{}.json".format(model_cache.FILE_PREFIX, pid))
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "model": model,
+                "pid": pid,
+                "footprint": footprint,
+                "used_at": used_at,
+                "requests": requests,
+            },
+            f,
+        )
+
+
+@pytest.fixture
+def cache_dir(tmpdir):
+    _write_record(str(tmpdir), "old", 1001, 100 * MB, 10.0, 50)
+    _write_record(str(tmpdir), "popular", 1002, 100 * MB, 20.0, 500)
+    _write_record(str(tmpdir), "unloaded", 1003, 100 * MB, 0.0, 3)
+    return str(tmpdir)
+
+
+def _pid_exists(pid):
+    return pid != 1003
+
+
+@patch("psutil.pid_exists", side_effect=_pid_exists)
+def test_loaded_within_budget(pid_exists, cache_dir):
+    cache = model_cache.ModelCache(300 * MB, cache_dir=cache_dir)
+
+    cache.loaded("new", 100 * MB, "/opt/ml/models/new")
+
+    path = os.path.join(cache_dir, "{}{}.json".format(model_cache.FILE_PREFIX, os.getpid()))
+    with open(path) as f:
+        record = json.load(f)
+    assert record["model"] == "new"
+    assert record["model_dir"] == "/opt/ml/models/new"
+    assert record["footprint"] == 100 * MB
+    assert record["requests"] == 0
+
+
+@patch("psutil.pid_exists", side_effect=_pid_exists)
+def test_loaded_over_budget(pid_exists, cache_dir):
+    cache = model_cache.ModelCache(250 * MB, cache_dir=cache_dir)
+
+    with pytest.raises(MemoryError) as e:
+        cache.loaded("new", 100 * MB)
+
+    assert "over the model cache budget" in str(e.value)
+    assert len(cache.records()) == 3
+    assert "new" not in cache.models()
+
+
+@patch("psutil.pid_exists", side_effect=_pid_exists)
+def test_loaded_without_budget(pid_exists, cache_dir):
+    cache = model_cache.ModelCache(None, cache_dir=cache_dir)
+
+    cache.loaded("new", 1024 * MB)
+
+    assert cache.models()["new"]["footprint"] == 1024 * MB
+
+
+@patch("psutil.pid_exists", side_effect=_pid_exists)
+def test_models(pid_exists, cache_dir):
+    _write_record(cache_dir, "popular", 1005, 50 * MB, 25.0, 100)
+    cache = model_cache.ModelCache(MB, cache_dir=cache_dir)
+
+    assert cache.models() == {
+        "old": {"footprint": 100 * MB, "used_at": 10.0, "requests": 50},
+        "popular": {"footprint": 150 * MB, "used_at": 25.0, "requests": 600},
+    }
+
+
+@patch("psutil.pid_exists", side_effect=_pid_exists)
+def test_used(pid_exists, cache_dir):
+    cache = model_cache.ModelCache(1024 * MB, cache_dir=cache_dir)
+    cache.used()
+    cache.flush()
+    assert len(cache.records()) == 3
+
+    with patch("threading.Thread") as thread:
+        cache.loaded("new", 100 * MB)
+        cache.used()
+        cache.used()
+        cache.flush()
+
+    thread.assert_called_once()
+    assert cache.models()["new"]["requests"] == 2
+
+
+@patch("psutil.pid_exists", side_effect=_pid_exists)
+def test_hit_rates(pid_exists, cache_dir):
+    _write_record(cache_dir, "old", 1006, 100 * MB, 30.0, 1)
+    _write_record(cache_dir, "idle", 1007, 100 * MB, 30.0, 0)
+    cache = model_cache.ModelCache(MB, cache_dir=cache_dir)
+
+    assert cache.hit_rates() == {
+        "idle": None,
+        "old": 49.0 / 51,
+        "popular": 499.0 / 500,
+        "unloaded": 2.0 / 3,
+    }
+
+
+def test_reset(cache_dir):
+    model_cache.reset(cache_dir)
+
+    assert not os.path.exists(cache_dir)
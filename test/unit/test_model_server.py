@@ -15,13 +15,15 @@ import signal
 import subprocess
 import sys
 import types
+from urllib.error import HTTPError, URLError
+from urllib.parse import parse_qs, urlparse
 
 import botocore.session
 from botocore.stub import Stubber
 from mock import ANY, MagicMock, Mock, patch
 import pytest
 
-from sagemaker_inference import environment, model_server
+from sagemaker_inference import environment, model_server, parameters, resources
 from sagemaker_inference.model_server import MMS_NAMESPACE, REQUIREMENTS_PATH
 
 PYTHON_PATH = "python_path"
@@ -49,6 +51,8 @@ def test_start_model_server_default_service_handler(
     subprocess_call,
 ):
     env.return_value.startup_timeout = 10000
+    env.return_value.model_server_batch_size = None
+    env.return_value.model_server_max_batch_delay = None
 
     model_server.start_model_server()
 
@@ -86,6 +90,8 @@ def test_start_model_server_custom_handler_service(
     env, adapt, create_config, sigterm, retrieve, subprocess_popen, subprocess_call
 ):
     handler_service = Mock()
+    env.return_value.model_server_batch_size = None
+    env.return_value.model_server_max_batch_delay = None
 
     model_server.start_model_server(handler_service)
 
@@ -93,6 +99,282 @@ def test_start_model_server_custom_handler_service(
     create_config.assert_called_once_with(env.return_value, handler_service)
 
 
+@patch("subprocess.call")
+@patch("subprocess.Popen")
+@patch("sagemaker_inference.model_server._retry_register_model")
+@patch("sagemaker_inference.model_server._retry_retrieve_mms_server_process")
+@patch("sagemaker_inference.model_server._add_sigterm_handler")
+@patch("os.path.exists", return_value=False)
+@patch("sagemaker_inference.model_server._create_model_server_config_file")
+@patch("sagemaker_inference.environment.Environment")
+def test_start_model_server_batching(
+    env, create_config, exists, sigterm, retrieve, register_model, subprocess_popen, subprocess_call
+):
+    env.return_value.model_server_batch_size = 8
+    env.return_value.model_server_max_batch_delay = None
+
+    model_server.start_model_server()
+
+    multi_model_server_cmd = subprocess_popen.call_args[0][0]
+    assert "--models" not in multi_model_server_cmd
+    register_model.assert_called_once_with(env.return_value)
+
+
+@patch("subprocess.Popen")
+@patch("sagemaker_inference.http_server.ModelServer")
+@patch("sagemaker_inference.model_server._install_requirements")
+@patch("os.path.exists", return_value=True)
+@patch("sagemaker_inference.environment.Environment")
+def test_start_model_server_python_backend(
+    env, exists, install_requirements, python_model_server, subprocess_popen
+):
+    env.return_value.model_server_backend = environment.PYTHON_BACKEND
+
+    model_server.start_model_server()
+
+    install_requirements.assert_called_once_with()
+    python_model_server.assert_called_once_with(
+        model_server.DEFAULT_HANDLER_SERVICE, env.return_value
+    )
+    python_model_server.return_value.start.assert_called_once_with()
+    subprocess_popen.assert_not_called()
+
+
+@patch("sagemaker_inference.resources.set_thread_limits")
+@patch("sagemaker_inference.resources.cpu_count", return_value=8)
+@patch("sagemaker_inference.http_server.ModelServer")
+@patch("os.path.exists", return_value=False)
+@patch("sagemaker_inference.environment.Environment")
+def test_start_model_server_python_backend_auto_workers(
+    env, exists, python_model_server, cpu_count, set_thread_limits
+):
+    env.return_value.model_server_backend = environment.PYTHON_BACKEND
+    env.return_value.model_server_workers = environment.AUTO_WORKERS
+    env.return_value.model_server_worker_count = 4
+    python_model_server.return_value.start.side_effect = (
+        lambda: set_thread_limits.assert_called_once_with(2)
+    )
+
+    model_server.start_model_server()
+
+    python_model_server.return_value.start.assert_called_once_with()
+
+
+@patch("sagemaker_inference.drain.reset")
+@patch("sagemaker_inference.http_server.ModelServer")
+@patch("sagemaker_inference.model_server._install_requirements")
+@patch("os.path.exists", return_value=False)
+@patch("sagemaker_inference.environment.Environment")
+def test_start_model_server_resets_drain_state(
+    env, exists, install_requirements, python_model_server, reset
+):
+    env.return_value.model_server_backend = environment.PYTHON_BACKEND
+    python_model_server.return_value.start.side_effect = lambda: reset.assert_called_once_with()
+
+    model_server.start_model_server()
+
+    python_model_server.return_value.start.assert_called_once_with()
+
+
+@patch("sagemaker_inference.prometheus.start_exporter")
+@patch("sagemaker_inference.prometheus.reset")
+@patch("sagemaker_inference.http_server.ModelServer")
+@patch("sagemaker_inference.model_server._install_requirements")
+@patch("os.path.exists", return_value=False)
+@patch("sagemaker_inference.environment.Environment")
+def test_start_model_server_prometheus_metrics(
+    env, exists, install_requirements, python_model_server, reset, start_exporter
+):
+    env.return_value.model_server_backend = environment.PYTHON_BACKEND
+    env.return_value.model_server_prometheus_metrics = True
+    env.return_value.safe_port_range = "9100-9200"
+
+    model_server.start_model_server()
+
+    reset.assert_called_once_with()
+    start_exporter.assert_called_once_with(9100)
+    python_model_server.return_value.start.assert_called_once_with()
+
+
+@patch("sagemaker_inference.prefetch.Prefetcher")
+@patch("sagemaker_inference.model_cache.reset")
+@patch("sagemaker_inference.model_server._retry_retrieve_mms_server_process")
+@patch("sagemaker_inference.model_server._add_sigterm_handler")
+@patch("sagemaker_inference.model_server._create_model_server_config_file")
+@patch("subprocess.Popen")
+@patch("os.path.exists", return_value=False)
+@patch("sagemaker_inference.environment.Environment")
+@patch("sagemaker_inference.model_server.ENABLE_MULTI_MODEL", True)
+def test_start_model_server_prefetch(
+    env, exists, popen, create_config, sigterm, retrieve, reset, prefetcher
+):
+    env.return_value.model_server_prometheus_metrics = False
+    env.return_value.model_server_model_cache = False
+    env.return_value.model_server_prefetch = True
+    env.return_value.model_server_prefetch_memory = 1024
+
+    model_server.start_model_server()
+
+    reset.assert_called_once_with()
+    prefetcher.assert_called_once_with(1024)
+    prefetcher.return_value.start.assert_called_once_with()
+
+
+@patch("sagemaker_inference.model_cache.reset")
+@patch("sagemaker_inference.http_server.ModelServer")
+@patch("sagemaker_inference.model_server._install_requirements")
+@patch("os.path.exists", return_value=False)
+@patch("sagemaker_inference.environment.Environment")
+def test_start_model_server_model_cache(
+    env, exists, install_requirements, python_model_server, reset
+):
+    env.return_value.model_server_backend = environment.PYTHON_BACKEND
+    env.return_value.model_server_prometheus_metrics = False
+    env.return_value.model_server_model_cache = True
+
+    model_server.start_model_server()
+
+    reset.assert_called_once_with()
+
+
+@patch("sagemaker_inference.prometheus.start_exporter")
+@patch("sagemaker_inference.http_server.ModelServer")
+@patch("sagemaker_inference.model_server._install_requirements")
+@patch("os.path.exists", return_value=False)
+@patch("sagemaker_inference.environment.Environment")
+def test_start_model_server_prometheus_metrics_without_port_range(
+    env, exists, install_requirements, python_model_server, start_exporter
+):
+    env.return_value.model_server_backend = environment.PYTHON_BACKEND
+    env.return_value.model_server_prometheus_metrics = True
+    env.return_value.safe_port_range = None
+
+    model_server.start_model_server()
+
+    start_exporter.assert_not_called()
+    python_model_server.return_value.start.assert_called_once_with()
+
+
+@patch("subprocess.call")
+@patch("subprocess.Popen")
+@patch("sagemaker_inference.http_server.ModelServer")
+@patch("sagemaker_inference.model_server._retry_retrieve_mms_server_process")
+@patch("sagemaker_inference.model_server._add_sigterm_handler")
+@patch("os.path.exists", return_value=False)
+@patch("sagemaker_inference.model_server._create_model_server_config_file")
+@patch("sagemaker_inference.model_server.ENABLE_MULTI_MODEL", True)
+@patch("sagemaker_inference.environment.Environment")
+def test_start_model_server_python_backend_multi_model(
+    env,
+    create_config,
+    exists,
+    sigterm,
+    retrieve,
+    python_model_server,
+    subprocess_popen,
+    subprocess_call,
+):
+    env.return_value.model_server_backend = environment.PYTHON_BACKEND
+    env.return_value.model_server_batch_size = None
+    env.return_value.model_server_max_batch_delay = None
+
+    model_server.start_model_server()
+
+    python_model_server.assert_not_called()
+    subprocess_popen.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "multi_model, batch_size, max_batch_delay, expected",
+    [
+        (False, None, None, False),
+        (False, 8, None, True),
+        (False, 8, 50, True),
+        (False, None, 50, False),
+        (True, 8, 50, False),
+    ],
+)
+def test_batching_enabled(multi_model, batch_size, max_batch_delay, expected):
+    env = Mock(model_server_batch_size=batch_size, model_server_max_batch_delay=max_batch_delay)
+
+    with patch("sagemaker_inference.model_server.ENABLE_MULTI_MODEL", multi_model), patch(
+        "sagemaker_inference.model_server.logger"
+    ) as logger:
+        assert model_server._batching_enabled(env) is expected
+
+    if batch_size is None and max_batch_delay is None:
+        logger.warning.assert_not_called()
+    elif not expected:
+        logger.warning.assert_called_once()
+    else:
+        assert "/ping reports the server healthy" in logger.warning.call_args[0][0]
+
+
+@patch("sagemaker_inference.model_server.urlopen")
+def test_register_model(urlopen):
+    env = Mock(
+        model_server_worker_count=2,
+        model_server_batch_size=8,
+        model_server_max_batch_delay=50,
+        model_server_timeout=60,
+        management_http_port="8080",
+        startup_timeout=600,
+    )
+
+    model_server._register_model(env)
+
+    request = urlopen.call_args[0][0]
+    url = urlparse(request.full_url)
+    assert request.get_method() == "POST"
+    assert url.netloc == "127.0.0.1:8080"
+    assert url.path == "/models"
+    assert parse_qs(url.query) == {
+        "url": [environment.model_dir],
+        "model_name": [model_server.DEFAULT_MMS_MODEL_NAME],
+        "initial_workers": ["2"],
+        "batch_size": ["8"],
+        "max_batch_delay": ["50"],
+        "response_timeout": ["60"],
+        "synchronous": ["true"],
+    }
+
+
+@patch("sagemaker_inference.resources.cpu_count", return_value=4)
+@patch("sagemaker_inference.model_server.urlopen")
+def test_register_model_default_workers(urlopen, cpu_count):
+    env = Mock(
+        model_server_worker_count=None,
+        model_server_max_batch_delay=None,
+        management_http_port="8080",
+    )
+
+    model_server._register_model(env)
+
+    query = parse_qs(urlparse(urlopen.call_args[0][0].full_url).query)
+    assert query["initial_workers"] == ["4"]
+    assert "max_batch_delay" not in query
+
+
+@patch("sagemaker_inference.model_server._register_model")
+def test_retry_register_model_connection_error(register_model):
+    register_model.side_effect = [URLError("connection refused"), None]
+
+    with patch("time.sleep"):
+        model_server._retry_register_model(Mock(startup_timeout=100))
+
+    assert register_model.call_count == 2
+
+
+@patch("sagemaker_inference.model_server._register_model")
+def test_retry_register_model_http_error(register_model):
+    register_model.side_effect = HTTPError("url", 409, "Conflict", {}, None)
+
+    with pytest.raises(HTTPError):
+        model_server._retry_register_model(Mock(startup_timeout=100))
+
+    register_model.assert_called_once()
+
+
 @patch("sagemaker_inference.model_server._set_python_path")
 @patch("subprocess.check_call")
 @patch("os.makedirs")
@@ -178,6 +460,9 @@ def test_generate_mms_config_properties(env, read_file):
     env.return_value.model_server_timeout = model_server_timeout
     env.return_value.model_server_workers = model_server_workers
     env.return_value.inference_http_port = http_port
+    env.return_value.model_server_netty_threads = 4
+    env.return_value.model_server_netty_client_threads = 2
+    env.return_value.model_server_job_queue_size = 1000
 
     mms_config_properties = model_server._generate_mms_config_properties(env.return_value)
 
@@ -191,6 +476,9 @@ def test_generate_mms_config_properties(env, read_file):
     assert inference_address in mms_config_properties
     assert server_timeout in mms_config_properties
     assert workers in mms_config_properties
+    assert "number_of_netty_threads=4\n" in mms_config_properties
+    assert "netty_client_threads=2\n" in mms_config_properties
+    assert "job_queue_size=1000\n" in mms_config_properties
 
 
 @patch("sagemaker_inference.utils.read_file", return_value=DEFAULT_CONFIGURATION)
@@ -208,6 +496,85 @@ def test_generate_mms_config_properties_default_workers(env, read_file):
     assert workers not in mms_config_properties
 
 
+@patch("sagemaker_inference.resources.set_thread_limits")
+@patch("sagemaker_inference.resources.cpu_count", return_value=8)
+@patch("sagemaker_inference.utils.read_file", return_value=DEFAULT_CONFIGURATION)
+@patch("sagemaker_inference.environment.Environment")
+def test_generate_mms_config_properties_auto_workers(env, read_file, cpu_count, set_thread_limits):
+    env.return_value.model_server_workers = environment.AUTO_WORKERS
+    env.return_value.model_server_worker_count = 4
+
+    mms_config_properties = model_server._generate_mms_config_properties(env.return_value)
+
+    set_thread_limits.assert_called_once_with(2)
+    assert "default_workers_per_model=4\n" in mms_config_properties
+
+
+@patch("sagemaker_inference.model_server.ENABLE_MULTI_MODEL", True)
+@patch("sagemaker_inference.resources.set_thread_limits")
+@patch("sagemaker_inference.resources.cpu_count", return_value=8)
+@patch("sagemaker_inference.utils.read_file", return_value=DEFAULT_CONFIGURATION)
+@patch("sagemaker_inference.environment.Environment")
+def test_generate_mms_config_properties_auto_workers_multi_model(
+    env, read_file, cpu_count, set_thread_limits
+):
+    env.return_value.model_server_workers = environment.AUTO_WORKERS
+    env.return_value.model_server_worker_count = 4
+
+    mms_config_properties = model_server._generate_mms_config_properties(env.return_value)
+
+    set_thread_limits.assert_called_once_with(1)
+    assert "default_workers_per_model=4\n" in mms_config_properties
+
+
+@patch.dict(os.environ, {}, clear=True)
+@patch("sagemaker_inference.utils.read_file", return_value=DEFAULT_CONFIGURATION)
+@patch("sagemaker_inference.environment.Environment")
+def test_generate_mms_config_properties_container_vmargs(env, read_file):
+    env.return_value.vmargs = environment.DEFAULT_VMARGS
+    env.return_value.memory_budget = resources.MemoryBudget(
+        total=8192 * resources.MB,
+        jvm_heap=600 * resources.MB,
+        jvm_direct_memory=200 * resources.MB,
+        jvm_overhead=128 * resources.MB,
+        workers=7264 * resources.MB,
+    )
+
+    mms_config_properties = model_server._generate_mms_config_properties(env.return_value)
+
+    vmargs = "vmargs=-XX:-UseContainerSupport -Xmx600m -XX:MaxDirectMemorySize=200m\n"
+    assert vmargs in mms_config_properties
+
+
+@pytest.mark.parametrize("vmargs", ["-Xmx1g", environment.DEFAULT_VMARGS])
+@patch("sagemaker_inference.utils.read_file", return_value=DEFAULT_CONFIGURATION)
+@patch("sagemaker_inference.environment.Environment")
+def test_generate_mms_config_properties_user_vmargs(env, read_file, vmargs):
+    env.return_value.vmargs = vmargs
+
+    with patch.dict(os.environ, {parameters.MODEL_SERVER_VMARGS: vmargs}):
+        mms_config_properties = model_server._generate_mms_config_properties(env.return_value)
+
+    assert "vmargs={}\n".format(vmargs) in mms_config_properties
+
+
+@pytest.mark.parametrize(
+    "preload_model, cpu_affinity, preloaded",
+    [(True, False, True), (True, True, False), (False, False, False)],
+)
+@patch("sagemaker_inference.utils.read_file", return_value=DEFAULT_CONFIGURATION)
+@patch("sagemaker_inference.environment.Environment")
+def test_generate_mms_config_properties_preload_model(
+    env, read_file, preload_model, cpu_affinity, preloaded
+):
+    env.return_value.model_server_preload_model = preload_model
+    env.return_value.model_server_cpu_affinity = cpu_affinity
+
+    mms_config_properties = model_server._generate_mms_config_properties(env.return_value)
+
+    assert ("preload_model=true\n" in mms_config_properties) is preloaded
+
+
 @patch("signal.signal")
 def test_add_sigterm_handler(signal_call):
     mms = Mock()
@@ -223,6 +590,26 @@ def test_add_sigterm_handler(signal_call):
     assert isinstance(second_argument, types.FunctionType)
 
 
+@pytest.mark.parametrize("drain_timeout", [0, 30])
+@patch("os.kill")
+@patch("sagemaker_inference.drain.drain")
+@patch("sagemaker_inference.environment.Environment")
+@patch("signal.signal")
+def test_sigterm_handler_drain(signal_call, env, drain, kill, drain_timeout):
+    env.return_value.model_server_drain_timeout = drain_timeout
+    mms = Mock()
+
+    model_server._add_sigterm_handler(mms)
+    terminate = signal_call.call_args[0][1]
+    terminate(signal.SIGTERM, None)
+
+    if drain_timeout:
+        drain.assert_called_once_with(drain_timeout)
+    else:
+        drain.assert_not_called()
+    kill.assert_called_once_with(mms.pid, signal.SIGTERM)
+
+
 @patch("subprocess.check_call")
 def test_install_requirements(check_call):
     model_server._install_requirements()
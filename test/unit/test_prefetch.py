@@ -0,0 +1,122 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import os
+
+from mock import patch
+import pytest
+
+from sagemaker_inference import prefetch
+
+NOW = 100000.0
+
+
+@pytest.fixture
+def model_dirs(tmpdir):
+    dirs = {}
+    for name, size in (("frequent", 300), ("recent", 200), ("rare", 100), ("loaded", 100)):
+        path = os.path.join(str(tmpdir), name)
+        os.makedirs(os.path.join(path, "shards"))
+        with open(os.path.join(path, "shards", "weights.bin"), "wb") as f:
+            f.write(b"0" * size)
+        dirs[name] = path
+    return dirs
+
+
+@pytest.fixture
+def records(model_dirs):
+    return [
+        _record("frequent", model_dirs, NOW - 3600, 1000),
+        _record("recent", model_dirs, NOW - 60, 10),
+        _record("rare", model_dirs, NOW - 7200, 1),
+        _record("loaded", model_dirs, NOW - 600, 5, alive=True),
+        _record("loaded", model_dirs, NOW - 9000, 5),
+        _record("deleted", {"deleted": "/nonexistent"}, NOW - 60, 50),
+    ]
+
+
+def _record(name, model_dirs, used_at, requests, alive=False):
+    return {
+        "model": name,
+        "model_dir": model_dirs[name],
+        "pid": 1,
+        "footprint": 0,
+        "used_at": used_at,
+        "requests": requests,
+        "alive": alive,
+    }
+
+
+def test_score():
+    assert prefetch.score(9, NOW, NOW) == 10
+    assert prefetch.score(9, NOW - prefetch.HALF_LIFE, NOW) == 5
+    assert prefetch.score(0, NOW + 10, NOW) == 1
+
+
+def test_warm(model_dirs):
+    assert prefetch.warm(model_dirs["frequent"]) == 300
+
+
+def test_candidates(records, model_dirs):
+    candidates = prefetch.Prefetcher(1000).candidates(records, NOW)
+
+    assert [(name, model_dir) for name, model_dir, _ in candidates] == [
+        ("frequent", model_dirs["frequent"]),
+        ("recent", model_dirs["recent"]),
+        ("rare", model_dirs["rare"]),
+    ]
+
+
+@patch("sagemaker_inference.prefetch.warm")
+@patch("sagemaker_inference.model_cache.records")
+def test_prefetch_within_budget(model_cache_records, warm, records):
+    model_cache_records.return_value = records
+    prefetcher = prefetch.Prefetcher(400, "cache")
+
+    assert prefetcher.prefetch(NOW) == ["frequent", "rare"]
+    model_cache_records.assert_called_once_with("cache")
+    assert warm.call_count == 2
+
+    assert prefetcher.prefetch(NOW) == []
+    assert warm.call_count == 2
+
+
+@patch("sagemaker_inference.prefetch.warm")
+@patch("sagemaker_inference.model_cache.records")
+def test_prefetch_waits_for_idle_time(model_cache_records, warm, records):
+    records[3]["used_at"] = NOW - 1
+    model_cache_records.return_value = records
+
+    assert prefetch.Prefetcher(1000).prefetch(NOW) == []
+    warm.assert_not_called()
+
+
+@patch("sagemaker_inference.prefetch.warm")
+@patch("sagemaker_inference.model_cache.records")
+def test_prefetch_again_after_reload(model_cache_records, warm, records):
+    model_cache_records.return_value = records
+    prefetcher = prefetch.Prefetcher(1000)
+    assert prefetcher.prefetch(NOW) == ["frequent", "recent", "rare"]
+
+    records[2]["alive"] = True
+    prefetcher.prefetch(NOW)
+    records[2]["alive"] = False
+
+    assert prefetcher.prefetch(NOW) == ["rare"]
+
+
+@patch("threading.Thread")
+def test_start(thread):
+    prefetcher = prefetch.Prefetcher(1000)
+
+    assert prefetcher.start() is thread.return_value
+    thread.return_value.start.assert_called_once_with()
@@ -0,0 +1,89 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import os
+import signal
+import sys
+import threading
+
+from mock import Mock, patch
+
+from sagemaker_inference import profiler
+
+
+def _busy(stop):
+    while not stop.is_set():
+        pass
+
+
+def test_collapse():
+    frame = sys._getframe()
+
+    stack = profiler._collapse("MainThread", frame).split(";")
+
+    assert stack[0] == "MainThread"
+    assert stack[-1] == "test_collapse ({})".format(__file__)
+
+
+def test_sample():
+    stop = threading.Event()
+    thread = threading.Thread(target=_busy, args=(stop,), name="busy")
+    thread.start()
+    try:
+        samples = profiler.Profiler("/tmp", 0.05, interval=0.001).sample()
+    finally:
+        stop.set()
+        thread.join()
+
+    busy_stacks = [stack for stack in samples if stack.startswith("busy;")]
+    assert busy_stacks
+    assert all("_busy (" in stack for stack in busy_stacks)
+    assert not any("sample (" in stack for stack in samples)
+
+
+@patch("sagemaker_inference.profiler.Profiler.sample")
+def test_profile(sample, tmpdir):
+    sample.return_value = profiler.collections.Counter({"MainThread;a;b": 3, "MainThread;a": 1})
+
+    path = profiler.Profiler(str(tmpdir), 1).profile()
+
+    assert os.path.dirname(path) == str(tmpdir)
+    assert os.path.basename(path).startswith("profile-{}-".format(os.getpid()))
+    with open(path) as f:
+        assert f.read() == "MainThread;a;b 3\nMainThread;a 1\n"
+
+
+@patch("threading.Thread")
+def test_start_once_at_a_time(thread):
+    thread.return_value.is_alive.return_value = True
+    p = profiler.Profiler("/tmp", 1)
+
+    assert p.start() is True
+    assert p.start() is False
+    thread.return_value.start.assert_called_once_with()
+
+
+@patch("signal.signal")
+def test_install(signal_fn):
+    p = Mock()
+
+    assert profiler.install(p) is True
+
+    signo, handler = signal_fn.call_args[0]
+    assert signo == signal.SIGUSR2
+    handler(signo, None)
+    p.start.assert_called_once_with()
+
+
+@patch("signal.signal", side_effect=ValueError)
+def test_install_outside_main_thread(signal_fn):
+    assert profiler.install(Mock()) is False
@@ -0,0 +1,128 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import json
+import os
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from mock import patch
+import pytest
+
+from sagemaker_inference import prometheus
+
+
+@pytest.fixture
+def registry(tmpdir):
+    with patch("threading.Thread"):
+        yield prometheus.Registry(str(tmpdir))
+
+
+def test_registry_snapshot(registry):
+    registry.inc(prometheus.REQUESTS, {"content_type": "application/json"})
+    registry.inc(prometheus.REQUESTS, {"content_type": "application/json"}, 2)
+    registry.observe(prometheus.BATCH_SIZE, 3, buckets=(1, 4))
+
+    assert registry.snapshot() == {
+        "counters": [[prometheus.REQUESTS, {"content_type": "application/json"}, 3]],
+        "histograms": [[prometheus.BATCH_SIZE, {}, [1, 4], [0, 1, 0], 3.0]],
+    }
+
+
+def test_registry_flush(registry, tmpdir):
+    registry.flush()
+    assert os.listdir(str(tmpdir)) == []
+
+    registry.inc(prometheus.ERRORS, {"status": "500"})
+    registry.flush()
+
+    path = os.path.join(str(tmpdir), "{}{}.json".format(prometheus.FILE_PREFIX, os.getpid()))
+    with open(path) as f:
+        assert json.load(f)["counters"] == [[prometheus.ERRORS, {"status": "500"}, 1]]
+
+
+def test_registry_resets_after_fork(registry):
+    registry.inc(prometheus.REQUESTS)
+
+    with patch("os.getpid", return_value=-1):
+        registry.inc(prometheus.ERRORS)
+
+    assert registry.snapshot()["counters"] == [[prometheus.ERRORS, {}, 1]]
+
+
+def _write(metrics_dir, pid, snapshot):
+    with open(os.path.join(metrics_dir, "{}{}.json".format(prometheus.FILE_PREFIX, pid)), "w") as f:
+        json.dump(snapshot, f)
+
+
+def test_collect(tmpdir):
+    metrics_dir = str(tmpdir)
+    _write(
+        metrics_dir,
+        1,
+        {
+            "counters": [["requests_total", {"content_type": "text/csv"}, 2]],
+            "histograms": [["batch_size", {}, [1, 4], [1, 1, 0], 3.0]],
+        },
+    )
+    _write(
+        metrics_dir,
+        2,
+        {
+            "counters": [["requests_total", {"content_type": "text/csv"}, 3]],
+            "histograms": [["batch_size", {}, [1, 4], [0, 0, 1], 8.0]],
+        },
+    )
+    with open(os.path.join(metrics_dir, prometheus.FILE_PREFIX + "3.json"), "w") as f:
+        f.write("{")
+
+    assert prometheus.collect(metrics_dir) == "\n".join(
+        [
+            "# TYPE requests_total counter",
+            'requests_total{content_type="text/csv"} 5',
+            "# TYPE batch_size histogram",
+            'batch_size_bucket{le="1.0"} 1',
+            'batch_size_bucket{le="4.0"} 2',
+            'batch_size_bucket{le="+Inf"} 3',
+            "batch_size_sum 11.0",
+            "batch_size_count 3",
+            "",
+        ]
+    )
+
+
+def test_collect_escapes_labels(tmpdir):
+    _write(str(tmpdir), 1, {"counters": [["errors_total", {"x": 'a"b'}, 1]], "histograms": []})
+
+    assert 'errors_total{x="a\\"b"} 1' in prometheus.collect(str(tmpdir))
+
+
+@pytest.mark.parametrize("safe_port_range, expected", [(None, None), ("9100-9200", 9100)])
+def test_exporter_port(safe_port_range, expected):
+    assert prometheus.exporter_port(safe_port_range) == expected
+
+
+def test_start_exporter(tmpdir):
+    _write(str(tmpdir), 1, {"counters": [["requests_total", {}, 1]], "histograms": []})
+    server = prometheus.start_exporter(0, str(tmpdir))
+    url = "http://127.0.0.1:{}".format(server.server_address[1])
+    try:
+        response = urlopen(url + prometheus.METRICS_PATH)
+        assert response.headers["Content-Type"] == prometheus.CONTENT_TYPE
+        assert b"requests_total 1" in response.read()
+
+        with pytest.raises(HTTPError) as e:
+            urlopen(url + "/other")
+        assert e.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
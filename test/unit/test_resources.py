@@ -0,0 +1,167 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import os
+
+from mock import Mock, patch
+import pytest
+
+from sagemaker_inference import resources
+
+GB = 1024 * 1024 * 1024
+
+
+def _sys_files(files):
+    def read(path):
+        return files.get(path)
+
+    return read
+
+
+@pytest.mark.parametrize(
+    "files, expected",
+    [
+        ({resources.CGROUP_V2_CPU_MAX: "250000 100000"}, 2.5),
+        ({resources.CGROUP_V2_CPU_MAX: "max 100000"}, None),
+        (
+            {resources.CGROUP_V1_CPU_QUOTA: "200000", resources.CGROUP_V1_CPU_PERIOD: "100000"},
+            2.0,
+        ),
+        ({resources.CGROUP_V1_CPU_QUOTA: "-1", resources.CGROUP_V1_CPU_PERIOD: "100000"}, None),
+        ({}, None),
+    ],
+)
+def test_cpu_quota(files, expected):
+    with patch("sagemaker_inference.resources._read_sys_file", _sys_files(files)):
+        assert resources.cpu_quota() == expected
+
+
+@pytest.mark.parametrize(
+    "cpu_list, expected", [("0-3", [0, 1, 2, 3]), ("0,2,4-5\n", [0, 2, 4, 5]), ("", [])]
+)
+def test_parse_cpu_list(cpu_list, expected):
+    assert resources.parse_cpu_list(cpu_list) == expected
+
+
+@patch(
+    "glob.glob",
+    return_value=[
+        "/sys/devices/system/node/node0/cpulist",
+        "/sys/devices/system/node/node1/cpulist",
+    ],
+)
+def test_numa_nodes(glob):
+    files = {
+        "/sys/devices/system/node/node0/cpulist": "0-1",
+        "/sys/devices/system/node/node1/cpulist": "2-3",
+    }
+    with patch("sagemaker_inference.resources._read_sys_file", _sys_files(files)):
+        assert resources.numa_nodes() == {0: [0, 1], 1: [2, 3]}
+
+
+@patch("sagemaker_inference.resources.allowed_cpus", return_value=list(range(8)))
+@patch("sagemaker_inference.resources.cpu_quota", return_value=2.5)
+def test_cpu_count_bounded_by_quota(cpu_quota, allowed_cpus):
+    assert resources.cpu_count() == 2
+
+
+@patch("sagemaker_inference.resources.allowed_cpus", return_value=list(range(8)))
+@patch("sagemaker_inference.resources.cpu_quota", return_value=0.5)
+def test_cpu_count_at_least_one(cpu_quota, allowed_cpus):
+    assert resources.cpu_count() == 1
+
+
+@patch("psutil.virtual_memory", return_value=Mock(total=64 * GB))
+def test_memory_limit_cgroup(virtual_memory):
+    files = {resources.CGROUP_V2_MEMORY_MAX: str(4 * GB)}
+    with patch("sagemaker_inference.resources._read_sys_file", _sys_files(files)):
+        assert resources.memory_limit() == 4 * GB
+
+
+@patch("psutil.virtual_memory", return_value=Mock(total=64 * GB))
+def test_memory_limit_unlimited(virtual_memory):
+    files = {resources.CGROUP_V2_MEMORY_MAX: "max"}
+    with patch("sagemaker_inference.resources._read_sys_file", _sys_files(files)):
+        assert resources.memory_limit() == 64 * GB
+
+
+def test_directory_size(tmpdir):
+    tmpdir.join("a").write("1234")
+    tmpdir.mkdir("code").join("b").write("12")
+
+    assert resources.directory_size(str(tmpdir)) == 6
+
+
+@pytest.mark.parametrize(
+    "cpus, memory, worker_memory, expected",
+    [
+        (8, 64 * GB, GB, (8, 1)),
+        (8, 4 * GB, GB, (4, 2)),
+        (8, GB, 2 * GB, (1, 8)),
+        (3, 4 * GB, GB, (3, 1)),
+    ],
+)
+def test_auto_tune_workers(cpus, memory, worker_memory, expected):
+    with patch("sagemaker_inference.resources.cpu_count", return_value=cpus), patch(
+        "sagemaker_inference.resources.memory_limit", return_value=memory
+    ):
+        assert resources.auto_tune_workers(worker_memory) == expected
+
+
+@patch("sagemaker_inference.resources.directory_size", return_value=3 * GB)
+@patch("sagemaker_inference.resources.memory_limit", return_value=16 * GB)
+@patch("sagemaker_inference.resources.cpu_count", return_value=8)
+def test_auto_tune_workers_estimates_worker_memory(cpu_count, memory_limit, directory_size):
+    workers, threads = resources.auto_tune_workers(model_dir="/opt/ml/model")
+
+    directory_size.assert_called_once_with("/opt/ml/model")
+    assert workers == 16 * GB // (3 * GB + resources.WORKER_BASE_MEMORY)
+    assert threads == 8 // workers
+
+
+@pytest.mark.parametrize(
+    "total, max_request_size, expected_heap, expected_direct",
+    [
+        (GB, None, resources.MIN_JVM_HEAP, resources.MIN_JVM_DIRECT_MEMORY),
+        (16 * GB, None, GB, resources.MIN_JVM_DIRECT_MEMORY),
+        (64 * GB, None, resources.MAX_JVM_HEAP, resources.MIN_JVM_DIRECT_MEMORY),
+        (16 * GB, 100 * resources.MB, GB + 400 * resources.MB, 400 * resources.MB),
+    ],
+)
+def test_memory_budget(total, max_request_size, expected_heap, expected_direct):
+    budget = resources.memory_budget(max_request_size, total)
+
+    assert budget.total == total
+    assert budget.jvm_heap == expected_heap
+    assert budget.jvm_direct_memory == expected_direct
+    assert budget.workers == total - expected_heap - expected_direct - resources.JVM_OVERHEAD
+
+
+def test_memory_budget_small_container():
+    budget = resources.memory_budget(total=256 * resources.MB)
+
+    assert budget.workers == 0
+
+
+@patch("sagemaker_inference.resources.memory_limit", return_value=64 * GB)
+@patch("sagemaker_inference.resources.cpu_count", return_value=8)
+def test_auto_tune_workers_available_memory(cpu_count, memory_limit):
+    assert resources.auto_tune_workers(GB, available_memory=2 * GB) == (2, 4)
+
+
+@patch.dict(os.environ, {"MKL_NUM_THREADS": "4"}, clear=True)
+def test_set_thread_limits():
+    resources.set_thread_limits(2)
+
+    assert os.environ["OMP_NUM_THREADS"] == "2"
+    assert os.environ["OPENBLAS_NUM_THREADS"] == "2"
+    assert os.environ["MKL_NUM_THREADS"] == "4"
@@ -11,7 +11,12 @@
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
 
-from mock import call, Mock, patch
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+
+from mock import ANY, call, MagicMock, Mock, patch
 import pytest
 
 try:
@@ -19,9 +24,17 @@ try:
 except ImportError:
     import httplib as http_client
 
-from sagemaker_inference import content_types, environment
+from sagemaker_inference import (
+    batching,
+    content_types,
+    environment,
+    parameters,
+    prometheus,
+    utils,
+)
+from sagemaker_inference.context import Context
 from sagemaker_inference.default_inference_handler import DefaultInferenceHandler
-from sagemaker_inference.errors import BaseInferenceToolkitError
+from sagemaker_inference.errors import BaseInferenceToolkitError, GenericInferenceToolkitError
 from sagemaker_inference.transformer import Transformer
 
 INPUT_DATA = "input_data"
@@ -36,6 +49,31 @@ PREDICT_RESULT = "prediction_result"
 PROCESSED_RESULT = "processed_result"
 
 
+@pytest.fixture
+def env():
+    """Patch the Environment read by ``validate_and_initialize``, with every optional
+    feature turned off, so that tests only set the settings they exercise.
+    """
+    with patch("sagemaker_inference.environment.Environment") as environment_class:
+        environment_class.return_value.configure_mock(
+            model_server_backend=environment.MMS_BACKEND,
+            model_server_drain_timeout=0,
+            model_server_pipeline_threads=0,
+            model_server_request_deadlines=False,
+            model_server_max_inflight_requests=None,
+            model_server_max_latency=None,
+            model_server_stage_metrics=False,
+            model_server_prometheus_metrics=False,
+            model_server_memory_profiling=False,
+            model_server_worker_max_rss=None,
+            model_server_model_cache=False,
+            model_server_prefetch=False,
+            model_server_worker_batch_size=None,
+            model_server_preload_model=False,
+        )
+        yield environment_class
+
+
 def test_default_transformer():
     transformer = Transformer()
 
@@ -252,9 +290,502 @@ def test_transform_tuple(validate, retrieve_content_type_header, run_handler):
     assert result[0] == run_handler()[0]
 
 
+@patch("sagemaker_inference.transformer.Transformer._run_handler_function", return_value=RESULT)
+@patch("sagemaker_inference.utils.retrieve_content_type_header", return_value=CONTENT_TYPE)
+@patch("sagemaker_inference.transformer.Transformer.validate_and_initialize")
+def test_transform_tracks_inflight_requests(validate, retrieve_content_type_header, run_handler):
+    data = [{"body": INPUT_DATA}]
+    context = Mock()
+    context.request_processor = [Mock()]
+    context.request_processor[0].get_request_properties.return_value = {"accept": ACCEPT}
+    inflight_requests = MagicMock()
+
+    transformer = Transformer()
+    transformer._inflight_requests = inflight_requests
+
+    with patch("sagemaker_inference.drain.is_draining", return_value=False):
+        result = transformer.transform(data, context)
+
+    assert result == [RESULT]
+    inflight_requests.__enter__.assert_called_once()
+    inflight_requests.__exit__.assert_called_once()
+
+
+@patch("sagemaker_inference.drain.is_draining", return_value=True)
+@patch("sagemaker_inference.transformer.Transformer._run_handler_function")
+@patch("sagemaker_inference.transformer.Transformer.validate_and_initialize")
+def test_transform_draining(validate, run_handler, is_draining):
+    context = Mock()
+
+    transformer = Transformer()
+    transformer._inflight_requests = MagicMock()
+
+    result = transformer.transform([{"body": INPUT_DATA}], context)
+
+    run_handler.assert_not_called()
+    context.set_response_status.assert_called_once_with(
+        code=http_client.SERVICE_UNAVAILABLE, phrase="Model server is shutting down"
+    )
+    assert "Model server is shutting down" in result[0]
+
+
+def _pipelined_transformer():
+    transformer = Transformer()
+    transformer._model = MODEL
+    transformer._environment = Mock(default_accept=ACCEPT)
+    transformer._pipeline = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pipeline")
+    transformer._transform_fn = transformer._default_transform_fn
+    return transformer
+
+
+@patch("sagemaker_inference.transformer.Transformer.validate_and_initialize")
+def test_transform_pipelined(validate):
+    data = [{"body": b"1"}, {"body": b"2"}, {"body": b"3"}]
+    context = MagicMock()
+    context.request_processor[0].get_request_properties.return_value = {
+        "Content-Type": CONTENT_TYPE,
+        "Accept": ACCEPT,
+    }
+    threads = {}
+
+    def input_fn(input_data, content_type):
+        threads.setdefault("input_fn", set()).add(threading.current_thread().name)
+        return int(input_data)
+
+    def predict_fn(data, model):
+        threads.setdefault("predict_fn", set()).add(threading.current_thread().name)
+        return data * 10
+
+    def output_fn(prediction, accept):
+        threads.setdefault("output_fn", set()).add(threading.current_thread().name)
+        return str(prediction)
+
+    transformer = _pipelined_transformer()
+    transformer._input_fn = input_fn
+    transformer._predict_fn = predict_fn
+    transformer._output_fn = output_fn
+
+    result = transformer.transform(data, context)
+
+    assert result == ["10", "20", "30"]
+    assert threads["predict_fn"] == {threading.current_thread().name}
+    assert all(name.startswith("pipeline") for name in threads["input_fn"] | threads["output_fn"])
+
+
+@patch("sagemaker_inference.transformer.Transformer._run_handler_function", return_value=RESULT)
+@patch("sagemaker_inference.transformer.Transformer.validate_and_initialize")
+def test_transform_pipelined_custom_transform_fn(validate, run_handler):
+    context = MagicMock()
+    context.request_processor[0].get_request_properties.return_value = {"Accept": ACCEPT}
+
+    transformer = _pipelined_transformer()
+    transformer._transform_fn = Mock()
+
+    result = transformer.transform([{"body": INPUT_DATA}, {"body": INPUT_DATA}], context)
+
+    assert result == [RESULT, RESULT]
+    assert run_handler.call_count == 2
+    run_handler.assert_called_with(transformer._transform_fn, MODEL, INPUT_DATA, None, ACCEPT)
+
+
+@pytest.mark.parametrize("pipeline_threads, pipelined", [(0, False), (4, True)])
 @patch("sagemaker_inference.transformer.Transformer._validate_user_module_and_set_functions")
-@patch("sagemaker_inference.environment.Environment")
-def test_validate_and_initialize(env, validate_user_module):
+def test_validate_and_initialize_pipeline(validate_user_module, pipeline_threads, pipelined, env):
+    env.return_value.model_server_pipeline_threads = pipeline_threads
+    transformer = Transformer()
+    transformer._model_fn = Mock()
+
+    transformer.validate_and_initialize()
+
+    assert (transformer._pipeline is not None) is pipelined
+
+
+@pytest.mark.parametrize("batch_predict_fn, batched", [(None, False), (Mock(), True)])
+@patch("sagemaker_inference.transformer.Transformer._validate_user_module_and_set_functions")
+def test_validate_and_initialize_worker_batching(
+    validate_user_module, batch_predict_fn, batched, env
+):
+    env.return_value.model_server_worker_batch_size = 4
+    env.return_value.model_server_worker_max_batch_delay = 10
+    env.return_value.model_server_low_priority_batch_share = 0.5
+    transformer = Transformer()
+    transformer._model_fn = Mock()
+    transformer._batch_predict_fn = batch_predict_fn
+
+    transformer.validate_and_initialize()
+
+    assert (transformer._batcher is not None) is batched
+
+
+def test_default_transform_fn_worker_batching():
+    def batch_predict_fn(data, model):
+        return [item + model for item in data]
+
+    transformer = Transformer()
+    transformer._model = 10
+    transformer._environment = Mock(model_server_worker_batch_size=4)
+    transformer._environment.model_server_worker_max_batch_delay = 10
+    transformer._environment.model_server_low_priority_batch_share = 0.5
+    transformer._batch_predict_fn = batch_predict_fn
+    transformer._batcher = transformer._create_batcher()
+    transformer._input_fn = lambda input_data, content_type: int(input_data)
+    transformer._predict_fn = Mock()
+    transformer._output_fn = lambda prediction, accept: str(prediction)
+
+    result = transformer._default_transform_fn(10, "1", CONTENT_TYPE, ACCEPT)
+
+    assert result == "11"
+    transformer._predict_fn.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "headers, priority",
+    [
+        ({}, batching.HIGH_PRIORITY),
+        ({utils.CUSTOM_ATTRIBUTES_HEADER: "priority=low"}, batching.LOW_PRIORITY),
+    ],
+)
+@patch("sagemaker_inference.transformer.Transformer.validate_and_initialize")
+def test_transform_worker_batching_priority(validate, headers, priority):
+    context = Context("model", environment.model_dir, request_headers=[headers])
+
+    transformer = Transformer()
+    transformer._environment = Mock(default_accept=ACCEPT)
+    transformer._batcher = MagicMock()
+    transformer._batcher.submit.return_value = 1
+    transformer._transform_fn = transformer._default_transform_fn
+    transformer._input_fn = lambda input_data, content_type: input_data
+    transformer._output_fn = lambda prediction, accept: str(prediction)
+
+    result = transformer.transform([{"body": INPUT_DATA}], context)
+
+    assert result == ["1"]
+    transformer._batcher.submit.assert_called_once_with(INPUT_DATA, priority)
+    transformer._batcher.__enter__.assert_called_once()
+    transformer._batcher.__exit__.assert_called_once()
+
+
+@patch("sagemaker_inference.transformer.Transformer.validate_and_initialize")
+def test_transform_stage_metrics(validate):
+    context = MagicMock()
+    context.request_processor[0].get_request_properties.return_value = {}
+
+    transformer = Transformer()
+    transformer._environment = Mock(default_accept=ACCEPT)
+    transformer._stage_metrics = Mock()
+    transformer._transform_fn = transformer._default_transform_fn
+    transformer._input_fn = lambda input_data, content_type: input_data
+    transformer._predict_fn = lambda data, model: data
+    transformer._output_fn = lambda prediction, accept: prediction
+
+    transformer.transform([{"body": INPUT_DATA}], context)
+
+    stages = [args[0] for args, _ in transformer._stage_metrics.observe.call_args_list]
+    assert stages == ["input_fn", "predict_fn", "output_fn", "transform_fn"]
+    transformer._stage_metrics.maybe_emit.assert_called_once_with(context.metrics, {})
+
+
+@patch("sagemaker_inference.transformer.Transformer.validate_and_initialize")
+def test_transform_prometheus_metrics(validate):
+    context = MagicMock()
+    context.request_processor[0].get_request_properties.return_value = {
+        "Content-Type": content_types.CSV
+    }
+
+    transformer = Transformer()
+    transformer._environment = Mock(default_accept=ACCEPT)
+    transformer._registry = Mock()
+    transformer._transform_fn = lambda model, input_data, content_type, accept: "out"
+
+    transformer.transform([{"body": b"1,2"}], context)
+
+    transformer._registry.inc.assert_has_calls(
+        [
+            call(prometheus.REQUESTS, {"content_type": content_types.CSV}),
+            call(prometheus.REQUEST_BYTES, {"content_type": content_types.CSV}, 3),
+            call(prometheus.RESPONSE_BYTES, {"content_type": ACCEPT}, 3),
+        ]
+    )
+    transformer._registry.observe.assert_any_call(
+        prometheus.BATCH_SIZE, 1, buckets=prometheus.BATCH_SIZE_BUCKETS
+    )
+    transformer._registry.observe.assert_any_call(
+        prometheus.STAGE_SECONDS, ANY, {"stage": "transform_fn"}
+    )
+
+
+@patch("sagemaker_inference.transformer.Transformer.validate_and_initialize")
+def test_transform_prometheus_metrics_error(validate):
+    context = MagicMock()
+    context.request_processor[0].get_request_properties.return_value = {}
+
+    transformer = Transformer()
+    transformer._environment = Mock(default_accept=ACCEPT)
+    transformer._registry = Mock()
+    transformer._transform_fn = Mock(side_effect=ValueError)
+
+    transformer.transform([{"body": INPUT_DATA}], context)
+
+    transformer._registry.inc.assert_any_call(prometheus.ERRORS, {"status": "500"})
+
+
+@patch("sagemaker_inference.transformer.Transformer.validate_and_initialize")
+def test_transform_memory_profiling(validate):
+    context = MagicMock()
+    context.request_processor[0].get_request_properties.return_value = {}
+
+    transformer = Transformer()
+    transformer._environment = Mock(default_accept=ACCEPT)
+    transformer._memory = Mock()
+    transformer._recycler = Mock()
+    transformer._transform_fn = lambda model, input_data, content_type, accept: "out"
+
+    transformer.transform([{"body": INPUT_DATA}], context)
+
+    transformer._memory.before.assert_called_once_with("transform_fn")
+    transformer._memory.after.assert_called_once_with(
+        "transform_fn", transformer._memory.before.return_value
+    )
+    transformer._memory.maybe_report.assert_called_once_with()
+    transformer._recycler.check.assert_called_once_with()
+
+
+@patch("sagemaker_inference.memory.rss", side_effect=[100, 612])
+@patch("sagemaker_inference.model_cache.ModelCache")
+@patch("sagemaker_inference.transformer.Transformer._validate_user_module_and_set_functions")
+def test_validate_and_initialize_model_cache(validate_user_module, model_cache, rss, env):
+    env.return_value.model_server_model_cache = True
+    env.return_value.model_server_model_cache_memory = 4096
+    transformer = Transformer()
+    transformer._model_fn = Mock()
+    transformer._registry = None
+    context = Mock(model_name="resnet")
+
+    transformer.validate_and_initialize(context=context)
+
+    model_cache.assert_called_once_with(4096)
+    model_cache.return_value.loaded.assert_called_once_with("resnet", 512, environment.model_dir)
+
+
+@patch("sagemaker_inference.model_cache.ModelCache")
+@patch("sagemaker_inference.transformer.Transformer._validate_user_module_and_set_functions")
+def test_validate_and_initialize_model_cache_over_budget(validate_user_module, model_cache, env):
+    env.return_value.model_server_model_cache = True
+    model_cache.return_value.loaded.side_effect = MemoryError("over budget")
+    transformer = Transformer()
+    transformer._model_fn = Mock()
+
+    with pytest.raises(MemoryError):
+        transformer.validate_and_initialize(context=Mock(model_name="resnet"))
+
+    assert transformer._initialized is False
+
+
+@patch("sagemaker_inference.model_cache.ModelCache")
+def test_create_model_cache_for_prefetching(model_cache):
+    transformer = Transformer()
+    transformer._environment = Mock(
+        model_server_model_cache=False,
+        model_server_prefetch=True,
+    )
+
+    assert transformer._create_model_cache() is model_cache.return_value
+    model_cache.assert_called_once_with(None)
+
+
+@patch("sagemaker_inference.transformer.Transformer.validate_and_initialize")
+def test_transform_model_cache(validate):
+    context = MagicMock()
+    context.request_processor[0].get_request_properties.return_value = {}
+
+    transformer = Transformer()
+    transformer._environment = Mock(default_accept=ACCEPT)
+    transformer._model_cache = Mock()
+    transformer._model_name = "resnet"
+    transformer._registry = Mock()
+    transformer._transform_fn = lambda model, input_data, content_type, accept: "out"
+
+    transformer.transform([{"body": INPUT_DATA}], context)
+
+    transformer._model_cache.used.assert_called_once_with()
+    transformer._registry.inc.assert_any_call(prometheus.MODEL_REQUESTS, {"model": "resnet"})
+
+
+@patch("sagemaker_inference.metrics.StageMetrics")
+@patch("sagemaker_inference.transformer.Transformer._validate_user_module_and_set_functions")
+def test_validate_and_initialize_stage_metrics(validate_user_module, stage_metrics, env):
+    env.return_value.model_server_stage_metrics = True
+    env.return_value.model_server_metrics_interval = 60
+    transformer = Transformer()
+    transformer._model_fn = Mock()
+
+    transformer.validate_and_initialize()
+
+    stage_metrics.assert_called_once_with(60)
+    stage_metrics.return_value.observe.assert_any_call("model_fn", ANY)
+    assert transformer._stage_metrics is stage_metrics.return_value
+
+
+@patch("time.time", return_value=1000.0)
+@patch("sagemaker_inference.transformer.Transformer._run_handler_function")
+@patch("sagemaker_inference.transformer.Transformer.validate_and_initialize")
+def test_transform_deadline_exceeded(validate, run_handler, time):
+    context = Context("model", environment.model_dir, request_headers=[{}], arrival_times=[900.0])
+
+    transformer = Transformer()
+    transformer._request_timeout = 60
+
+    result = transformer.transform([{"body": INPUT_DATA}], context)
+
+    run_handler.assert_not_called()
+    assert context.get_response_status(0) == (
+        http_client.SERVICE_UNAVAILABLE,
+        "Request deadline exceeded",
+    )
+    assert "Request deadline exceeded" in result[0]
+
+
+@patch("time.time", return_value=1000.0)
+def test_request_deadline_from_custom_attributes(time):
+    context = Context(
+        "model",
+        environment.model_dir,
+        request_headers=[{"X-Amzn-SageMaker-Custom-Attributes": "timeout_ms=500"}],
+    )
+    transformer = Transformer()
+
+    assert transformer._request_deadline(context) is None
+
+    transformer._request_timeout = 60
+
+    assert transformer._request_deadline(context) == 1000.5
+
+
+@patch("time.time", return_value=100)
+def test_default_transform_fn_deadline_exceeded(time):
+    transformer = Transformer()
+    transformer._request.deadline = 50
+    transformer._input_fn = Mock(return_value=PREPROCESSED_DATA)
+    transformer._predict_fn = Mock()
+
+    with pytest.raises(BaseInferenceToolkitError):
+        transformer._default_transform_fn(MODEL, INPUT_DATA, CONTENT_TYPE, ACCEPT)
+
+    transformer._predict_fn.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "deadlines, timeout_seconds, expected", [(False, None, None), (True, None, 60), (True, 30, 30)]
+)
+@patch("sagemaker_inference.transformer.Transformer._validate_user_module_and_set_functions")
+def test_validate_and_initialize_request_deadlines(
+    validate_user_module, deadlines, timeout_seconds, expected, env
+):
+    env.return_value.model_server_request_deadlines = deadlines
+    env.return_value.model_server_timeout = 60
+    env.return_value.model_server_timeout_seconds = timeout_seconds
+    transformer = Transformer()
+    transformer._model_fn = Mock()
+
+    transformer.validate_and_initialize()
+
+    assert transformer._request_timeout == expected
+
+
+@patch("sagemaker_inference.transformer.Transformer._tracked_transform", return_value=[RESULT])
+def test_transform_admitted(tracked_transform):
+    context = Context("model", environment.model_dir, request_headers=[{}], arrival_times=[1000.0])
+    transformer = Transformer()
+    transformer._admission = Mock()
+
+    assert transformer.transform([{"body": INPUT_DATA}], context) == [RESULT]
+
+    transformer._admission.acquire.assert_called_once_with(1000.0)
+
+    transformer._admission.release.assert_called_once_with(
+        transformer._admission.acquire.return_value
+    )
+
+
+@patch("sagemaker_inference.transformer.Transformer._tracked_transform")
+def test_transform_rejected(tracked_transform):
+    context = MagicMock()
+    transformer = Transformer()
+    transformer._admission = Mock()
+    transformer._admission.acquire.side_effect = GenericInferenceToolkitError(
+        http_client.TOO_MANY_REQUESTS, "Too many requests in flight"
+    )
+
+    result = transformer.transform([{"body": INPUT_DATA}], context)
+
+    tracked_transform.assert_not_called()
+    transformer._admission.release.assert_not_called()
+    context.set_response_status.assert_called_once_with(
+        code=http_client.TOO_MANY_REQUESTS, phrase="Too many requests in flight"
+    )
+    assert "Too many requests in flight" in result[0]
+
+
+@pytest.mark.parametrize(
+    "max_inflight_requests, max_latency, admission",
+    [(None, None, False), (8, None, True), (None, 500, True)],
+)
+@patch("sagemaker_inference.transformer.Transformer._validate_user_module_and_set_functions")
+def test_validate_and_initialize_admission(
+    validate_user_module, max_inflight_requests, max_latency, admission, env
+):
+    env.return_value.model_server_max_inflight_requests = max_inflight_requests
+    env.return_value.model_server_max_latency = max_latency
+    transformer = Transformer()
+    transformer._model_fn = Mock()
+
+    transformer.validate_and_initialize()
+
+    assert (transformer._admission is not None) is admission
+
+
+@pytest.mark.parametrize(
+    "backend, multi_model, worker_threads, warned",
+    [
+        (environment.MMS_BACKEND, "false", 4, True),
+        (environment.PYTHON_BACKEND, "true", 4, True),
+        (environment.PYTHON_BACKEND, "false", 1, True),
+        (environment.PYTHON_BACKEND, "false", 4, False),
+    ],
+)
+@patch("sagemaker_inference.transformer.logger")
+@patch("sagemaker_inference.transformer.Transformer._validate_user_module_and_set_functions")
+def test_validate_and_initialize_admission_warning(
+    validate_user_module, logger, backend, multi_model, worker_threads, warned, env
+):
+    env.return_value.model_server_max_inflight_requests = 8
+    env.return_value.model_server_backend = backend
+    env.return_value.model_server_worker_threads = worker_threads
+    transformer = Transformer()
+    transformer._model_fn = Mock()
+
+    with patch.dict(os.environ, {"SAGEMAKER_MULTI_MODEL": multi_model}):
+        transformer.validate_and_initialize()
+
+    assert transformer._admission is not None
+    assert logger.warning.called is warned
+
+
+@pytest.mark.parametrize("preload_model", [True, False])
+@patch("gc.freeze")
+@patch("sagemaker_inference.transformer.Transformer._validate_user_module_and_set_functions")
+def test_validate_and_initialize_preload_model(validate_user_module, freeze, preload_model, env):
+    env.return_value.model_server_preload_model = preload_model
+    transformer = Transformer()
+    transformer._model_fn = Mock()
+
+    transformer.validate_and_initialize()
+
+    assert freeze.called is preload_model
+
+
+@patch("sagemaker_inference.transformer.Transformer._validate_user_module_and_set_functions")
+def test_validate_and_initialize(validate_user_module, env):
     transformer = Transformer()
 
     model_fn = Mock()
@@ -345,11 +876,19 @@ def test_handle_validate_and_initialize_user_error(env, validate_user_module):
 
 
 class UserModuleMock:
-    def __init__(self, transform_fn=Mock(), input_fn=Mock(), predict_fn=Mock(), output_fn=Mock()):
+    def __init__(
+        self,
+        transform_fn=Mock(),
+        input_fn=Mock(),
+        predict_fn=Mock(),
+        output_fn=Mock(),
+        batch_predict_fn=None,
+    ):
         self.transform_fn = transform_fn
         self.input_fn = input_fn
         self.predict_fn = predict_fn
         self.output_fn = output_fn
+        self.batch_predict_fn = batch_predict_fn
 
 
 @patch("importlib.import_module")
@@ -447,6 +986,24 @@ def test_validate_user_module_and_set_functions_transform_fn(find_spec, import_m
     assert transformer._transform_fn == import_module.return_value.transform_fn
 
 
+@patch.dict(os.environ, {parameters.MULTI_MODEL_ENV: "true"})
+@patch("importlib.import_module")
+@patch("sagemaker_inference.user_modules.import_module")
+def test_validate_user_module_multi_model(user_modules_import, import_module):
+    user_modules_import.return_value = UserModuleMock(
+        input_fn=None, predict_fn=None, output_fn=None
+    )
+    transformer = Transformer()
+    transformer._environment = Mock(module_name="inference")
+    transformer._model_dir = "/opt/ml/models/model-name"
+
+    transformer._validate_user_module_and_set_functions()
+
+    user_modules_import.assert_called_once_with("inference", "/opt/ml/models/model-name/code")
+    import_module.assert_not_called()
+    assert transformer._transform_fn == user_modules_import.return_value.transform_fn
+
+
 def _assert_value_error_raised():
     with pytest.raises(ValueError) as e:
         transformer = Transformer()
@@ -479,6 +1036,21 @@ def test_validate_user_module_error(find_spec, import_module, user_module):
     _assert_value_error_raised()
 
 
+@patch("importlib.import_module")
+@patch("sagemaker_inference.transformer.find_spec", return_value=Mock())
+def test_validate_user_module_batch_predict_fn_error(find_spec, import_module):
+    import_module.return_value = UserModuleMock(
+        input_fn=None, predict_fn=None, output_fn=None, batch_predict_fn=Mock()
+    )
+
+    with pytest.raises(ValueError) as e:
+        transformer = Transformer()
+        transformer._environment = Mock()
+        transformer._validate_user_module_and_set_functions()
+
+    assert "in conjunction with batch_predict_fn implementation" in str(e.value)
+
+
 @patch(
     "sagemaker_inference.transformer.Transformer._run_handler_function",
     side_effect=[PREPROCESSED_DATA, PREDICT_RESULT, PROCESSED_RESULT],
@@ -537,3 +1109,16 @@ def test_run_handler_function_raise_error():
         transformer._run_handler_function(dummy_handler_func, a, b, c)
 
     assert "dummy_handler_func takes 2 arguments but 3 were given." in str(e.value)
+
+
+async def async_handler_func(a, b):
+    await asyncio.sleep(0)
+    return b
+
+
+def test_run_handler_function_coroutine():
+    arg1 = Mock()
+    arg2 = Mock()
+    transformer = Transformer()
+
+    assert transformer._run_handler_function(async_handler_func, arg1, arg2) == arg2
@@ -0,0 +1,106 @@
+# Copyright 2019-2020 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the 'License'). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the 'license' file accompanying this file. This file is
+# distributed on an 'AS IS' BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import os
+import sys
+
+from mock import patch
+import pytest
+
+from sagemaker_inference import user_modules
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    monkeypatch.setattr(user_modules, "_modules", {})
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    with patch.dict(sys.modules):
+        yield
+
+
+def _write(path, source):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(source)
+
+
+def _code_dir(tmpdir, model, source, module="inference.py"):
+    code_dir = os.path.join(str(tmpdir), model, "code")
+    _write(os.path.join(code_dir, module), source)
+    return code_dir
+
+
+def test_code_hash(tmpdir):
+    a = _code_dir(tmpdir, "a", "NAME = 'a'\n")
+    b = _code_dir(tmpdir, "b", "NAME = 'a'\n")
+    _write(os.path.join(b, "__pycache__", "inference.py"), "stale")
+    _write(os.path.join(b, "model.bin"), "weights")
+
+    assert user_modules.code_hash(a) == user_modules.code_hash(b)
+
+    _write(os.path.join(b, "utils.py"), "")
+
+    assert user_modules.code_hash(a) != user_modules.code_hash(b)
+
+
+def test_import_module_isolates_models(tmpdir):
+    a = user_modules.import_module("inference", _code_dir(tmpdir, "a", "NAME = 'a'\n"))
+    b = user_modules.import_module("inference", _code_dir(tmpdir, "b", "NAME = 'b'\n"))
+
+    assert (a.NAME, b.NAME) == ("a", "b")
+    assert a.__name__.startswith(user_modules.MODULE_PREFIX + "inference_")
+    assert sys.modules[a.__name__] is a
+    assert "inference" not in sys.modules
+
+
+def test_import_module_reuses_identical_code(tmpdir):
+    a = user_modules.import_module("inference", _code_dir(tmpdir, "a", "NAME = 'a'\n"))
+    code_dir = _code_dir(tmpdir, "b", "NAME = 'a'\n")
+    b = user_modules.import_module("inference", code_dir)
+
+    assert a is b
+    assert code_dir not in sys.path
+
+
+def test_import_module_with_sibling_module(tmpdir):
+    code_dir = _code_dir(tmpdir, "a", "from helpers import NAME\n")
+    _write(os.path.join(code_dir, "helpers.py"), "NAME = 'helper'\n")
+
+    module = user_modules.import_module("inference", code_dir)
+
+    assert module.NAME == "helper"
+    assert sys.path.count(code_dir) == 1
+
+
+def test_import_module_package(tmpdir):
+    code_dir = _code_dir(tmpdir, "a", "from .handlers import NAME\n", "inference/__init__.py")
+    _write(os.path.join(code_dir, "inference", "handlers.py"), "NAME = 'package'\n")
+
+    assert user_modules.import_module("inference", code_dir).NAME == "package"
+
+
+def test_import_module_missing(tmpdir):
+    code_dir = _code_dir(tmpdir, "a", "")
+
+    assert user_modules.import_module("other", code_dir) is None
+    assert user_modules.import_module("pkg.inference", code_dir) is None
+
+
+def test_import_module_error(tmpdir):
+    code_dir = _code_dir(tmpdir, "a", "raise ImportError('missing dependency')\n")
+    modules = set(sys.modules)
+
+    with pytest.raises(ImportError):
+        user_modules.import_module("inference", code_dir)
+
+    assert set(sys.modules) == modules
+    assert user_modules._modules == {}
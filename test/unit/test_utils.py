@@ -14,6 +14,7 @@ from mock import Mock, mock_open, patch
 import pytest
 
 from sagemaker_inference.utils import (
+    custom_attributes,
     parse_accept,
     read_file,
     remove_crlf,
@@ -100,3 +101,18 @@ def test_remove_crlf():
     sanitized_string = "test:  string"
 
     assert sanitized_string == remove_crlf(illegal_string)
+
+
+@pytest.mark.parametrize(
+    "request_property, expected",
+    [
+        ({}, {}),
+        ({"X-Amzn-SageMaker-Custom-Attributes": "timeout_ms=200"}, {"timeout_ms": "200"}),
+        (
+            {"x-amzn-sagemaker-custom-attributes": "a=1, b=2;flag"},
+            {"a": "1", "b": "2", "flag": ""},
+        ),
+    ],
+)
+def test_custom_attributes(request_property, expected):
+    assert custom_attributes(request_property) == expected